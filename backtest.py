@@ -0,0 +1,126 @@
+# backtest.py
+import os
+import time
+import argparse
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from run_model import score_games
+from table_reader import read_table
+from utils import get_store
+
+# --- Config ---
+GAME_COLUMNS = ['game_id', 'game_date', 'home_team_id', 'away_team_id', 'home_score', 'away_score', 'actual_winner_id']
+MARGIN_BUCKETS = [0, 0.5, 1.0, 1.5, 2.0, 3.0, np.inf]
+# Logistic scale used to turn a predicted margin into a win probability for calibration
+MARGIN_LOGIT_SCALE = 0.35
+# Flat price assumed for every pick until real lines are available
+DEFAULT_AMERICAN_ODDS = -110
+
+def fetch_season_games(supabase, season: int, columns=GAME_COLUMNS) -> pd.DataFrame:
+    """Pulls every game of a season that has a final score."""
+    return read_table(
+        supabase, "games", columns, order="game_id",
+        filters=[("gte", "game_date", f"{season}-01-01"), ("lte", "game_date", f"{season}-12-31"),
+                 ("gte", "home_score", 0)])
+
+def point_in_time_team_scores(games_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Builds per-(game_date, team_id) component scores from results known before that date.
+    The stats tables only hold current season totals, so history is rebuilt from the games
+    themselves: runs scored per game stands in for batting and runs allowed per game for the
+    bullpen. Defense has no history and is held at the neutral 50.
+    """
+    home = games_df[['game_date', 'home_team_id', 'home_score', 'away_score']].set_axis(
+        ['game_date', 'team_id', 'runs_for', 'runs_against'], axis=1)
+    away = games_df[['game_date', 'away_team_id', 'away_score', 'home_score']].set_axis(
+        ['game_date', 'team_id', 'runs_for', 'runs_against'], axis=1)
+    log = pd.concat([home, away], ignore_index=True)
+    log['games'] = 1
+
+    # Collapse doubleheaders so a team's second game never sees the first game's result
+    daily = log.groupby(['team_id', 'game_date'], sort=True)[['runs_for', 'runs_against', 'games']].sum()
+    prior = daily.groupby(level='team_id').cumsum() - daily
+    prior = prior.reset_index()
+
+    played = prior['games'].replace(0, np.nan)
+    prior['runs_for_pg'] = prior['runs_for'] / played
+    prior['runs_against_pg'] = prior['runs_against'] / played
+
+    by_date = prior.groupby('game_date')
+    prior['Batting_Score'] = (by_date['runs_for_pg'].rank(method='max', pct=True) * 100).fillna(50.0)
+    prior['Bullpen_Score'] = (by_date['runs_against_pg'].rank(method='max', ascending=False, pct=True) * 100).fillna(50.0)
+    prior['Defense_Score'] = 50.0
+    return prior[['game_date', 'team_id', 'Batting_Score', 'Bullpen_Score', 'Defense_Score']]
+
+def margin_to_win_prob(margin):
+    return 1 / (1 + np.exp(-MARGIN_LOGIT_SCALE * np.asarray(margin, dtype=float)))
+
+def american_to_decimal(odds):
+    return 1 + (100 / -odds if odds < 0 else odds / 100)
+
+def decided_games(games_df: pd.DataFrame) -> pd.DataFrame:
+    """Games with both team ids and a non-tied final score, with integer team ids."""
+    games_df = games_df.dropna(subset=['home_team_id', 'away_team_id', 'home_score', 'away_score'])
+    games_df = games_df[games_df['home_score'] != games_df['away_score']]
+    return games_df.astype({'home_team_id': 'int64', 'away_team_id': 'int64'})
+
+def actual_winner_ids(games_df: pd.DataFrame) -> pd.Series:
+    """actual_winner_id where a results job recorded it, otherwise the team with more runs."""
+    by_score = pd.Series(np.where(games_df['home_score'] > games_df['away_score'],
+                                  games_df['home_team_id'], games_df['away_team_id']), index=games_df.index)
+    if 'actual_winner_id' not in games_df.columns:
+        return by_score
+    return pd.to_numeric(games_df['actual_winner_id'], errors='coerce').fillna(by_score).astype('int64')
+
+def backtest_season(games_df: pd.DataFrame) -> pd.DataFrame:
+    """Scores every game in the frame with point-in-time stats and returns a per-bucket report."""
+    games_df = decided_games(games_df)
+    team_scores = point_in_time_team_scores(games_df)
+    no_pitchers = pd.DataFrame({'name': pd.Series(dtype=object), 'Pitching_Score': pd.Series(dtype=float)})
+    scored = score_games(games_df, team_scores, no_pitchers)
+
+    scored['hit'] = (scored['predicted_winner_id'] == actual_winner_ids(scored)).astype(float)
+    scored['win_prob'] = margin_to_win_prob(scored['margin'])
+    payout = american_to_decimal(DEFAULT_AMERICAN_ODDS) - 1
+    scored['profit'] = np.where(scored['hit'] == 1, payout, -1.0)
+    scored['bucket'] = pd.cut(scored['margin'], MARGIN_BUCKETS, right=False)
+
+    report = scored.groupby('bucket', observed=True).agg(
+        games=('hit', 'size'), hit_rate=('hit', 'mean'),
+        predicted_prob=('win_prob', 'mean'), profit=('profit', 'sum'))
+    report['calibration_gap'] = report['hit_rate'] - report['predicted_prob']
+    report['roi'] = report['profit'] / report['games']
+    report.index = report.index.astype(str)
+    report.loc['ALL'] = [
+        len(scored), scored['hit'].mean(), scored['win_prob'].mean(), scored['profit'].sum(),
+        scored['hit'].mean() - scored['win_prob'].mean(), scored['profit'].sum() / max(len(scored), 1)]
+    report.attrs['brier'] = float(((scored['win_prob'] - scored['hit']) ** 2).mean())
+    return report
+
+def run_backtest(seasons, workers=None):
+    supabase = get_store()
+
+    print(f"⬇️ Fetching games for seasons {', '.join(map(str, seasons))}...")
+    frames = {season: fetch_season_games(supabase, season) for season in seasons}
+    frames = {season: df for season, df in frames.items() if not df.empty}
+    if not frames:
+        print("⚠️ Halting: No completed games found for the requested seasons.")
+        return {}
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or min(len(frames), os.cpu_count() or 1)) as pool:
+        reports = dict(zip(frames, pool.map(backtest_season, frames.values())))
+    print(f"⏱️ Backtested {sum(len(df) for df in frames.values())} games in {time.perf_counter() - start:.2f}s")
+
+    for season, report in reports.items():
+        print(f"\n📊 Season {season} (Brier {report.attrs['brier']:.4f})")
+        print(report.to_string(float_format=lambda v: f"{v:.3f}"))
+    return reports
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay past seasons through the WagerIndex model.")
+    parser.add_argument("seasons", nargs="+", type=int, help="Season years to backtest, e.g. 2023 2024")
+    parser.add_argument("--workers", type=int, help="Process pool size (defaults to one per season)")
+    args = parser.parse_args()
+    run_backtest(args.seasons, args.workers)
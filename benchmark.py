@@ -0,0 +1,323 @@
+# benchmark.py
+"""
+Offline benchmarks for the hot paths of the daily job:
+
+    python benchmark.py                          # all cases, all sizes, results to benchmarks/results/
+    python benchmark.py --only model --sizes slate,season --repeat 3
+    python benchmark.py --compare benchmarks/results/<baseline>.json
+    python benchmark.py --record                 # refresh benchmarks/fixtures from ESPN/pybaseball (needs network)
+
+ESPN responses are replayed through http_cache's replay mode and pybaseball frames are served from
+the Arrow pitching cache, using the recorded fixtures in benchmarks/fixtures when present and
+deterministic synthetic ones otherwise. Supabase is replaced by memory_store.MemoryStore, or by a
+sqlite_store.SqliteStore file for the model_sqlite case.
+Everything runs inside a scratch working directory so .cache state never leaks between runs.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import http_cache
+import pitching_cache
+from memory_store import MemoryStore
+from sqlite_store import SqliteStore
+from registry import TEAMS_URL, get_registry
+import fetch_team_stats
+from fetch_team_stats import list_team_ids, fetch_team_statistics, fetch_and_upsert_team_stats
+from fetch_pitcher_stats import fetch_and_upsert_pitchers
+from run_model import run_prediction_engine
+from features import build_features
+
+# --- Config ---
+ROOT = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SEASON = 2024
+# Games per size; a season is 162 dates of a full 15-game slate
+SIZES = {'slate': 15, 'month': 15 * 27, 'season': 15 * 162, 'seasons': 3 * 15 * 162}
+SYNTHETIC_PITCHERS = 850
+REGRESSION_THRESHOLD = 0.10
+
+# (ESPN id, abbreviation, display name, short name, nickname, league)
+TEAMS = [
+    (1, 'BAL', 'Baltimore Orioles', 'Orioles', 'Orioles', 'AL'), (2, 'BOS', 'Boston Red Sox', 'Red Sox', 'Red Sox', 'AL'),
+    (3, 'LAA', 'Los Angeles Angels', 'Angels', 'Angels', 'AL'), (4, 'CHW', 'Chicago White Sox', 'White Sox', 'White Sox', 'AL'),
+    (5, 'CLE', 'Cleveland Guardians', 'Guardians', 'Guardians', 'AL'), (6, 'DET', 'Detroit Tigers', 'Tigers', 'Tigers', 'AL'),
+    (7, 'KC', 'Kansas City Royals', 'Royals', 'Royals', 'AL'), (8, 'MIL', 'Milwaukee Brewers', 'Brewers', 'Brewers', 'NL'),
+    (9, 'MIN', 'Minnesota Twins', 'Twins', 'Twins', 'AL'), (10, 'NYY', 'New York Yankees', 'Yankees', 'Yankees', 'AL'),
+    (11, 'ATH', 'Athletics', 'Athletics', 'Athletics', 'AL'), (12, 'SEA', 'Seattle Mariners', 'Mariners', 'Mariners', 'AL'),
+    (13, 'TEX', 'Texas Rangers', 'Rangers', 'Rangers', 'AL'), (14, 'TOR', 'Toronto Blue Jays', 'Blue Jays', 'Blue Jays', 'AL'),
+    (15, 'ATL', 'Atlanta Braves', 'Braves', 'Braves', 'NL'), (16, 'CHC', 'Chicago Cubs', 'Cubs', 'Cubs', 'NL'),
+    (17, 'CIN', 'Cincinnati Reds', 'Reds', 'Reds', 'NL'), (18, 'HOU', 'Houston Astros', 'Astros', 'Astros', 'AL'),
+    (19, 'LAD', 'Los Angeles Dodgers', 'Dodgers', 'Dodgers', 'NL'), (20, 'WSH', 'Washington Nationals', 'Nationals', 'Nationals', 'NL'),
+    (21, 'NYM', 'New York Mets', 'Mets', 'Mets', 'NL'), (22, 'PHI', 'Philadelphia Phillies', 'Phillies', 'Phillies', 'NL'),
+    (23, 'PIT', 'Pittsburgh Pirates', 'Pirates', 'Pirates', 'NL'), (24, 'STL', 'St. Louis Cardinals', 'Cardinals', 'Cardinals', 'NL'),
+    (25, 'SD', 'San Diego Padres', 'Padres', 'Padres', 'NL'), (26, 'SF', 'San Francisco Giants', 'Giants', 'Giants', 'NL'),
+    (27, 'COL', 'Colorado Rockies', 'Rockies', 'Rockies', 'NL'), (28, 'MIA', 'Miami Marlins', 'Marlins', 'Marlins', 'NL'),
+    (29, 'ARI', 'Arizona Diamondbacks', 'D-backs', 'Diamondbacks', 'NL'), (30, 'TB', 'Tampa Bay Rays', 'Rays', 'Rays', 'AL'),
+]
+
+# --- Synthetic fixtures ---
+# category -> ESPN stat name -> (low, high, decimals); padded with filler stats to a realistic payload size
+CATEGORY_STATS = {
+    'batting': {'gamesPlayed': (158, 162, 0), 'atBats': (5300, 5700, 0), 'runs': (600, 900, 0), 'hits': (1200, 1500, 0),
+                'doubles': (220, 330, 0), 'triples': (10, 40, 0), 'homeRuns': (120, 280, 0), 'RBIs': (580, 870, 0),
+                'walks': (400, 650, 0), 'strikeouts': (1150, 1650, 0), 'stolenBases': (50, 200, 0),
+                'avg': (0.225, 0.275, 3), 'onBasePct': (0.290, 0.345, 3), 'slugAvg': (0.360, 0.460, 3), 'OPS': (0.650, 0.800, 3)},
+    'pitching': {'gamesPlayed': (158, 162, 0), 'wins': (55, 105, 0), 'losses': (55, 105, 0), 'ERA': (3.2, 5.6, 2),
+                 'saves': (25, 55, 0), 'innings': (1420, 1470, 1), 'hits': (1200, 1550, 0), 'earnedRuns': (520, 880, 0),
+                 'homeRuns': (140, 240, 0), 'walks': (400, 620, 0), 'strikeouts': (1200, 1650, 0), 'WHIP': (1.1, 1.5, 2)},
+    'fielding': {'gamesPlayed': (158, 162, 0), 'errors': (60, 120, 0), 'fieldingPct': (0.980, 0.990, 3),
+                 'totalChances': (5900, 6300, 0), 'putouts': (4250, 4400, 0), 'assists': (1450, 1800, 0),
+                 'doublePlays': (110, 170, 0)},
+}
+FILLER_STATS_PER_CATEGORY = 40
+
+def _stat(name, value):
+    return {"name": name, "displayName": name, "shortDisplayName": name[:4].upper(), "abbreviation": name[:3].upper(),
+            "description": f"The {name} statistic.", "value": value, "displayValue": f"{value:g}"}
+
+def _statistics_doc(rng):
+    """A core API team statistics document with the same shape as ESPN's."""
+    categories = []
+    for category, stats in CATEGORY_STATS.items():
+        entries = [_stat(name, float(np.round(rng.uniform(low, high), decimals))) for name, (low, high, decimals) in stats.items()]
+        entries += [_stat(f"{category}Filler{i}", float(np.round(rng.uniform(0, 100), 2))) for i in range(FILLER_STATS_PER_CATEGORY)]
+        categories.append({"name": category, "displayName": category.title(), "stats": entries})
+    return {"splits": {"id": "0", "name": "All Splits", "categories": categories}}
+
+def _write_replay(http_dir, url, body, content_type):
+    os.makedirs(http_dir, exist_ok=True)
+    with open(os.path.join(http_dir, f"{http_cache._key(url)}.json"), "w", encoding="utf-8") as f:
+        json.dump({"url": url, "status": 200, "headers": {"Content-Type": content_type}, "body": body}, f)
+
+def synthesize_http(http_dir, season, rng):
+    teams_json = {"sports": [{"leagues": [{"teams": [
+        {"team": {"id": str(i), "abbreviation": abbr, "displayName": name, "shortDisplayName": short,
+                  "name": nick, "location": name.replace(nick, "").strip()}}
+        for i, abbr, name, short, nick, _ in TEAMS]}]}]}
+    _write_replay(http_dir, TEAMS_URL, json.dumps(teams_json), "application/json")
+    team_list = {"count": len(TEAMS), "pageIndex": 1, "pageSize": fetch_team_stats.TEAMS_PAGE_SIZE, "pageCount": 1,
+                 "items": [{"$ref": f"{fetch_team_stats.CORE_API}/seasons/{season}/teams/{t[0]}?lang=en&region=us"} for t in TEAMS]}
+    _write_replay(http_dir, fetch_team_stats.teams_url(season), json.dumps(team_list), "application/json")
+    for t in TEAMS:
+        _write_replay(http_dir, fetch_team_stats.statistics_url(season, t[0]), json.dumps(_statistics_doc(rng)), "application/json")
+
+def synthesize_pitching(season, rng, n=SYNTHETIC_PITCHERS):
+    """A frame with the columns fetch_pitcher_stats reads, padded to roughly pybaseball's width."""
+    abbrs = [t[1] for t in TEAMS]
+    frame = pd.DataFrame({
+        'IDfg': np.arange(10000, 10000 + n), 'Season': season,
+        'Name': [f"Pitcher {i:04d}" for i in range(n)], 'Team': rng.choice(abbrs, n),
+        'IP': np.round(rng.gamma(1.2, 60, n), 1), 'ERA': np.round(rng.normal(4.2, 1.1, n).clip(0.5), 2),
+        'WHIP': np.round(rng.normal(1.30, 0.18, n).clip(0.7), 2), 'K/9': np.round(rng.normal(8.8, 1.8, n), 2),
+        'BB/9': np.round(rng.normal(3.3, 0.9, n).clip(0.5), 2),
+    })
+    filler = pd.DataFrame(rng.normal(size=(n, 300)), columns=[f"stat_{i}" for i in range(300)])
+    return pd.concat([frame, filler], axis=1)
+
+def write_pitching_fixture(df, season):
+    data_path, meta_path, _ = pitching_cache._paths(season)
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    feather.write_feather(pa.Table.from_pandas(pitching_cache._to_arrow_frame(df), preserve_index=False),
+                          data_path, compression="uncompressed")
+    with open(meta_path, "w") as f:
+        json.dump({"season": season, "fetched_at": time.time(), "rows": len(df), "final": True}, f)
+
+def synthesize_store(n_games, season, pitchers_df, rng):
+    """A MemoryStore holding team_stats and pitchers for season plus n_games scheduled games."""
+    team_stats = [{'team_id': i, 'team_abbr': abbr, 'season': season, 'games_played': 162,
+                   'batting_average': round(rng.uniform(0.225, 0.275), 3), 'errors': int(rng.integers(60, 120)),
+                   'era': round(rng.uniform(3.2, 5.6), 2), 'whip': round(rng.uniform(1.1, 1.5), 2),
+                   'runs': int(rng.integers(600, 900))} for i, abbr, *_ in TEAMS]
+    qualified = pitchers_df[pitchers_df['IP'] >= 10]
+    pitchers = [{'pitcher_id': int(r.IDfg), 'name': r.Name, 'era': r.ERA, 'whip': r.WHIP,
+                 'innings_pitched': r.IP, 'season': season} for r in qualified.itertuples()]
+    games, day = [], 0
+    while len(games) < n_games:
+        game_date = date(season + day // 162, 4, 1) + timedelta(days=day % 162)
+        order = rng.permutation(len(TEAMS))
+        starters = rng.choice(len(pitchers), 30, replace=False)
+        for g in range(min(15, n_games - len(games))):
+            home, away = TEAMS[order[2 * g]], TEAMS[order[2 * g + 1]]
+            hp, ap = pitchers[starters[2 * g]], pitchers[starters[2 * g + 1]]
+            games.append({'game_id': str(400000000 + len(games)), 'game_date': game_date.isoformat(),
+                          'home_team': home[1], 'away_team': away[1], 'home_team_id': home[0], 'away_team_id': away[0],
+                          'home_pitcher_name': hp['name'], 'away_pitcher_name': ap['name'],
+                          'home_pitcher_id': hp['pitcher_id'], 'away_pitcher_id': ap['pitcher_id']})
+        day += 1
+    store = MemoryStore({'team_stats': team_stats, 'pitchers': pitchers, 'games': games})
+    return store, games[0]['game_date'], games[-1]['game_date']
+
+# --- Fixtures on disk ---
+def prepare_fixtures(workdir, season, seed):
+    """Copies recorded fixtures into workdir (or synthesizes them) and points the caches at them."""
+    rng = np.random.default_rng(seed)
+    http_dir = os.path.join(workdir, "http")
+    recorded_http = os.path.join(FIXTURE_DIR, "http")
+    if os.path.isdir(recorded_http):
+        shutil.copytree(recorded_http, http_dir)
+    else:
+        synthesize_http(http_dir, season, rng)
+    http_cache.REPLAY_DIR = http_dir
+
+    recorded_pitching = os.path.join(FIXTURE_DIR, f"pitching_stats_{season}.arrow")
+    if os.path.exists(recorded_pitching):
+        pitchers_df = feather.read_feather(recorded_pitching)
+    else:
+        pitchers_df = synthesize_pitching(season, rng)
+    write_pitching_fixture(pitchers_df, season)
+    return pitchers_df
+
+def record_fixtures(season):
+    """Fetches live ESPN responses and the pybaseball leaderboard into FIXTURE_DIR."""
+    from pybaseball import pitching_stats
+    http_cache.RECORD_DIR = os.path.join(FIXTURE_DIR, "http")
+    http_cache.clear()  # so every response is fetched live and therefore recorded
+    get_registry(season, refresh=True)
+    fetch_team_statistics(season, list_team_ids(season))
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    df = pitching_stats(season)
+    feather.write_feather(pa.Table.from_pandas(pitching_cache._to_arrow_frame(df), preserve_index=False),
+                          os.path.join(FIXTURE_DIR, f"pitching_stats_{season}.arrow"))
+    print(f"✅ Recorded fixtures for {season} into {FIXTURE_DIR}")
+
+# --- Timing ---
+def time_case(fn, repeat):
+    """One untimed warm-up call, then `repeat` timed calls with stdout swallowed."""
+    with redirect_stdout(io.StringIO()):
+        fn()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+    return timings
+
+def build_cases(season, sizes, pitchers_df, seed):
+    rng = np.random.default_rng(seed)
+    team_ids = [t[0] for t in TEAMS]
+    cases = [
+        ('fetch_team_statistics', 'season', 30, lambda: fetch_team_statistics(season, team_ids)),
+        ('team_stats', 'season', 30, lambda: fetch_and_upsert_team_stats(MemoryStore(), season, full=True)),
+        ('pitcher_stats', 'season', len(pitchers_df), lambda: fetch_and_upsert_pitchers(MemoryStore(), season, full=True)),
+    ]
+    for size in sizes:
+        store, start, end = synthesize_store(SIZES[size], season, pitchers_df, rng)
+        cases.append(('model', size, SIZES[size],
+                      lambda store=store, start=start, end=end: run_prediction_engine(start, end, supabase=store, use_features=False)))
+        with redirect_stdout(io.StringIO()):
+            build_features(store, season)
+        cases.append(('model_features', size, SIZES[size],
+                      lambda store=store, start=start, end=end: run_prediction_engine(start, end, supabase=store)))
+        local = SqliteStore(f"bench-{size}.db")
+        for table, rows in store.tables.items():
+            local.upsert(table, rows)
+        cases.append(('model_sqlite', size, SIZES[size],
+                      lambda local=local, start=start, end=end: run_prediction_engine(start, end, supabase=local)))
+    return cases
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(sizes, repeat, only=None, season=SEASON, seed=0):
+    results = []
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="wagerindex-bench-")
+    try:
+        os.chdir(workdir)
+        pitchers_df = prepare_fixtures(workdir, season, seed)
+        for name, size, rows, fn in build_cases(season, sizes, pitchers_df, seed):
+            if only and name not in only:
+                continue
+            try:
+                timings = time_case(fn, repeat)
+            except (Exception, SystemExit) as e:
+                print(f"❌ {name}[{size}] failed: {e!r}")
+                results.append({'name': name, 'size': size, 'rows': rows, 'error': repr(e)})
+                continue
+            result = {'name': name, 'size': size, 'rows': rows, 'repeat': repeat,
+                      'min_s': min(timings), 'median_s': statistics.median(timings),
+                      'mean_s': statistics.fmean(timings), 'stdev_s': statistics.pstdev(timings)}
+            print(f"  {name:<18} {size:<8} {rows:>6} rows  median {result['median_s'] * 1000:9.1f} ms  min {result['min_s'] * 1000:9.1f} ms")
+            results.append(result)
+    finally:
+        os.chdir(cwd)
+        http_cache.REPLAY_DIR = None
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"), 'git_commit': _git_commit(),
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'pandas': pd.__version__, 'numpy': np.__version__, 'season': season, 'results': results}
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """Prints median-time ratios against a baseline run; returns the cases slower than 1 + threshold."""
+    before = {(r['name'], r['size']): r for r in baseline['results'] if 'median_s' in r}
+    regressions = []
+    print(f"\nCompared with {baseline.get('git_commit')} ({baseline.get('created_at')}):")
+    for r in current['results']:
+        old = before.get((r['name'], r['size']))
+        if old is None or 'median_s' not in r:
+            continue
+        ratio = r['median_s'] / old['median_s']
+        flag = "❌" if ratio > 1 + threshold else ("✅" if ratio < 1 - threshold else "  ")
+        print(f"{flag} {r['name']:<18} {r['size']:<8} {old['median_s'] * 1000:9.1f} -> {r['median_s'] * 1000:9.1f} ms  x{ratio:.2f}")
+        if ratio > 1 + threshold:
+            regressions.append(r)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline WagerIndex benchmarks.")
+    parser.add_argument("--sizes", type=lambda s: s.split(','), default=list(SIZES), help=f"Model sizes: {', '.join(SIZES)}")
+    parser.add_argument("--only", type=lambda s: s.split(','), help="Cases to run: fetch_team_statistics, team_stats, pitcher_stats, model, model_features, model_sqlite")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Results file (defaults to benchmarks/results/bench-<timestamp>.json)")
+    parser.add_argument("--compare", help="Baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Allowed median slowdown before failing")
+    parser.add_argument("--record", action="store_true", help="Record live fixtures instead of benchmarking")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(SEASON)
+        return
+    unknown = set(args.sizes) - set(SIZES)
+    if unknown: print(f"❌ Unknown size(s): {', '.join(sorted(unknown))}"), sys.exit(2)
+
+    print(f"⏱️ Running benchmarks ({args.repeat} repeats)...")
+    report = run_benchmarks(args.sizes, args.repeat, args.only)
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Results written to {output}")
+
+    failed = [r for r in report['results'] if 'error' in r]
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} case(s) regressed by more than {args.threshold:.0%}.")
+            sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# bulk_writer.py
+import time
+import random
+import metrics
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Config ---
+DEFAULT_CHUNK_SIZE = 500
+MAX_WORKERS = 4
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.5
+
+class ChunkResult:
+    """Outcome of one chunk: which rows it covered, how many attempts it took, and the last error if any."""
+    def __init__(self, index, start, rows):
+        self.index = index
+        self.start = start
+        self.rows = rows
+        self.attempts = 0
+        self.error = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        status = "ok" if self.ok else f"failed: {self.error}"
+        return f"<chunk {self.index} rows {self.start}-{self.start + self.rows - 1} attempts={self.attempts} {status}>"
+
+class BulkWriteResult:
+    def __init__(self, table, chunks):
+        self.table = table
+        self.chunks = chunks
+
+    @property
+    def ok(self):
+        return all(c.ok for c in self.chunks)
+
+    @property
+    def rows_written(self):
+        return sum(c.rows for c in self.chunks if c.ok)
+
+    @property
+    def failed_chunks(self):
+        return [c for c in self.chunks if not c.ok]
+
+    def report(self):
+        """Prints a one-line summary plus one line per failed chunk."""
+        total = sum(c.rows for c in self.chunks)
+        if self.ok:
+            print(f"✅ Upserted {total} rows to '{self.table}' in {len(self.chunks)} chunk(s).")
+            return
+        print(f"❌ Upserted {self.rows_written}/{total} rows to '{self.table}'; {len(self.failed_chunks)} chunk(s) failed:")
+        for chunk in self.failed_chunks:
+            print(f"   -> {chunk}")
+
+def _write_chunk(supabase, table, rows, on_conflict):
+    query = supabase.table(table)
+    response = query.upsert(rows, on_conflict=on_conflict).execute() if on_conflict else query.upsert(rows).execute()
+    if not response.data:
+        raise Exception(getattr(response, 'error', 'Unknown error'))
+
+def bulk_upsert(supabase, table, records, on_conflict=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                max_workers=MAX_WORKERS, retries=MAX_RETRIES) -> BulkWriteResult:
+    """
+    Upserts records in chunks of chunk_size, sending chunks concurrently. Chunks that fail are
+    retried (only those chunks) up to `retries` more times with jittered backoff. Upserts keyed on
+    on_conflict are idempotent, so a retried chunk never duplicates rows.
+    """
+    records = list(records)
+    chunks = [ChunkResult(i, start, len(records[start:start + chunk_size]))
+              for i, start in enumerate(range(0, len(records), chunk_size))]
+
+    def attempt(chunk):
+        chunk.attempts += 1
+        try:
+            _write_chunk(supabase, table, records[chunk.start:chunk.start + chunk.rows], on_conflict)
+            chunk.error = None
+        except Exception as e:
+            chunk.error = e
+
+    todo = chunks
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        for round_no in range(retries + 1):
+            if round_no:
+                time.sleep(random.uniform(0, BACKOFF_BASE * 2 ** round_no))
+            list(pool.map(attempt, todo))
+            todo = [c for c in todo if not c.ok]
+            if not todo:
+                break
+    result = BulkWriteResult(table, chunks)
+    metrics.record_rows(table, written=result.rows_written)
+    return result
@@ -0,0 +1,115 @@
+# delta_upsert.py
+import os
+import json
+import hashlib
+import pandas as pd
+from bulk_writer import bulk_upsert
+from table_reader import read_table
+
+# --- Config ---
+MANIFEST_DIR = os.path.join(".cache", "manifests")
+# When set, row hashes are also stored in (and seeded from) this column of the target table,
+# so change detection survives on machines without a persistent .cache (e.g. CI runners).
+HASH_COLUMN = os.getenv("WAGERINDEX_STATS_HASH_COLUMN")
+# Bookkeeping columns that change on every run and must not count as a stat change
+IGNORED_COLUMNS = {'last_updated', 'updated_at'}
+
+class DeltaResult:
+    def __init__(self, table, inserted, changed, unchanged, write_result):
+        self.table = table
+        self.inserted = inserted
+        self.changed = changed
+        self.unchanged = unchanged
+        self.write_result = write_result
+
+    @property
+    def ok(self):
+        return self.write_result is None or self.write_result.ok
+
+    def report(self):
+        print(f"📋 '{self.table}': {self.inserted} new, {self.changed} changed, {self.unchanged} unchanged.")
+        if self.write_result is not None:
+            self.write_result.report()
+
+def _key_columns(key):
+    return [key] if isinstance(key, str) else list(key)
+
+def row_key(record, key):
+    return "|".join(str(record[k]) for k in _key_columns(key))
+
+def row_hash(record, key):
+    skip = set(_key_columns(key)) | IGNORED_COLUMNS | {HASH_COLUMN}
+    stats = {k: v for k, v in record.items() if k not in skip}
+    return hashlib.sha1(json.dumps(stats, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def store_identity(supabase):
+    """
+    What the manifest hashes describe: the Supabase project URL or the SQLite file. None for
+    stores with no lasting identity (e.g. MemoryStore), which get no manifest at all.
+    """
+    if getattr(supabase, 'supabase_url', None):
+        return str(supabase.supabase_url).rstrip("/")
+    if getattr(supabase, 'path', None):
+        return f"sqlite:{os.path.abspath(supabase.path)}"
+    return None
+
+def _manifest_path(table, identity):
+    scope = hashlib.sha1(identity.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(MANIFEST_DIR, f"{table}-{scope}.json")
+
+def load_manifest(table, identity):
+    if identity is None:
+        return {}
+    try:
+        with open(_manifest_path(table, identity)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(table, identity, hashes):
+    if identity is None:
+        return
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    path = _manifest_path(table, identity)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(hashes, f)
+    os.replace(f"{path}.tmp", path)
+
+def _stored_hashes(supabase, table, key, seasons=()):
+    """HASH_COLUMN of every stored row in the given seasons (all rows if none), read page by page."""
+    filters = [("in_", "season", sorted(seasons))] if seasons else []
+    rows = read_table(supabase, table, _key_columns(key) + [HASH_COLUMN], filters=filters,
+                      order=_key_columns(key)).to_dict('records')
+    return {row_key(r, key): r[HASH_COLUMN] for r in rows if pd.notna(r[HASH_COLUMN])}
+
+def delta_upsert(supabase, table, records, key, full=False, **bulk_kwargs) -> DeltaResult:
+    """
+    Upserts only the records whose stat columns differ from the last successful write.
+    key is the conflict column, or a tuple of columns for a composite key.
+    Previous hashes come from the local manifest of this store (or HASH_COLUMN when configured);
+    full=True sends every row but still refreshes the manifest.
+    """
+    identity = store_identity(supabase)
+    previous = load_manifest(table, identity)
+    if not previous and HASH_COLUMN:
+        previous = _stored_hashes(supabase, table, key, {r['season'] for r in records if r.get('season') is not None})
+
+    hashes = {row_key(r, key): row_hash(r, key) for r in records}
+    inserted = [r for r in records if row_key(r, key) not in previous]
+    changed = [r for r in records if row_key(r, key) in previous and previous[row_key(r, key)] != hashes[row_key(r, key)]]
+    unchanged = len(records) - len(inserted) - len(changed)
+    to_write = records if full else inserted + changed
+
+    write_result = None
+    if to_write:
+        if HASH_COLUMN:
+            to_write = [{**r, HASH_COLUMN: hashes[row_key(r, key)]} for r in to_write]
+        write_result = bulk_upsert(supabase, table, to_write, on_conflict=",".join(_key_columns(key)), **bulk_kwargs)
+        # Only remember hashes for rows that actually landed, so failed chunks are retried next run
+        for chunk in write_result.chunks:
+            if not chunk.ok:
+                continue
+            for r in to_write[chunk.start:chunk.start + chunk.rows]:
+                previous[row_key(r, key)] = hashes[row_key(r, key)]
+        save_manifest(table, identity, previous)
+    return DeltaResult(table, len(inserted), len(changed), unchanged, write_result)
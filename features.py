@@ -0,0 +1,129 @@
+# features.py
+import sys
+import hashlib
+import argparse
+import pandas as pd
+import metrics
+from datetime import datetime
+from bulk_writer import bulk_upsert
+from table_reader import read_table
+from utils import get_store, get_current_season_year
+
+# --- Config ---
+# Bump when a score formula changes, so every season's features are rebuilt on the next run
+FEATURE_FORMULA_VERSION = 1
+TEAM_FEATURES_TABLE = "team_features"
+PITCHER_FEATURES_TABLE = "pitcher_features"
+# The one pitcher cutoff: fetch_pitcher_stats.py stores, and the features and run_model's fallback score, the same set
+MIN_INNINGS_PITCHED = 10
+# Raw stat columns the scores are computed from; the stats version is a hash of exactly these
+TEAM_INPUT_COLUMNS = ['team_id', 'team_abbr', 'batting_average', 'errors', 'era']
+PITCHER_INPUT_COLUMNS = ['pitcher_id', 'name', 'era', 'whip']
+# Feature table column -> the frame column score_games expects
+TEAM_SCORE_COLUMNS = {'batting_score': 'Batting_Score', 'defense_score': 'Defense_Score', 'bullpen_score': 'Bullpen_Score'}
+PITCHER_SCORE_COLUMNS = {'pitching_score': 'Pitching_Score'}
+
+def normalize_stat(series: pd.Series, ascending=True) -> pd.Series:
+    """Normalizes a pandas Series into a 0-100 score."""
+    return series.rank(method='max', ascending=ascending, pct=True) * 100
+
+def compute_component_scores(team_stats_df: pd.DataFrame, pitcher_stats_df: pd.DataFrame):
+    """Adds the normalized 0-100 component scores to the team and pitcher frames."""
+    team_stats_df['Batting_Score'] = normalize_stat(team_stats_df['batting_average'], ascending=True)
+    team_stats_df['Defense_Score'] = normalize_stat(team_stats_df['errors'], ascending=False) # Lower errors is better
+    # Placeholder for Bullpen Score - assuming it's based on team ERA for now
+    team_stats_df['Bullpen_Score'] = normalize_stat(team_stats_df['era'], ascending=False)
+
+    pitcher_stats_df['Pitching_Score'] = (
+        normalize_stat(pitcher_stats_df['era'], ascending=False) +
+        normalize_stat(pitcher_stats_df['whip'], ascending=False)
+    ) / 2
+    return team_stats_df, pitcher_stats_df
+
+def stats_version(df: pd.DataFrame, columns) -> str:
+    """Hash of the input stats (and formula version) a set of scores was computed from."""
+    rows = df[columns].sort_values(columns[0]).to_csv(index=False)
+    return hashlib.sha1(f"v{FEATURE_FORMULA_VERSION}\n{rows}".encode("utf-8")).hexdigest()[:16]
+
+def stored_version(supabase, table, season):
+    """stats_version of the most recently computed feature rows for a season, or None."""
+    rows = (supabase.table(table).select("stats_version, computed_at").eq("season", season)
+            .order("computed_at", desc=True).limit(1).execute().data)
+    return rows[0]["stats_version"] if rows else None
+
+def read_inputs(supabase, season):
+    team_stats_df = read_table(supabase, "team_stats", TEAM_INPUT_COLUMNS, filters=[("eq", "season", season)])
+    pitcher_stats_df = read_table(supabase, "pitchers", PITCHER_INPUT_COLUMNS, filters=[
+        ("eq", "season", season), ("gte", "innings_pitched", MIN_INNINGS_PITCHED)])
+    return team_stats_df, pitcher_stats_df
+
+def _feature_records(df, id_cols, score_columns, season, version):
+    out = df[id_cols + list(score_columns.values())].rename(columns={v: k for k, v in score_columns.items()})
+    out = out.astype(object).where(pd.notnull(out), None)
+    computed_at = datetime.now().isoformat()
+    return [{**r, 'season': season, 'stats_version': version, 'computed_at': computed_at} for r in out.to_dict('records')]
+
+def build_features(supabase=None, season=None, force=False) -> bool:
+    """
+    Computes the component scores for a season and stores them in the feature tables, tagged
+    with the stats version they came from. A table whose stored version already matches the
+    current stats is left alone unless force=True. Returns False if a write failed.
+    """
+    supabase = supabase or get_store()
+    season = season or get_current_season_year()
+    with metrics.stage("features.read"):
+        team_stats_df, pitcher_stats_df = read_inputs(supabase, season)
+    if team_stats_df.empty or pitcher_stats_df.empty:
+        print(f"⚠️ No team or pitcher stats for {season}; nothing to build.")
+        return True
+
+    versions = {TEAM_FEATURES_TABLE: stats_version(team_stats_df, TEAM_INPUT_COLUMNS),
+                PITCHER_FEATURES_TABLE: stats_version(pitcher_stats_df, PITCHER_INPUT_COLUMNS)}
+    stale = [t for t, v in versions.items() if force or stored_version(supabase, t, season) != v]
+    if not stale:
+        print(f"✅ Features for {season} are up to date (stats unchanged).")
+        return True
+
+    with metrics.stage("features.compute"):
+        team_stats_df, pitcher_stats_df = compute_component_scores(team_stats_df, pitcher_stats_df)
+    ok = True
+    for table, df, id_cols, score_columns, key in (
+            (TEAM_FEATURES_TABLE, team_stats_df, ['team_id', 'team_abbr'], TEAM_SCORE_COLUMNS, 'team_id,season'),
+            (PITCHER_FEATURES_TABLE, pitcher_stats_df, ['pitcher_id', 'name'], PITCHER_SCORE_COLUMNS, 'pitcher_id,season')):
+        if table not in stale:
+            print(f"  -> '{table}' unchanged (version {versions[table]}).")
+            continue
+        records = _feature_records(df, id_cols, score_columns, season, versions[table])
+        print(f"⬆️ Writing {len(records)} rows to '{table}' (version {versions[table]})...")
+        with metrics.stage("features.upsert", table=table, rows=len(records)):
+            result = bulk_upsert(supabase, table, records, on_conflict=key)
+        result.report()
+        ok = ok and result.ok
+    return ok
+
+def _current_rows(df):
+    # Entities that dropped out of the latest build keep an older version; only the latest build counts
+    latest = df.loc[df['computed_at'].idxmax(), 'stats_version']
+    return df[df['stats_version'] == latest]
+
+def load_features(supabase, season):
+    """
+    The precomputed (team_scores_df, pitcher_scores_df) for a season, with score_games' column
+    names, or None when the feature tables have not been built for that season.
+    """
+    team_df = read_table(supabase, TEAM_FEATURES_TABLE, ['team_id', 'team_abbr', 'stats_version', 'computed_at',
+                                                         *TEAM_SCORE_COLUMNS], filters=[("eq", "season", season)])
+    pitcher_df = read_table(supabase, PITCHER_FEATURES_TABLE, ['pitcher_id', 'name', 'stats_version', 'computed_at',
+                                                               *PITCHER_SCORE_COLUMNS], filters=[("eq", "season", season)])
+    if team_df.empty or pitcher_df.empty:
+        return None
+    return (_current_rows(team_df).rename(columns=TEAM_SCORE_COLUMNS).reset_index(drop=True),
+            _current_rows(pitcher_df).rename(columns=PITCHER_SCORE_COLUMNS).reset_index(drop=True))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the model's component scores into the feature tables.")
+    parser.add_argument("--season", type=int, help="Season to build (defaults to the current one)")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the stats version is unchanged")
+    args = parser.parse_args()
+    if not build_features(season=args.season, force=args.force):
+        sys.exit(1)
@@ -1,22 +1,44 @@
 import os
+import sys
+import json
 import datetime
-import requests
-from supabase import create_client, Client
-from dotenv import load_dotenv
+import argparse
+from zoneinfo import ZoneInfo
+import http_cache
+import metrics
+from http_client import map_concurrent
+from utils import get_store
+from bulk_writer import bulk_upsert
 
-# Load env vars
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# --- Config ---
+CHECKPOINT_PATH = os.path.join(".cache", "backfill_checkpoint.json")
+BACKFILL_WORKERS = 8
+# Dates fetched per window; each window is parsed, upserted and checkpointed before the next starts
+BACKFILL_WINDOW = 16
+# ESPN event times are UTC; MLB's schedule (and ESPN's scoreboard dates) follow US/Eastern
+SCHEDULE_TZ = ZoneInfo("America/New_York")
 
 def fetch_espn_results(target_date):
     date_str = target_date.strftime("%Y%m%d")
     url = f"https://site.api.espn.com/apis/site/v2/sports/baseball/mlb/scoreboard?dates={date_str}"
-    response = requests.get(url)
+    response = http_cache.get(url)
     response.raise_for_status()
     return response.json().get("events", [])
 
-def extract_results(events):
+def schedule_date(event):
+    """The Eastern-time calendar date of an event, so late West-coast games stay on their scoreboard day."""
+    start = datetime.datetime.strptime(event["date"], "%Y-%m-%dT%H:%MZ").replace(tzinfo=datetime.timezone.utc)
+    return start.astimezone(SCHEDULE_TZ).date()
+
+def is_final(event):
+    return event.get("status", {}).get("type", {}).get("name") == "STATUS_FINAL"
+
+def extract_results(events, game_date=None):
+    """
+    Final-score rows for the games table. game_date is the scoreboard date the events were
+    fetched for; without it each event's start time is converted to Eastern time. Teams are
+    written as abbreviations, like fetch_games.
+    """
     results = []
     for event in events:
         try:
@@ -27,38 +49,117 @@ def extract_results(events):
 
             home_score = int(home["score"])
             away_score = int(away["score"])
-            winner = home["team"]["displayName"] if home["winner"] else away["team"]["displayName"]
+            winner = home["team"]["abbreviation"] if home["winner"] else away["team"]["abbreviation"]
 
             game = {
-                "game_date": datetime.datetime.strptime(event["date"], "%Y-%m-%dT%H:%MZ").date(),
-                "home_team": home["team"]["displayName"],
-                "away_team": away["team"]["displayName"],
+                "game_date": (game_date or schedule_date(event)).isoformat(),
+                "home_team": home["team"]["abbreviation"],
+                "away_team": away["team"]["abbreviation"],
+                "home_team_id": int(home["team"]["id"]),
+                "away_team_id": int(away["team"]["id"]),
                 "home_score": home_score,
                 "away_score": away_score,
-                "winner": winner,
-                "espn_game_id": event["id"]
+                # Same winner columns as fetch_results.py and live_scores.py
+                "actual_winner": winner,
+                "actual_winner_id": int(home["team"]["id"] if home["winner"] else away["team"]["id"]),
+                "game_id": event["id"]
             }
             results.append(game)
         except Exception as e:
             print(f"⚠️ Error parsing game: {e}")
     return results
 
-def push_to_supabase(results):
+def push_to_supabase(results, supabase=None):
+    supabase = supabase or get_store()
+    result = bulk_upsert(supabase, "games", results, on_conflict="game_id")
+    result.report()
+    return result
+
+def load_checkpoint(path=CHECKPOINT_PATH):
     try:
-        supabase.table("games").upsert(results, on_conflict=["game_date", "home_team", "away_team"]).execute()
-        print(f"✅ Uploaded {len(results)} final scores to Supabase.")
-    except Exception as e:
-        print(f"❌ Supabase upload failed: {e}")
+        with open(path) as f:
+            return set(json.load(f).get("completed_dates", []))
+    except (OSError, ValueError):
+        return set()
 
-def main():
+def save_checkpoint(completed, path=CHECKPOINT_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"completed_dates": sorted(completed)}, f)
+    os.replace(tmp, path)  # atomic, so an interrupted run never leaves a half-written checkpoint
+
+def backfill(start, end, supabase=None, workers=BACKFILL_WORKERS, checkpoint_path=CHECKPOINT_PATH):
+    """
+    Fetches every scoreboard date in [start, end] on a bounded worker pool and streams the
+    final scores into batched upserts, one window of dates at a time. A date is checkpointed only
+    once every one of its games is final, so re-running the same range skips finished dates and
+    revisits any with games still in progress, scheduled or postponed.
+    """
+    supabase = supabase or get_store()
+    completed = load_checkpoint(checkpoint_path)
+    dates = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+    todo = [d for d in dates if d.isoformat() not in completed]
+    print(f"📊 Backfilling {len(todo)} of {len(dates)} dates from {start} to {end}...")
+
+    def fetch(target_date):
+        try:
+            return target_date, fetch_espn_results(target_date)
+        except Exception as e:
+            print(f"⚠️ Failed to fetch {target_date}: {e}")
+            return target_date, None
+
+    total_rows, unsettled, failed_dates = 0, 0, []
+    for i in range(0, len(todo), BACKFILL_WINDOW):
+        with metrics.stage("backfill.fetch_window"):
+            window = map_concurrent(fetch, todo[i:i + BACKFILL_WINDOW], max_workers=workers)
+        fetched = [d for d, events in window if events is not None]
+        settled = [d for d, events in window if events is not None and all(is_final(e) for e in events)]
+        failed_dates += [d for d, events in window if events is None]
+        rows = [row for d, events in window if events for row in extract_results([e for e in events if is_final(e)], d)]
+        if rows:
+            with metrics.stage("backfill.upsert", rows=len(rows)):
+                result = push_to_supabase(rows, supabase)
+            if not result.ok:
+                print("❌ Stopping backfill; re-run the same range to resume.")
+                return False
+            total_rows += len(rows)
+        completed.update(d.isoformat() for d in settled)
+        save_checkpoint(completed, checkpoint_path)
+        unsettled += len(fetched) - len(settled)
+        print(f"  -> {min(i + BACKFILL_WINDOW, len(todo))}/{len(todo)} dates done ({total_rows} games written)")
+
+    if unsettled:
+        print(f"  -> {unsettled} date(s) still have games that are not final; they will be fetched again next run.")
+    if failed_dates:
+        print(f"⚠️ {len(failed_dates)} date(s) could not be fetched; re-run the same range to retry them.")
+        return False
+    print(f"✅ Backfill complete: {total_rows} games written.")
+    return True
+
+def main(supabase=None):
     today = datetime.date.today()
     print(f"📊 Fetching MLB results for {today}")
-    events = fetch_espn_results(today)
-    parsed = extract_results(events)
+    with metrics.stage("scores.fetch"):
+        events = fetch_espn_results(today)
+    parsed = extract_results([e for e in events if is_final(e)], today)
     if parsed:
-        push_to_supabase(parsed)
+        with metrics.stage("scores.upsert", rows=len(parsed)):
+            result = push_to_supabase(parsed, supabase)
+        if not result.ok:
+            sys.exit(1)
     else:
         print("⚠️ No results found.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Fetch MLB final scores into the games table.")
+    parser.add_argument("--start", type=datetime.date.fromisoformat, help="Backfill from this date (YYYY-MM-DD)")
+    parser.add_argument("--end", type=datetime.date.fromisoformat, help="Backfill through this date (defaults to yesterday)")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS, help="Concurrent scoreboard requests")
+    args = parser.parse_args()
+    if args.start:
+        end = args.end or datetime.date.today() - datetime.timedelta(days=1)
+        if not backfill(args.start, end, workers=args.workers):
+            sys.exit(1)
+    else:
+        main()
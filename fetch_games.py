@@ -1,18 +1,24 @@
-import os
-import requests
+import sys
+import http_cache
+import metrics
 from datetime import date
-from supabase import create_client
+from utils import get_store
+from bulk_writer import bulk_upsert
+from registry import get_registry
 
-# --- Supabase setup ---
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+def _probable_pitcher(competitor):
+    """Name of the listed probable starter, if ESPN has announced one."""
+    for probable in competitor.get("probables", []):
+        athlete = probable.get("athlete", {})
+        if athlete.get("displayName"):
+            return athlete["displayName"]
+    return None
 
 # --- ESPN endpoint for today’s games ---
 def fetch_espn_games():
-    today = date.today().isoformat()
+    today = date.today().strftime("%Y%m%d")
     url = f"https://site.api.espn.com/apis/site/v2/sports/baseball/mlb/scoreboard?dates={today}"
-    response = requests.get(url)
+    response = http_cache.get(url)
     
     if response.status_code != 200:
         print(f"❌ Failed to fetch games: {response.status_code}")
@@ -20,39 +26,54 @@ def fetch_espn_games():
 
     data = response.json()
     events = data.get("events", [])
+    registry = get_registry(data.get("season", {}).get("year") or date.today().year)
     games = []
 
     for event in events:
         competition = event.get("competitions", [{}])[0]
         competitors = competition.get("competitors", [])
-
-        home_team = next((c["team"]["abbreviation"] for c in competitors if c["homeAway"] == "home"), None)
-        away_team = next((c["team"]["abbreviation"] for c in competitors if c["homeAway"] == "away"), None)
+        home = next((c for c in competitors if c["homeAway"] == "home"), {})
+        away = next((c for c in competitors if c["homeAway"] == "away"), {})
+        home_pitcher, away_pitcher = _probable_pitcher(home), _probable_pitcher(away)
 
         game = {
-            "home_team": home_team,
-            "away_team": away_team,
+            "game_id": event.get("id"),
+            "home_team": home.get("team", {}).get("abbreviation"),
+            "away_team": away.get("team", {}).get("abbreviation"),
+            "home_team_id": registry.resolve("team", home.get("team", {}).get("id")),
+            "away_team_id": registry.resolve("team", away.get("team", {}).get("id")),
+            "home_pitcher_name": home_pitcher,
+            "away_pitcher_name": away_pitcher,
+            # Unknown until fetch_pitcher_stats registers the pitcher; run_model resolves the name later
+            "home_pitcher_id": registry.resolve("pitcher", home_pitcher),
+            "away_pitcher_id": registry.resolve("pitcher", away_pitcher),
             "game_date": date.today().isoformat()
         }
-
         games.append(game)
 
     return games
 
-# --- Insert into Supabase ---
-def insert_games_into_db(games):
+# --- Upsert into Supabase ---
+def insert_games_into_db(games, supabase=None):
     if not games:
         print("⚠️ No games to insert.")
-        return
+        return None
 
-    for game in games:
-        print(f"Inserting: {game}")
-        try:
-            supabase.table("games").insert(game).execute()
-        except Exception as e:
-            print(f"❌ Insert failed: {e}")
+    supabase = supabase or get_store()
+    # Keyed on the ESPN event id, so re-running the same slate updates rows instead of duplicating them
+    result = bulk_upsert(supabase, "games", games, on_conflict="game_id")
+    result.report()
+    return result
 
 # --- Run ---
+def main(supabase=None):
+    with metrics.stage("games.fetch"):
+        games = fetch_espn_games()
+    with metrics.stage("games.upsert", rows=len(games)):
+        result = insert_games_into_db(games, supabase)
+    # A failed chunk must fail the job (and the pipeline's games node), not just print
+    if result is not None and not result.ok:
+        sys.exit(1)
+
 if __name__ == "__main__":
-    games = fetch_espn_games()
-    insert_games_into_db(games)
+    main()
@@ -1,32 +1,27 @@
 # fetch_pitcher_stats.py
-import os
 import sys
+import argparse
 import pandas as pd
 import numpy as np
-from supabase import create_client, Client
-from pybaseball import pitching_stats
-from dotenv import load_dotenv
+import metrics
+from pitching_cache import get_pitching_stats
 from datetime import datetime
-from utils import get_current_season_year # <-- IMPORT THE FIX
+from delta_upsert import delta_upsert
+from snapshots import record_snapshot
+from features import MIN_INNINGS_PITCHED, build_features
+from registry import get_registry
+from utils import get_current_season_year, get_store # <-- IMPORT THE FIX
 
-load_dotenv()
-
-# --- Config ---
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-MIN_INNINGS_PITCHED = 10
-
-def fetch_and_upsert_pitchers():
-    if not SUPABASE_URL or not SUPABASE_KEY:
-        print("❌ Fatal Error: SUPABASE_URL and SUPABASE_KEY secrets must be set.")
-        sys.exit(1)
-
-    SEASON_YEAR = get_current_season_year() # <-- USE THE FIX
+def fetch_and_upsert_pitchers(supabase=None, season=None, full=False):
+    supabase = supabase or get_store()
+    SEASON_YEAR = season or get_current_season_year() # <-- USE THE FIX
     print(f"📊 Fetching pitcher stats for the {SEASON_YEAR} season using pybaseball...")
 
     try:
-        pitchers_df = pitching_stats(SEASON_YEAR)
-        if pitchers_df.empty:
+        with metrics.stage("pitchers.load"):
+            # These rows are written to the database, so a stale leaderboard is refreshed before use
+            pitchers_df = get_pitching_stats(SEASON_YEAR, background=False)
+        if pitchers_df is None or pitchers_df.empty:
             print(f"❌ Error: No pitcher stats data found for {SEASON_YEAR}. Aborting.")
             sys.exit(1)
     except Exception as e:
@@ -42,27 +37,34 @@ def fetch_and_upsert_pitchers():
     filtered_pitchers.replace([np.inf, -np.inf], np.nan, inplace=True)
     records = filtered_pitchers.where(pd.notnull(filtered_pitchers), None).to_dict('records')
 
+    # FanGraphs ids are stable across seasons and name changes, so they become the pitcher key
+    registry = get_registry(SEASON_YEAR)
     final_records = []
     for record in records:
+        registry.add('pitcher', record["IDfg"], record["Name"])
         final_records.append({
-            "name": record["Name"], "team_abbr": record["Team"],
+            "pitcher_id": int(record["IDfg"]), "name": record["Name"],
+            "team_abbr": record["Team"], "team_id": registry.resolve('team', record["Team"]),
             "era": record.get("ERA"), "whip": record.get("WHIP"),
             "k9": record.get("K/9"), "bb9": record.get("BB/9"),
-            "innings_pitched": record.get("IP"), "last_updated": datetime.now().isoformat()
+            "innings_pitched": record.get("IP"), "season": SEASON_YEAR,
+            "last_updated": datetime.now().isoformat()
         })
-        
-    print(f"⬆️ Upserting {len(final_records)} pitchers into Supabase...")
-    try:
-        supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        response = supabase.table("pitchers").upsert(final_records, on_conflict="name").execute()
-        if response.data:
-            print("✅ Pitcher stats upserted successfully.")
-        else:
-            print(f"❌ Supabase Error: {getattr(response, 'error', 'Unknown error')}")
-            sys.exit(1)
-    except Exception as e:
-        print(f"❌ Supabase upsert failed: {e}")
+    registry.save()
+
+    print(f"⬆️ Upserting changed rows among {len(final_records)} pitchers...")
+    with metrics.stage("pitchers.upsert", rows=len(final_records)):
+        result = delta_upsert(supabase, "pitchers", final_records, key=("pitcher_id", "season"), full=full)
+    result.report()
+    if not result.ok:
+        sys.exit(1)
+    record_snapshot("pitchers", SEASON_YEAR, final_records)
+    # The model reads the feature tables, so they must never lag behind the stats just written
+    if not build_features(supabase, SEASON_YEAR):
+        print("❌ Fatal Error: Stats were written but the feature tables could not be rebuilt.")
         sys.exit(1)
 
 if __name__ == "__main__":
-    fetch_and_upsert_pitchers()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="Upsert every row, not just rows whose stats changed")
+    fetch_and_upsert_pitchers(full=parser.parse_args().full)
@@ -1,37 +1,42 @@
 # fetch_results.py
-import os, sys, requests
-from supabase import create_client
-from dotenv import load_dotenv
+import sys
+import http_cache
+import metrics
+from http_client import HEADERS
+from utils import get_store
+from bulk_writer import bulk_upsert
 from datetime import datetime, timedelta
 
-load_dotenv()
-SUPABASE_URL, SUPABASE_KEY = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
-HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'}
-
-def main():
+def main(supabase=None, dry_run=False):
     print("🚀 Starting Daily Results Check...")
-    if not SUPABASE_URL or not SUPABASE_KEY: print("❌ Fatal: Supabase secrets required."), sys.exit(1)
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    if not dry_run: supabase = supabase or get_store()
     yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
     print(f"  -> Fetching results for {yesterday}...")
     try:
         url = f"https://site.api.espn.com/apis/site/v2/sports/baseball/mlb/scoreboard?dates={yesterday}"
-        data = requests.get(url, headers=HEADERS).json()
+        with metrics.stage("results.fetch"):
+            data = http_cache.get(url, headers=HEADERS).json()
         updates = []
         for event in data.get("events", []):
             if event.get("status", {}).get("type", {}).get("name") != "STATUS_FINAL": continue
             comp = event["competitions"][0]
             home = next((c for c in comp["competitors"] if c["homeAway"] == "home"), {}); away = next((c for c in comp["competitors"] if c["homeAway"] == "away"), {})
-            winner = None
-            if home.get('winner'): winner = home.get('team', {}).get('abbreviation')
-            elif away.get('winner'): winner = away.get('team', {}).get('abbreviation')
-            updates.append({'game_id': event.get("id"), 'home_score': int(home.get('score', 0)), 'away_score': int(away.get('score', 0)), 'actual_winner': winner})
+            winner = next((c.get('team', {}) for c in (home, away) if c.get('winner')), {})
+            updates.append({'game_id': event.get("id"), 'home_score': int(home.get('score', 0)), 'away_score': int(away.get('score', 0)),
+                            'actual_winner': winner.get('abbreviation'), 'actual_winner_id': int(winner['id']) if winner.get('id') else None})
         if not updates: print("✅ No final game results found for yesterday."); return
+        if dry_run:
+            for u in updates: print(f"   {u['game_id']}: {u['away_score']}-{u['home_score']} (winner {u['actual_winner']})")
+            return
         print(f"⬆️ Upserting {len(updates)} final game results...")
-        response = supabase.table('games').upsert(updates).execute()
-        if not response.data: raise Exception(getattr(response, 'error', 'Unknown error'))
-        print("✅ Game results updated successfully.")
+        with metrics.stage("results.upsert", rows=len(updates)):
+            result = bulk_upsert(supabase, 'games', updates, on_conflict='game_id')
+        result.report()
+        if not result.ok: sys.exit(1)
     except Exception as e: print(f"❌ Fatal Error fetching results: {e}"), sys.exit(1)
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Record yesterday's final MLB scores.")
+    parser.add_argument("--dry-run", action="store_true", help="Print the results without writing to Supabase")
+    main(dry_run=parser.parse_args().dry_run)
@@ -1,138 +1,121 @@
 # fetch_team_stats.py
-import os
+import re
 import sys
-import requests
+import argparse
+import http_cache
+import metrics
 import pandas as pd
-import numpy as np
-import io  # Required to fix the FutureWarning from pandas
-from supabase import create_client, Client
-from dotenv import load_dotenv
+from functools import partial
 from datetime import datetime
-from utils import get_current_season_year
-
-load_dotenv()
+from http_client import HEADERS, gather
+from delta_upsert import delta_upsert
+from snapshots import record_snapshot
+from features import build_features
+from registry import get_registry
+from utils import get_current_season_year, get_store
 
 # --- Config ---
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'}
-
-def scrape_espn_table(url):
-    """
-    Directly scrapes and cleans HTML tables from a given ESPN stats URL.
-    This version is hardened against common scraping issues.
-    """
+CORE_API = "https://sports.core.api.espn.com/v2/sports/baseball/leagues/mlb"
+TEAMS_PAGE_SIZE = 50
+# (category, ESPN stat name) -> team_stats column, with the column's type
+STAT_COLUMNS = {
+    ('batting', 'gamesPlayed'): ('games_played', 'Int64'),
+    ('batting', 'runs'): ('runs', 'Int64'),
+    ('batting', 'hits'): ('hits', 'Int64'),
+    ('batting', 'homeRuns'): ('home_runs', 'Int64'),
+    ('batting', 'avg'): ('batting_average', 'float64'),
+    ('batting', 'strikeouts'): ('strikeouts_batting', 'Int64'),
+    ('batting', 'walks'): ('walks_batting', 'Int64'),
+    ('pitching', 'ERA'): ('era', 'float64'),
+    ('pitching', 'WHIP'): ('whip', 'float64'),
+    ('fielding', 'errors'): ('errors', 'Int64'),
+}
+_WANTED = {(category, name.lower()): column for (category, name), (column, _) in STAT_COLUMNS.items()}
+_TEAM_REF = re.compile(r"/teams/(\d+)")
+
+def teams_url(season, page=1):
+    return f"{CORE_API}/seasons/{season}/teams?limit={TEAMS_PAGE_SIZE}&page={page}"
+
+def statistics_url(season, team_id):
+    return f"{CORE_API}/seasons/{season}/types/2/teams/{team_id}/statistics"
+
+def list_team_ids(season):
+    """ESPN team ids for a season. The first page reports pageCount; the rest are fetched concurrently."""
+    first = http_cache.get(teams_url(season), headers=HEADERS)
+    first.raise_for_status()
+    first = first.json()
+    pages = [first] + [r.json() for r in http_cache.get_many(
+        [teams_url(season, p) for p in range(2, first.get("pageCount", 1) + 1)], headers=HEADERS)]
+    return [int(m.group(1)) for page in pages for item in page.get("items", [])
+            if (m := _TEAM_REF.search(item.get("$ref", "")))]
+
+def parse_team_statistics(team_id, data):
+    """One team_stats row from a core API statistics document; stats the API omits stay None."""
+    row = {'team_id': team_id}
+    for category in data.get("splits", {}).get("categories", []):
+        cat = category.get("name", "").lower()
+        for stat in category.get("stats", []):
+            column = _WANTED.get((cat, stat.get("name", "").lower()))
+            if column is not None:
+                row[column] = stat.get("value")
+    return row
+
+def fetch_team_statistics(season, team_ids) -> pd.DataFrame:
+    """Fetches every team's season statistics concurrently into a typed frame, one row per team."""
+    responses = http_cache.get_many([statistics_url(season, t) for t in team_ids], headers=HEADERS)
+    rows, failed = [], []
+    for team_id, response in zip(team_ids, responses):
+        if response.status_code != 200:
+            failed.append(team_id)
+            continue
+        rows.append(parse_team_statistics(team_id, response.json()))
+    if failed:
+        print(f"⚠️ No statistics returned for team id(s): {', '.join(map(str, failed))}")
+    df = pd.DataFrame(rows, columns=['team_id'] + [c for c, _ in STAT_COLUMNS.values()])
+    return df.astype({'team_id': 'int64', **{c: t for c, t in STAT_COLUMNS.values()}})
+
+def fetch_and_upsert_team_stats(supabase=None, season=None, full=False):
+    supabase = supabase or get_store()
     try:
-        response = requests.get(url, headers=HEADERS, timeout=15)
-        response.raise_for_status()
-        
-        # Use io.StringIO to address the FutureWarning
-        tables = pd.read_html(io.StringIO(response.text))
-        
-        if len(tables) < 2:
-            raise ValueError("Expected at least two stats tables (AL/NL), but found fewer.")
-        
-        # Combine the primary stats tables (usually the first two)
-        df = pd.concat([tables[0], tables[1]], ignore_index=True)
-        
-        # --- ROBUSTNESS FIX #1: Filter out repeating header rows ---
-        # The first column name changes, so we access it by position
-        first_col_name = df.columns[0]
-        # Remove any rows where the first column is the header text again (e.g., 'Team')
-        df = df[df[first_col_name] != first_col_name]
-        
-        return df
-    except Exception as e:
-        print(f"❌ Failed to scrape or parse URL {url}: {e}")
-        return None
-
-def fetch_and_upsert_team_stats():
-    if not SUPABASE_URL or not SUPABASE_KEY:
-        print("❌ Fatal Error: SUPABASE_URL and SUPABASE_KEY secrets must be set.")
+        SEASON_YEAR = season or get_current_season_year()
+    except Exception:
         sys.exit(1)
 
+    print(f"📊 Fetching team stats for the {SEASON_YEAR} season from the ESPN API...")
     try:
-        SEASON_YEAR = get_current_season_year()
-    except Exception:
+        with metrics.stage("team_stats.fetch"):
+            team_ids, registry = gather(partial(list_team_ids, SEASON_YEAR), partial(get_registry, SEASON_YEAR))
+            final_df = fetch_team_statistics(SEASON_YEAR, team_ids)
+    except Exception as e:
+        print(f"❌ Fatal Error: Failed to fetch team stats: {e}")
         sys.exit(1)
 
-    BATTING_URL = f"https://www.espn.com/mlb/stats/team/_/season/{SEASON_YEAR}"
-    PITCHING_URL = f"https://www.espn.com/mlb/stats/team/_/view/pitching/season/{SEASON_YEAR}"
-    FIELDING_URL = f"https://www.espn.com/mlb/stats/team/_/view/fielding/season/{SEASON_YEAR}"
-
-    print(f"📊 Scraping web pages for {SEASON_YEAR} season stats...")
-    
-    batting_df = scrape_espn_table(BATTING_URL)
-    pitching_df = scrape_espn_table(PITCHING_URL)
-    fielding_df = scrape_espn_table(FIELDING_URL)
-
-    if batting_df is None or pitching_df is None or fielding_df is None:
-        print("❌ Fatal Error: Failed to scrape one or more stat categories. Aborting.")
+    if final_df.empty:
+        print("❌ Fatal Error: The API returned no team stats. Aborting.")
         sys.exit(1)
 
-    print("  -> Cleaning and merging scraped data...")
-    # Rename the first column consistently
-    batting_df = batting_df.rename(columns={batting_df.columns[0]: 'TeamNameRaw'})
-    pitching_df = pitching_df.rename(columns={pitching_df.columns[0]: 'TeamNameRaw'})
-    fielding_df = fielding_df.rename(columns={fielding_df.columns[0]: 'TeamNameRaw'})
-
-    # --- THE DIRECT FIX for the AttributeError ---
-    # 1. Convert the entire column to string type. This prevents the crash.
-    #    NaNs and other types become string representations (e.g., 'nan').
-    batting_df['TeamNameRaw'] = batting_df['TeamNameRaw'].astype(str)
-    # 2. Use a more robust regex to remove the trailing abbreviation.
-    #    This will not fail on 'nan' or other unexpected strings.
-    batting_df['TeamName'] = batting_df['TeamNameRaw'].str.replace(r'[A-Z]{2,3}$', '', regex=True).str.strip()
-    
-    # Do the same for the other dataframes for consistency
-    pitching_df['TeamName'] = pitching_df['TeamNameRaw'].astype(str).str.replace(r'[A-Z]{2,3}$', '', regex=True).str.strip()
-    fielding_df['TeamName'] = fielding_df['TeamNameRaw'].astype(str).str.replace(r'[A-Z]{2,3}$', '', regex=True).str.strip()
-
-    # Select and merge essential columns
-    batting_essentials = batting_df[['TeamName', 'GP', 'R', 'H', 'HR', 'AVG', 'SO', 'BB']]
-    pitching_essentials = pitching_df[['TeamName', 'ERA', 'WHIP']]
-    fielding_essentials = fielding_df[['TeamName', 'E']]
-
-    merged_1 = pd.merge(batting_essentials, pitching_essentials, on='TeamName', how='inner')
-    final_df = pd.merge(merged_1, fielding_essentials, on='TeamName', how='inner')
-
-    # Map team names to abbreviations
-    try:
-        team_data_url = "https://site.api.espn.com/apis/site/v2/sports/baseball/mlb/teams"
-        team_map_resp = requests.get(team_data_url, headers=HEADERS, timeout=10)
-        team_map_resp.raise_for_status()
-        teams_json = team_map_resp.json()['sports'][0]['leagues'][0]['teams']
-        team_abbr_map = {team_info['team']['displayName']: team_info['team']['abbreviation'] for team_info in teams_json}
-        final_df['team_abbr'] = final_df['TeamName'].map(team_abbr_map)
-    except Exception as e:
-        print(f"❌ Could not create team abbreviation map: {e}")
-        sys.exit(1)
-        
+    # ESPN ids are the registry's team ids, so no name matching is needed; the label is the abbreviation
+    final_df['team_abbr'] = final_df['team_id'].map(lambda team_id: registry.label('team', team_id))
     final_df.dropna(subset=['team_abbr'], inplace=True)
-    
-    final_df = final_df.rename(columns={
-        'GP': 'games_played', 'R': 'runs', 'H': 'hits', 'HR': 'home_runs', 'AVG': 'batting_average',
-        'SO': 'strikeouts_batting', 'BB': 'walks_batting', 'E': 'errors'
-    })
-
-    # Sanitize for JSON compatibility
-    final_df.replace([np.inf, -np.inf], np.nan, inplace=True)
-    final_records = final_df.where(pd.notnull(final_df), None).to_dict('records')
+    final_df = final_df.astype(object).where(pd.notnull(final_df), None)
+    final_records = final_df.to_dict('records')
     for record in final_records:
+        record['season'] = SEASON_YEAR
         record['last_updated'] = datetime.now().isoformat()
 
-    print(f"⬆️ Upserting {len(final_records)} teams' complete stats into Supabase...")
-    try:
-        supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        response = supabase.table("team_stats").upsert(final_records, on_conflict="team_abbr").execute()
-        if response.data:
-            print("✅ Team stats upserted successfully.")
-        else:
-            print(f"❌ Supabase Error: {getattr(response, 'error', 'Unknown error')}")
-            sys.exit(1)
-    except Exception as e:
-        print(f"❌ Supabase upsert failed: {e}")
+    print(f"⬆️ Upserting changed rows among {len(final_records)} teams' complete stats...")
+    with metrics.stage("team_stats.upsert", rows=len(final_records)):
+        result = delta_upsert(supabase, "team_stats", final_records, key=("team_id", "season"), full=full)
+    result.report()
+    if not result.ok:
+        sys.exit(1)
+    record_snapshot("team_stats", SEASON_YEAR, final_records)
+    # The model reads the feature tables, so they must never lag behind the stats just written
+    if not build_features(supabase, SEASON_YEAR):
+        print("❌ Fatal Error: Stats were written but the feature tables could not be rebuilt.")
         sys.exit(1)
 
 if __name__ == "__main__":
-    fetch_and_upsert_team_stats()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="Upsert every row, not just rows whose stats changed")
+    fetch_and_upsert_team_stats(full=parser.parse_args().full)
@@ -0,0 +1,345 @@
+# form.py
+"""
+Rolling last-7/14/30-day form for teams (runs scored/allowed per game, win rate) and pitchers
+(ERA, WHIP, innings), built from game-level results.
+
+Form "as of" a date only uses results from before that date, so it can be joined onto that
+day's games. Day-to-day updates are incremental: each new day's totals are added to every
+window and the day falling out of it subtracted, so nothing rescans history. Backfills compute
+every as-of date at once from cumulative sums, which is the same arithmetic vectorized.
+
+    python form.py                                   # bring form up to date through yesterday
+    python form.py --backfill 2022-03-01 --through 2024-11-01  # rebuild state and history
+"""
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+import metrics
+from datetime import date, timedelta
+from bulk_writer import bulk_upsert
+from table_reader import read_table
+from registry import get_registry
+from pitching_cache import get_pitching_stats
+from utils import get_store
+
+# --- Config ---
+WINDOWS = (7, 14, 30)
+STATE_DIR = os.path.join(".cache", "form")
+LINES_DIR = os.path.join(".cache", "pitcher_lines")
+TEAM_FORM_TABLE = "team_form"
+PITCHER_FORM_TABLE = "pitcher_form"
+TEAM_VALUES = ['games', 'wins', 'runs_scored', 'runs_allowed']
+PITCHER_VALUES = ['appearances', 'outs', 'earned_runs', 'hits', 'walks']
+GAME_COLUMNS = ['game_date', 'home_team_id', 'away_team_id', 'home_score', 'away_score']
+
+# Seasons whose FanGraphs pitchers have been added to the registry by this process
+_registered_seasons = set()
+
+# --- Daily totals ---
+def team_daily_totals(games_df: pd.DataFrame) -> pd.DataFrame:
+    """One row per (date, team_id) with games, wins and runs scored/allowed on that day."""
+    g = games_df.dropna(subset=GAME_COLUMNS)
+    sides = []
+    for side, other in (('home', 'away'), ('away', 'home')):
+        sides.append(pd.DataFrame({'date': pd.to_datetime(g['game_date']), 'team_id': g[f'{side}_team_id'].astype(int),
+                                   'runs_scored': g[f'{side}_score'].astype(int), 'runs_allowed': g[f'{other}_score'].astype(int)}))
+    log = pd.concat(sides, ignore_index=True)
+    log['games'] = 1
+    log['wins'] = (log['runs_scored'] > log['runs_allowed']).astype(int)
+    return log.groupby(['date', 'team_id'], as_index=False)[TEAM_VALUES].sum()
+
+def innings_to_outs(ip) -> pd.Series:
+    """Baseball-Reference writes 5 1/3 innings as 5.1."""
+    ip = pd.to_numeric(ip, errors='coerce').fillna(0)
+    whole = np.floor(ip)
+    return (whole * 3 + np.round((ip - whole) * 10)).astype(int)
+
+def fetch_pitcher_lines(day: date) -> pd.DataFrame:
+    """
+    Every pitcher's line for one day from pybaseball.pitching_stats_range, cached as one Arrow
+    file per finished day. Baseball-Reference throttles aggressive clients, so backfills fetch
+    days one at a time and only the days that had games.
+    """
+    path = os.path.join(LINES_DIR, f"{day.isoformat()}.arrow")
+    if os.path.exists(path):
+        return feather.read_feather(path)
+    from pybaseball import pitching_stats_range  # heavy import, only paid on a cache miss
+    try:
+        df = pitching_stats_range(day.isoformat())[['Name', 'IP', 'ER', 'H', 'BB']]
+    except (IndexError, KeyError, ValueError):
+        df = pd.DataFrame(columns=['Name', 'IP', 'ER', 'H', 'BB'])  # no games that day
+    if day < date.today():
+        os.makedirs(LINES_DIR, exist_ok=True)
+        feather.write_feather(df.reset_index(drop=True).astype({'Name': 'string'}), f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+    return df
+
+def register_season_pitchers(season):
+    """
+    Adds a season's FanGraphs pitchers to that season's registry. fetch_pitcher_stats.py only
+    registers the current season, so without this a backfill of past seasons resolves no one.
+    """
+    if season in _registered_seasons:
+        return
+    registry = get_registry(season)
+    try:
+        pitchers_df = get_pitching_stats(season)
+    except Exception as e:
+        pitchers_df = None
+        print(f"⚠️ Could not load {season} pitchers to register ({e}).")
+    if pitchers_df is None or pitchers_df.empty:
+        return
+    for pitcher_id, name in zip(pitchers_df['IDfg'], pitchers_df['Name']):
+        registry.add('pitcher', pitcher_id, name)
+    registry.save()
+    _registered_seasons.add(season)
+
+def pitcher_daily_totals(lines_df: pd.DataFrame, day: date) -> pd.DataFrame:
+    """One row per (date, pitcher_id); pitchers the registry does not know are dropped."""
+    ids = get_registry(day.year).resolve_series('pitcher', lines_df['Name'].astype(object))
+    out = pd.DataFrame({'date': pd.Timestamp(day), 'pitcher_id': ids, 'appearances': 1,
+                        'outs': innings_to_outs(lines_df['IP']),
+                        'earned_runs': pd.to_numeric(lines_df['ER'], errors='coerce').fillna(0).astype(int),
+                        'hits': pd.to_numeric(lines_df['H'], errors='coerce').fillna(0).astype(int),
+                        'walks': pd.to_numeric(lines_df['BB'], errors='coerce').fillna(0).astype(int)})
+    out = out.dropna(subset=['pitcher_id'])
+    out['pitcher_id'] = out['pitcher_id'].astype(int)
+    return out.groupby(['date', 'pitcher_id'], as_index=False)[PITCHER_VALUES].sum()
+
+# --- Derived features ---
+def _ratio(num, den, scale=1.0):
+    return (scale * num / den.where(den > 0)).astype(float)
+
+def derive_features(kind, sums: dict) -> pd.DataFrame:
+    """Per-entity form features from {window: frame of summed values}."""
+    out = {}
+    for w, s in sums.items():
+        if kind == 'team':
+            out[f'games_{w}'] = s['games']
+            out[f'runs_scored_pg_{w}'] = _ratio(s['runs_scored'], s['games'])
+            out[f'runs_allowed_pg_{w}'] = _ratio(s['runs_allowed'], s['games'])
+            out[f'win_rate_{w}'] = _ratio(s['wins'], s['games'])
+        else:
+            out[f'ip_{w}'] = s['outs'] / 3
+            out[f'era_{w}'] = _ratio(s['earned_runs'], s['outs'], 27)
+            out[f'whip_{w}'] = _ratio(s['hits'] + s['walks'], s['outs'], 3)
+    return pd.DataFrame(out).fillna({f'games_{w}': 0 for w in sums} if kind == 'team' else {f'ip_{w}': 0 for w in sums})
+
+# --- Rolling state ---
+class RollingForm:
+    """
+    Running window sums per entity. add_day() is O(entities active in the window): it adds the
+    new day's totals and subtracts the day that leaves each window. Only the last max(windows)
+    days of totals are retained, so the state stays the same size however long it runs.
+    """
+    def __init__(self, kind, windows=WINDOWS):
+        self.kind = kind
+        self.key = 'team_id' if kind == 'team' else 'pitcher_id'
+        self.values = TEAM_VALUES if kind == 'team' else PITCHER_VALUES
+        self.windows = tuple(windows)
+        self.days = {}  # Timestamp -> that day's totals, indexed by key
+        self.sums = {w: self._empty() for w in self.windows}
+        self.last_day = None
+
+    def _empty(self):
+        return pd.DataFrame(columns=self.values, index=pd.Index([], name=self.key), dtype='int64')
+
+    def _step(self, day, totals):
+        if not totals.empty:
+            self.days[day] = totals
+        for w in self.windows:
+            s = self.sums[w]
+            if not totals.empty:
+                s = s.add(totals, fill_value=0)
+            leaving = self.days.get(day - pd.Timedelta(days=w))
+            if leaving is not None:
+                s = s.sub(leaving, fill_value=0)
+            self.sums[w] = s[(s != 0).any(axis=1)].astype('int64')
+        horizon = day - pd.Timedelta(days=max(self.windows) - 1)
+        self.days = {d: t for d, t in self.days.items() if d >= horizon}
+        self.last_day = day
+
+    def add_day(self, day, daily: pd.DataFrame):
+        """Adds one day's totals (rows for that date only); calendar days skipped in between still age out."""
+        day = pd.Timestamp(day)
+        if self.last_day is not None and day <= self.last_day:
+            raise ValueError(f"{self.kind} form already includes {day.date()}")
+        totals = daily.set_index(self.key)[self.values] if not daily.empty else self._empty()
+        d = day if self.last_day is None else self.last_day + pd.Timedelta(days=1)
+        while d < day:
+            self._step(d, self._empty())
+            d += pd.Timedelta(days=1)
+        self._step(day, totals)
+
+    def features(self) -> pd.DataFrame:
+        """Form as of the day after last_day, one row per entity with anything in its longest window."""
+        out = derive_features(self.kind, self.sums)
+        out.index.name = self.key
+        return out
+
+    def backfill(self, daily: pd.DataFrame, start, end) -> pd.DataFrame:
+        """
+        Replaces the state with [start, end] and returns the form as of every date from start+1
+        to end+1 in one long frame (as_of_date, key, features). Window sums for all dates come from
+        one cumulative sum over a (days x entities x values) array.
+        """
+        days = pd.date_range(start, end)
+        daily = daily[(daily['date'] >= days[0]) & (daily['date'] <= days[-1])]
+        entities = np.sort(daily[self.key].unique())
+        cube = np.stack([daily.pivot_table(index='date', columns=self.key, values=v, aggfunc='sum')
+                         .reindex(index=days, columns=entities, fill_value=0).fillna(0).to_numpy(dtype=np.int64)
+                         for v in self.values], axis=2)
+        cum = np.concatenate([np.zeros((1,) + cube.shape[1:], dtype=np.int64), cube.cumsum(axis=0)])
+        t = np.arange(1, len(days) + 1)
+        window_sums = {w: cum[t] - cum[np.maximum(t - w, 0)] for w in self.windows}
+
+        # Long history, keeping only (date, entity) pairs with something in the longest window
+        active = (window_sums[max(self.windows)] != 0).any(axis=2)
+        di, ei = np.nonzero(active)
+        index = pd.MultiIndex.from_arrays([days[di] + pd.Timedelta(days=1), entities[ei]], names=['as_of_date', self.key])
+        history = derive_features(self.kind, {w: pd.DataFrame(s[di, ei], index=index, columns=self.values)
+                                              for w, s in window_sums.items()})
+
+        self.sums = {}
+        for w, s in window_sums.items():
+            last = pd.DataFrame(s[-1], index=pd.Index(entities, name=self.key), columns=self.values)
+            self.sums[w] = last[(last != 0).any(axis=1)]
+        horizon = days[-1] - pd.Timedelta(days=max(self.windows) - 1)
+        self.days = {d: g.set_index(self.key)[self.values] for d, g in daily[daily['date'] >= horizon].groupby('date')}
+        self.last_day = days[-1]
+        return history.reset_index()
+
+    def path(self):
+        return os.path.join(STATE_DIR, f"{self.kind}_form.pkl")
+
+    def save(self):
+        os.makedirs(STATE_DIR, exist_ok=True)
+        pd.to_pickle({'windows': self.windows, 'days': self.days, 'sums': self.sums, 'last_day': self.last_day},
+                     f"{self.path()}.tmp")
+        os.replace(f"{self.path()}.tmp", self.path())
+
+    @classmethod
+    def load(cls, kind):
+        form = cls(kind)
+        try:
+            state = pd.read_pickle(form.path())
+        except (OSError, ValueError, EOFError):
+            return None
+        if tuple(state['windows']) != form.windows:
+            return None  # window set changed; the caller rebuilds with a backfill
+        form.days, form.sums, form.last_day = state['days'], state['sums'], state['last_day']
+        return form
+
+# --- Driver ---
+def _records(history, as_of_col='as_of_date'):
+    history = history.copy()
+    history[as_of_col] = pd.to_datetime(history[as_of_col]).dt.strftime('%Y-%m-%d')
+    history = history.astype(object).where(pd.notnull(history), None)
+    return history.to_dict('records')
+
+def _write(supabase, table, history, key):
+    if history.empty:
+        return True
+    with metrics.stage("form.upsert", table=table, rows=len(history)):
+        result = bulk_upsert(supabase, table, _records(history), on_conflict=f"{key},as_of_date")
+    result.report()
+    return result.ok
+
+def _daily_inputs(supabase, first, last):
+    games_df = read_table(supabase, "games", GAME_COLUMNS, order="game_id", filters=[
+        ("gte", "game_date", first.isoformat()), ("lte", "game_date", last.isoformat()), ("gte", "home_score", 0)])
+    team_daily = team_daily_totals(games_df) if not games_df.empty else pd.DataFrame(columns=['date', 'team_id'] + TEAM_VALUES)
+    game_days = sorted({d.date() for d in team_daily['date']})
+    print(f"  -> {len(games_df)} games on {len(game_days)} days; loading pitcher lines...")
+    for season in sorted({d.year for d in game_days}):
+        register_season_pitchers(season)
+    lines = [(d, fetch_pitcher_lines(d)) for d in game_days]
+    pitcher_daily = [pitcher_daily_totals(lines_df, d) for d, lines_df in lines]
+    pitcher_daily = pd.concat(pitcher_daily, ignore_index=True) if pitcher_daily else pd.DataFrame(columns=['date', 'pitcher_id'] + PITCHER_VALUES)
+    # Every line counts as one appearance, so whatever is missing from the totals went unresolved
+    total_lines = sum(len(lines_df) for _, lines_df in lines)
+    unresolved = total_lines - int(pitcher_daily['appearances'].sum())
+    if unresolved:
+        print(f"⚠️ {unresolved} of {total_lines} pitcher lines matched no registered pitcher and were left out of pitcher form.")
+    return team_daily, pitcher_daily
+
+def update_form(supabase=None, through=None, backfill_start=None) -> bool:
+    """
+    Advances team and pitcher form through `through` (default yesterday) and writes the new
+    as-of rows to team_form/pitcher_form. Without saved state, or with backfill_start, the
+    state and history are rebuilt from backfill_start (default March 1 of through's year).
+    """
+    supabase = supabase or get_store()
+    through = through or date.today() - timedelta(days=1)
+    forms = {kind: RollingForm.load(kind) for kind in ('team', 'pitcher')}
+    stale = any(f is None for f in forms.values()) or len({f.last_day for f in forms.values()}) > 1
+
+    if backfill_start or stale:
+        start = backfill_start or date(through.year, 3, 1)
+        print(f"📈 Backfilling form from {start} through {through}...")
+        with metrics.stage("form.read"):
+            team_daily, pitcher_daily = _daily_inputs(supabase, start, through)
+        forms = {kind: RollingForm(kind) for kind in ('team', 'pitcher')}
+        with metrics.stage("form.backfill"):
+            team_history = forms['team'].backfill(team_daily, start, through)
+            pitcher_history = forms['pitcher'].backfill(pitcher_daily, start, through)
+    else:
+        first = (forms['team'].last_day + pd.Timedelta(days=1)).date()
+        if first > through:
+            print(f"✅ Form is already up to date through {through}.")
+            return True
+        print(f"📈 Advancing form from {first} through {through}...")
+        with metrics.stage("form.read"):
+            team_daily, pitcher_daily = _daily_inputs(supabase, first, through)
+        team_rows, pitcher_rows = [], []
+        with metrics.stage("form.advance"):
+            for day in pd.date_range(first, through):
+                forms['team'].add_day(day, team_daily[team_daily['date'] == day])
+                forms['pitcher'].add_day(day, pitcher_daily[pitcher_daily['date'] == day])
+                as_of = day + pd.Timedelta(days=1)
+                team_rows.append(forms['team'].features().reset_index().assign(as_of_date=as_of))
+                pitcher_rows.append(forms['pitcher'].features().reset_index().assign(as_of_date=as_of))
+        team_history, pitcher_history = pd.concat(team_rows, ignore_index=True), pd.concat(pitcher_rows, ignore_index=True)
+
+    ok = _write(supabase, TEAM_FORM_TABLE, team_history, 'team_id') and _write(supabase, PITCHER_FORM_TABLE, pitcher_history, 'pitcher_id')
+    if ok:
+        # State only moves forward once its rows are stored, so a failed write is redone next run
+        for form in forms.values():
+            form.save()
+    return ok
+
+def load_form(supabase, start_date, end_date):
+    """team_form and pitcher_form rows with as_of_date in [start_date, end_date]."""
+    filters = [("gte", "as_of_date", start_date), ("lte", "as_of_date", end_date)]
+    # (id, as_of_date) is each table's upsert key, so paging on it neither repeats nor skips rows
+    return (read_table(supabase, TEAM_FORM_TABLE, filters=filters, order=["team_id", "as_of_date"]),
+            read_table(supabase, PITCHER_FORM_TABLE, filters=filters, order=["pitcher_id", "as_of_date"]))
+
+def attach_form(games_df, team_form_df, pitcher_form_df):
+    """
+    Joins each side's team form (home_/away_ prefix) and starter form (home_sp_/away_sp_ prefix)
+    onto games by game_date == as_of_date.
+    """
+    out = games_df
+    for side in ('home', 'away'):
+        for form_df, key, game_key, prefix in ((team_form_df, 'team_id', f'{side}_team_id', f'{side}_'),
+                                               (pitcher_form_df, 'pitcher_id', f'{side}_pitcher_id', f'{side}_sp_')):
+            if form_df.empty or game_key not in out.columns:
+                continue
+            cols = [c for c in form_df.columns if c not in (key, 'as_of_date')]
+            side_df = form_df[['as_of_date', key] + cols].rename(
+                columns={'as_of_date': 'game_date', key: game_key, **{c: f'{prefix}{c}' for c in cols}})
+            side_df[game_key] = side_df[game_key].astype('Int64')
+            out = out.merge(side_df, on=['game_date', game_key], how='left')
+    return out
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update rolling 7/14/30-day team and pitcher form.")
+    parser.add_argument("--through", type=date.fromisoformat, help="Last day of results to include (defaults to yesterday)")
+    parser.add_argument("--backfill", type=date.fromisoformat, metavar="START", help="Rebuild from this date instead of advancing")
+    args = parser.parse_args()
+    if not update_form(through=args.through, backfill_start=args.backfill):
+        sys.exit(1)
@@ -0,0 +1,177 @@
+# http_cache.py
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import requests
+import http_client
+import metrics
+from urllib.parse import urlparse
+
+# --- Config ---
+CACHE_PATH = os.getenv("WAGERINDEX_HTTP_CACHE", os.path.join(".cache", "http_cache.sqlite"))
+MAX_CACHE_BYTES = int(os.getenv("WAGERINDEX_HTTP_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# Directory of recorded responses. When set, every request is served from it and the network is never touched.
+REPLAY_DIR = os.getenv("WAGERINDEX_HTTP_REPLAY")
+# Directory to write every live response into, so it can be replayed later.
+RECORD_DIR = os.getenv("WAGERINDEX_HTTP_RECORD")
+DEFAULT_TTL = 10 * 60
+
+# First matching pattern wins. Scoreboards change during games, the team list almost never does.
+TTL_RULES = [
+    (re.compile(r"/scoreboard\?dates="), 5 * 60),
+    (re.compile(r"/scoreboard$"), 60 * 60),
+    (re.compile(r"/mlb/teams$"), 24 * 60 * 60),
+    (re.compile(r"/seasons/\d+/types/\d+/teams"), 60 * 60),
+    (re.compile(r"/seasons/\d+/teams\?"), 24 * 60 * 60),
+]
+
+_local = threading.local()
+
+class CachedResponse:
+    """The subset of requests.Response the fetchers use, backed by a cache row or a live response."""
+    def __init__(self, url, status_code, headers, content, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+def ttl_for(url):
+    for pattern, ttl in TTL_RULES:
+        if pattern.search(url):
+            return ttl
+    return DEFAULT_TTL
+
+def _key(url):
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+def _connect():
+    # One connection per thread and per process; sqlite handles cross-process locking.
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid():
+        return conn
+    os.makedirs(os.path.dirname(CACHE_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS responses (
+            url TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB,
+            etag TEXT, last_modified TEXT, expires_at REAL, last_access REAL, size INTEGER)
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+    _local.conn, _local.pid = conn, os.getpid()
+    return conn
+
+def _load(url):
+    row = _connect().execute(
+        "SELECT status, headers, body, etag, last_modified, expires_at FROM responses WHERE url = ?", (url,)).fetchone()
+    if row is None:
+        return None
+    status, headers, body, etag, last_modified, expires_at = row
+    return {"status": status, "headers": json.loads(headers), "body": body,
+            "etag": etag, "last_modified": last_modified, "expires_at": expires_at}
+
+def _store(url, status, headers, body, ttl):
+    now = time.time()
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, status, json.dumps(headers), body, headers.get("ETag"), headers.get("Last-Modified"),
+             now + ttl, now, len(body)))
+        _evict(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def _evict(conn):
+    """Drops least-recently-used entries until the cache fits under MAX_CACHE_BYTES."""
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    if total <= MAX_CACHE_BYTES:
+        return
+    for url, size in conn.execute("SELECT url, size FROM responses ORDER BY last_access").fetchall():
+        conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+        total -= size
+        if total <= MAX_CACHE_BYTES:
+            break
+
+def _touch(url, ttl=None):
+    if ttl is None:
+        _connect().execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+    else:
+        now = time.time()
+        _connect().execute("UPDATE responses SET last_access = ?, expires_at = ? WHERE url = ?", (now, now + ttl, url))
+
+def _replay(url):
+    path = os.path.join(REPLAY_DIR, f"{_key(url)}.json")
+    if not os.path.exists(path):
+        raise requests.ConnectionError(f"No recorded response for {url} in {REPLAY_DIR}")
+    with open(path, encoding="utf-8") as f:
+        rec = json.load(f)
+    return CachedResponse(url, rec["status"], rec["headers"], rec["body"].encode("utf-8"), from_cache=True)
+
+def _record(url, response):
+    os.makedirs(RECORD_DIR, exist_ok=True)
+    with open(os.path.join(RECORD_DIR, f"{_key(url)}.json"), "w", encoding="utf-8") as f:
+        json.dump({"url": url, "status": response.status_code, "headers": response.headers, "body": response.text}, f)
+
+def get(url, headers=None, timeout=None, ttl=None):
+    """
+    Cached drop-in for requests.get. Fresh entries are served without touching the network,
+    stale ones are revalidated with ETag/Last-Modified, and only 200 responses are stored.
+    """
+    if REPLAY_DIR:
+        metrics.record_cache_hit(urlparse(url).netloc)
+        return _replay(url)
+
+    ttl = ttl_for(url) if ttl is None else ttl
+    cached = _load(url)
+    if cached and cached["expires_at"] > time.time():
+        _touch(url)
+        metrics.record_cache_hit(urlparse(url).netloc)
+        return CachedResponse(url, cached["status"], cached["headers"], cached["body"], from_cache=True)
+
+    request_headers = dict(headers or {})
+    if cached:
+        if cached["etag"]:
+            request_headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            request_headers["If-Modified-Since"] = cached["last_modified"]
+
+    live = http_client.get(url, headers=request_headers, timeout=timeout)
+    if live.status_code == 304 and cached:
+        _touch(url, ttl)
+        response = CachedResponse(url, cached["status"], cached["headers"], cached["body"], from_cache=True)
+    else:
+        response_headers = {k: live.headers[k] for k in ("ETag", "Last-Modified", "Content-Type") if k in live.headers}
+        response = CachedResponse(url, live.status_code, response_headers, live.content)
+        if live.status_code == 200:
+            _store(url, live.status_code, response_headers, live.content, ttl)
+
+    if RECORD_DIR:
+        _record(url, response)
+    return response
+
+def get_many(urls, headers=None, timeout=None):
+    """Fetches several URLs concurrently through the cache; results come back in input order."""
+    return http_client.map_concurrent(lambda url: get(url, headers=headers, timeout=timeout), urls)
+
+def clear():
+    _connect().execute("DELETE FROM responses")
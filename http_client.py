@@ -0,0 +1,116 @@
+# http_client.py
+import os
+import time
+import random
+import threading
+import requests
+import metrics
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+# --- Config ---
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'}
+DEFAULT_TIMEOUT = (5, 15)  # (connect, read) seconds
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 10.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_WORKERS = int(os.getenv("WAGERINDEX_HTTP_WORKERS", 8))
+# Requests per second and burst size per host; anything not listed uses DEFAULT_RATE_LIMIT.
+HOST_RATE_LIMITS = {
+    "site.api.espn.com": (5.0, 10),
+    # Team stats fan out to one request per team, so this host allows a full 30-team burst
+    "sports.core.api.espn.com": (10.0, 30),
+    "www.espn.com": (2.0, 4),
+}
+DEFAULT_RATE_LIMIT = (5.0, 10)
+
+class TokenBucket:
+    """Classic token bucket: refills at `rate` tokens/sec up to `capacity`, acquire() blocks until one is free."""
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+_session = None
+_session_lock = threading.Lock()
+_buckets = {}
+
+def get_session() -> requests.Session:
+    """One keep-alive session per process, with a connection pool large enough for MAX_WORKERS."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=MAX_WORKERS)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+def _bucket_for(host):
+    with _session_lock:
+        if host not in _buckets:
+            _buckets[host] = TokenBucket(*HOST_RATE_LIMITS.get(host, DEFAULT_RATE_LIMIT))
+        return _buckets[host]
+
+def _backoff(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_CAP)
+        except ValueError:
+            pass
+    # "Full jitter": uniform over the exponential window so parallel workers do not retry in lockstep
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+def get(url, headers=None, timeout=None) -> requests.Response:
+    """
+    GET through the shared session with the per-host rate limit applied.
+    429/5xx responses and connection errors are retried with jittered backoff;
+    the last response (or error) is returned/raised once retries run out.
+    """
+    host = urlparse(url).netloc
+    bucket = _bucket_for(host)
+    session = get_session()
+    for attempt in range(MAX_RETRIES + 1):
+        bucket.acquire()
+        start = time.perf_counter()
+        try:
+            response = session.get(url, headers=headers, timeout=timeout or DEFAULT_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout):
+            metrics.record_http(host, seconds=time.perf_counter() - start, error=True)
+            if attempt == MAX_RETRIES:
+                raise
+            time.sleep(_backoff(attempt))
+            continue
+        metrics.record_http(host, len(response.content), time.perf_counter() - start, error=response.status_code >= 400)
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return response
+        time.sleep(_backoff(attempt, response.headers.get("Retry-After")))
+
+def map_concurrent(fn, items, max_workers=None):
+    """Runs fn over items on a thread pool and returns the results in input order."""
+    items = list(items)
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers or MAX_WORKERS, len(items))) as pool:
+        return list(pool.map(fn, items))
+
+def gather(*tasks, max_workers=None):
+    """Runs zero-argument callables concurrently and returns their results in order."""
+    return map_concurrent(lambda task: task(), tasks, max_workers=max_workers)
@@ -0,0 +1,155 @@
+# live_scores.py
+"""
+Long-running scoreboard watcher: polls ESPN while games are on and pushes only the games whose
+score or status changed since the previous poll.
+
+    python live_scores.py             # run until SIGINT/SIGTERM
+    python live_scores.py --once      # one poll, then exit
+    python live_scores.py --dry-run   # print changes instead of writing them
+"""
+import sys
+import signal
+import asyncio
+import argparse
+from datetime import date, datetime, timedelta, timezone
+import http_client
+import metrics
+from bulk_writer import bulk_upsert
+from utils import get_store
+
+# --- Config ---
+SCOREBOARD_URL = "https://site.api.espn.com/apis/site/v2/sports/baseball/mlb/scoreboard?dates={}"
+LIVE_INTERVAL = 30             # seconds between polls while any game is in progress
+MIN_PREGAME_INTERVAL = 60      # before first pitch, sleep until the earliest start, within these bounds
+MAX_PREGAME_INTERVAL = 15 * 60
+IDLE_INTERVAL = 30 * 60        # nothing scheduled or everything final
+MAX_ERROR_INTERVAL = 10 * 60   # failed polls back off exponentially up to this
+
+def parse_event(event):
+    """The columns the watcher tracks for one scoreboard event, plus its state and start time."""
+    comp = event.get("competitions", [{}])[0]
+    status = event.get("status", {})
+    status_type = status.get("type", {})
+    competitors = comp.get("competitors", [])
+    home = next((c for c in competitors if c.get("homeAway") == "home"), {})
+    away = next((c for c in competitors if c.get("homeAway") == "away"), {})
+    row = {
+        'game_id': event.get("id"),
+        'home_score': int(home["score"]) if home.get("score") not in (None, "") else None,
+        'away_score': int(away["score"]) if away.get("score") not in (None, "") else None,
+        'status': status_type.get("name"),
+        'inning': status.get("period"),
+    }
+    if status_type.get("completed"):
+        winner = next((c.get("team", {}) for c in (home, away) if c.get("winner")), {})
+        row['actual_winner'] = winner.get("abbreviation")
+        row['actual_winner_id'] = int(winner["id"]) if winner.get("id") else None
+    return row, status_type.get("state"), event.get("date")
+
+def next_interval(states, start_times, now=None):
+    """Seconds until the next poll, from the states ('pre'/'in'/'post') and start times of the polled games."""
+    if 'in' in states:
+        return LIVE_INTERVAL
+    if 'pre' in states:
+        now = now or datetime.now(timezone.utc)
+        upcoming = [t for t in start_times if t > now]
+        if not upcoming:
+            return MIN_PREGAME_INTERVAL  # past the scheduled start but not live yet: delayed game
+        return min(max((min(upcoming) - now).total_seconds(), MIN_PREGAME_INTERVAL), MAX_PREGAME_INTERVAL)
+    return IDLE_INTERVAL
+
+class ScoreboardWatcher:
+    """
+    Keeps only the last seen (score, status) of the games on the scoreboards it is polling, so
+    memory stays bounded by one day's slate however long the process runs.
+    """
+    def __init__(self, supabase=None, dry_run=False):
+        self.supabase = supabase
+        self.dry_run = dry_run
+        self.last_seen = {}  # game_id -> tracked row as last written
+        # Dates with games that were not final at the last poll; yesterday is checked once at startup
+        self.open_dates = {date.today() - timedelta(days=1)}
+        self.errors = 0
+
+    def _fetch(self, day):
+        response = http_client.get(SCOREBOARD_URL.format(day.strftime("%Y%m%d")))
+        response.raise_for_status()
+        return response.json().get("events", [])
+
+    async def poll(self):
+        """Polls every open date plus today, pushes the changes and returns the seconds until the next poll."""
+        days = sorted(self.open_dates | {date.today()})
+        event_lists = await asyncio.gather(*(asyncio.to_thread(self._fetch, d) for d in days))
+
+        current, states, start_times, still_open = {}, [], [], set()
+        for day, events in zip(days, event_lists):
+            for event in events:
+                row, state, start = parse_event(event)
+                current[row['game_id']] = row
+                states.append(state)
+                if start:
+                    start_times.append(datetime.fromisoformat(start.replace("Z", "+00:00")))
+                if state != 'post':
+                    still_open.add(day)
+
+        changed = [row for game_id, row in current.items() if self.last_seen.get(game_id) != row]
+        if changed:
+            await self.push(changed)
+        # Drop games that left the polled scoreboards, so nothing accumulates across days
+        self.last_seen = {game_id: row for game_id, row in self.last_seen.items() if game_id in current}
+        self.open_dates = still_open - {date.today()}
+        metrics.write_textfile()
+        return next_interval(states, start_times)
+
+    async def push(self, rows):
+        print(f"🔄 {len(rows)} game(s) changed: " + ", ".join(
+            f"{r['game_id']} {r['away_score']}-{r['home_score']} {r['status']}" for r in rows[:8]) + (" ..." if len(rows) > 8 else ""))
+        if self.dry_run:
+            self.last_seen.update((r['game_id'], r) for r in rows)
+            return
+        result = await asyncio.to_thread(bulk_upsert, self.supabase, "games", rows, on_conflict="game_id")
+        if not result.ok:
+            result.report()
+        # Only remember rows that were written, so failed chunks are pushed again on the next poll
+        for chunk in result.chunks:
+            if chunk.ok:
+                self.last_seen.update((r['game_id'], r) for r in rows[chunk.start:chunk.start + chunk.rows])
+
+    async def run(self, once=False):
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # e.g. Windows; Ctrl+C still raises KeyboardInterrupt
+        print("📡 Watching the MLB scoreboard...")
+        while not stop.is_set():
+            try:
+                interval = await self.poll()
+                self.errors = 0
+            except Exception as e:
+                self.errors += 1
+                interval = min(LIVE_INTERVAL * 2 ** self.errors, MAX_ERROR_INTERVAL)
+                print(f"⚠️ Poll failed ({e}); retrying in {interval:.0f}s.")
+            if once:
+                break
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+        print("👋 Scoreboard watcher stopped.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Push live MLB score and status changes as they happen.")
+    parser.add_argument("--once", action="store_true", help="Poll once and exit")
+    parser.add_argument("--dry-run", action="store_true", help="Print changes without writing to Supabase")
+    args = parser.parse_args()
+    supabase = None if args.dry_run else get_store()
+    try:
+        asyncio.run(ScoreboardWatcher(supabase, dry_run=args.dry_run).run(once=args.once))
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# memory_store.py
+"""
+In-memory stand-in for the supabase-py client, covering the subset of the query builder this
+project uses: table().select(columns, count=...), eq/neq/gt/gte/lt/lte/in_ filters, order(),
+range(), limit(), upsert(rows, on_conflict=...) and execute(). Used by the benchmarks and for offline runs.
+"""
+import threading
+
+class Response:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+_OPS = {
+    'eq': lambda a, b: a == b,
+    'neq': lambda a, b: a != b,
+    'gt': lambda a, b: a is not None and a > b,
+    'gte': lambda a, b: a is not None and a >= b,
+    'lt': lambda a, b: a is not None and a < b,
+    'lte': lambda a, b: a is not None and a <= b,
+    'in_': lambda a, b: a in b,
+}
+
+class Query:
+    def __init__(self, store, table):
+        self.store = store
+        self.table = table
+        self.columns = None
+        self.count = None
+        self.filters = []
+        self.order_by = []  # [(column, desc)], most significant first
+        self.window = None
+        self.max_rows = None
+        self.rows_to_upsert = None
+        self.on_conflict = None
+
+    def select(self, columns="*", count=None):
+        self.columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        self.count = count
+        return self
+
+    def __getattr__(self, op):
+        if op not in _OPS:
+            raise AttributeError(op)
+        def add_filter(column, value):
+            self.filters.append((_OPS[op], column, value))
+            return self
+        return add_filter
+
+    def order(self, column, desc=False):
+        """Adds a sort key; like PostgREST, repeated calls break ties in the order they were made."""
+        self.order_by.append((column, desc))
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end)
+        return self
+
+    def limit(self, n):
+        self.max_rows = n
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.rows_to_upsert = rows if isinstance(rows, list) else [rows]
+        self.on_conflict = on_conflict
+        return self
+
+    def execute(self) -> Response:
+        if self.rows_to_upsert is not None:
+            return Response(self.store.upsert(self.table, self.rows_to_upsert, self.on_conflict))
+        rows = [r for r in self.store.rows(self.table)
+                if all(test(r.get(column), value) for test, column, value in self.filters)]
+        for column, desc in reversed(self.order_by):  # stable sorts, least significant key first
+            # None sorts last, as in PostgreSQL's default ascending order
+            rows.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        total = len(rows)
+        if self.window:
+            rows = rows[self.window[0]:self.window[1] + 1]
+        if self.max_rows is not None:
+            rows = rows[:self.max_rows]
+        if self.columns:
+            rows = [{c: r.get(c) for c in self.columns} for r in rows]
+        return Response(rows, total if self.count else None)
+
+class MemoryStore:
+    """Tables are lists of dicts; upserts replace rows whose on_conflict columns match."""
+    def __init__(self, tables=None):
+        self.tables = {name: [dict(r) for r in rows] for name, rows in (tables or {}).items()}
+        self.indexes = {}  # (table, key columns) -> {key values: position}
+        self.lock = threading.Lock()
+
+    def table(self, name) -> Query:
+        return Query(self, name)
+
+    def rows(self, table):
+        with self.lock:
+            return list(self.tables.get(table, []))
+
+    def upsert(self, table, rows, on_conflict=None):
+        with self.lock:
+            stored = self.tables.setdefault(table, [])
+            key_columns = tuple(c.strip() for c in on_conflict.split(",")) if on_conflict else ()
+            # Indexes on other key columns would miss the rows appended below
+            for other in [k for k in self.indexes if k[0] == table and k[1] != key_columns]:
+                del self.indexes[other]
+            if not key_columns:
+                stored.extend(dict(row) for row in rows)
+                return rows
+            index = self.indexes.get((table, key_columns))
+            if index is None:
+                index = {tuple(r.get(c) for c in key_columns): i for i, r in enumerate(stored)}
+                self.indexes[(table, key_columns)] = index
+            for row in rows:
+                key = tuple(row.get(c) for c in key_columns)
+                if key in index:
+                    stored[index[key]] = {**stored[index[key]], **row}
+                else:
+                    index[key] = len(stored)
+                    stored.append(dict(row))
+            return rows
@@ -0,0 +1,204 @@
+# metrics.py
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+
+# --- Config ---
+METRICS_DIR = os.path.join(".cache", "metrics")
+# JSON-lines event log; "-" writes to stderr, an empty value turns it off
+LOG_PATH = os.getenv("WAGERINDEX_METRICS_LOG", os.path.join(METRICS_DIR, "events.jsonl"))
+# Prometheus textfile-collector output; defaults to .cache/metrics/<job>.prom
+TEXTFILE_PATH = os.getenv("WAGERINDEX_METRICS_TEXTFILE")
+JOB = os.getenv("WAGERINDEX_METRICS_JOB")
+DEFAULT_JOB = "wagerindex"
+# Comma-separated stage names to profile, or "*" for all of them
+PROFILE_STAGES = {s.strip() for s in os.getenv("WAGERINDEX_PROFILE", "").split(",") if s.strip()}
+# "cprofile" writes a .prof per stage; "sample" polls the stage's stack and writes collapsed stacks for flamegraphs
+PROFILE_MODE = os.getenv("WAGERINDEX_PROFILE_MODE", "cprofile")
+PROFILE_DIR = os.path.join(".cache", "profiles")
+SAMPLE_INTERVAL = 0.005
+
+_lock = threading.Lock()
+_stages = {}  # stage -> {"runs", "failures", "wall_seconds", "cpu_seconds"}
+_http = {}    # host -> {"requests", "errors", "bytes", "seconds", "cache_hits"}
+_rows = {}    # table -> {"read", "written"}
+_job = None   # set by the entry point; see set_job()
+
+def set_job(name):
+    """Names the job the metrics are exported under (WAGERINDEX_METRICS_JOB still takes precedence)."""
+    global _job
+    _job = name
+
+def job_name():
+    """WAGERINDEX_METRICS_JOB, else the name set by the entry point, else the script's name when run as a .py file."""
+    if JOB or _job:
+        return JOB or _job
+    script = os.path.basename(sys.argv[0] or "")
+    return script[:-3].replace(" ", "_") if script.endswith(".py") else DEFAULT_JOB
+
+def log_event(event, **fields):
+    """Appends one JSON object per line to LOG_PATH."""
+    if not LOG_PATH:
+        return
+    line = json.dumps({"ts": round(time.time(), 3), "job": job_name(), "event": event, **fields}, default=str)
+    with _lock:
+        if LOG_PATH == "-":
+            print(line, file=sys.stderr)
+            return
+        os.makedirs(os.path.dirname(LOG_PATH) or ".", exist_ok=True)
+        with open(LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+def _bump(table, key, **amounts):
+    with _lock:
+        entry = table.setdefault(key, {})
+        for name, amount in amounts.items():
+            entry[name] = entry.get(name, 0) + amount
+
+def record_http(host, nbytes=0, seconds=0.0, error=False):
+    _bump(_http, host, requests=1, errors=int(error), bytes=nbytes, seconds=seconds)
+
+def record_cache_hit(host):
+    _bump(_http, host, cache_hits=1)
+
+def record_rows(table, read=0, written=0):
+    _bump(_rows, table, read=read, written=written)
+
+# --- Profiling ---
+def _profiling(name):
+    return "*" in PROFILE_STAGES or name in PROFILE_STAGES
+
+class _Sampler(threading.Thread):
+    """Polls one thread's stack every SAMPLE_INTERVAL and counts each distinct stack."""
+    def __init__(self, target_ident):
+        super().__init__(daemon=True, name="metrics-sampler")
+        self.target_ident = target_ident
+        self.stacks = {}
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.target_ident)
+            stack = []
+            while frame is not None:
+                stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+@contextmanager
+def _profile(name):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, f"{job_name()}.{name}")
+    if PROFILE_MODE == "sample":
+        sampler = _Sampler(threading.get_ident())
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stopped.set()
+            sampler.join()
+            with open(f"{base}.folded", "w") as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in sampler.stacks.items())
+            log_event("profile", stage=name, path=f"{base}.folded", samples=sum(sampler.stacks.values()))
+        return
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(f"{base}.prof")
+        log_event("profile", stage=name, path=f"{base}.prof")
+
+# --- Stages ---
+@contextmanager
+def stage(name, **fields):
+    """
+    Times a block as one stage: wall time, process CPU time and success are added to the
+    stage totals and logged as a JSON event. Stages that overlap in threads share the process
+    CPU clock, so their cpu_seconds overlap too. Profiled when named in WAGERINDEX_PROFILE.
+    """
+    wall, cpu = time.perf_counter(), time.process_time()
+    ok = False
+    try:
+        if _profiling(name):
+            with _profile(name):
+                yield
+        else:
+            yield
+        ok = True
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        _bump(_stages, name, runs=1, failures=int(not ok), wall_seconds=wall, cpu_seconds=cpu)
+        log_event("stage", stage=name, ok=ok, wall_seconds=round(wall, 4), cpu_seconds=round(cpu, 4), **fields)
+
+# --- Export ---
+def snapshot():
+    with _lock:
+        return {"stages": {k: dict(v) for k, v in _stages.items()},
+                "http": {k: dict(v) for k, v in _http.items()},
+                "rows": {k: dict(v) for k, v in _rows.items()}}
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# (section, field, metric name, help text). Each textfile holds one run's totals and is replaced by
+# the next run, so the values go down as well as up: they are gauges, not counters.
+_PROM_METRICS = [
+    ("stages", "runs", "wagerindex_stage_runs", "Times the stage ran in the last run."),
+    ("stages", "failures", "wagerindex_stage_failures", "Times the stage raised in the last run."),
+    ("stages", "wall_seconds", "wagerindex_stage_wall_seconds", "Wall-clock seconds spent in the stage in the last run."),
+    ("stages", "cpu_seconds", "wagerindex_stage_cpu_seconds", "Process CPU seconds spent in the stage in the last run."),
+    ("http", "requests", "wagerindex_http_requests", "HTTP requests sent in the last run, including retries."),
+    ("http", "errors", "wagerindex_http_errors", "HTTP requests in the last run that raised or returned a 4xx/5xx."),
+    ("http", "bytes", "wagerindex_http_response_bytes", "Response body bytes received in the last run."),
+    ("http", "seconds", "wagerindex_http_request_seconds", "Seconds spent waiting on HTTP responses in the last run."),
+    ("http", "cache_hits", "wagerindex_http_cache_hits", "Requests answered by the local HTTP cache in the last run."),
+    ("rows", "read", "wagerindex_rows_read", "Rows read from the table in the last run."),
+    ("rows", "written", "wagerindex_rows_written", "Rows written to the table in the last run."),
+]
+_LABELS = {"stages": "stage", "http": "host", "rows": "table"}
+
+def prometheus_text(snap=None):
+    snap = snap or snapshot()
+    job = _escape(job_name())
+    lines = []
+    for section, field, metric, help_text in _PROM_METRICS:
+        samples = [(key, values[field]) for key, values in sorted(snap[section].items()) if field in values]
+        if not samples:
+            continue
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+        lines += [f'{metric}{{job="{job}",{_LABELS[section]}="{_escape(key)}"}} {value:g}' for key, value in samples]
+    lines += ["# HELP wagerindex_last_run_timestamp_seconds When the job last exported metrics.",
+              "# TYPE wagerindex_last_run_timestamp_seconds gauge",
+              f'wagerindex_last_run_timestamp_seconds{{job="{job}"}} {time.time():.0f}']
+    return "\n".join(lines) + "\n"
+
+def write_textfile(path=None):
+    """Writes the Prometheus textfile atomically (the node_exporter collector may read it at any time)."""
+    path = path or TEXTFILE_PATH or os.path.join(METRICS_DIR, f"{job_name()}.prom")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        f.write(prometheus_text())
+    os.replace(f"{path}.tmp", path)
+    return path
+
+def export():
+    """Logs a summary event and writes the textfile, if anything was recorded."""
+    snap = snapshot()
+    if not any(snap.values()):
+        return
+    try:
+        log_event("summary", **snap)
+        write_textfile()
+    except OSError as e:
+        print(f"⚠️ Could not export metrics: {e}", file=sys.stderr)
+
+atexit.register(export)
@@ -0,0 +1,228 @@
+# odds.py
+"""
+Betting-line ingestion and edge tracking against the model.
+
+    python odds.py --source espn                      # moneylines embedded in ESPN's scoreboard
+    python odds.py --source file --path lines.jsonl   # JSON-lines feed: {"game_id", "book", "home_ml", "away_ml", "total"}
+    python odds.py --source file --path lines.jsonl --once --dry-run
+
+Model win probabilities are computed once per slate. After that, each batch of lines only
+recomputes the games whose price actually moved, in memory, before anything is written.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import date, datetime
+import http_client
+import metrics
+from bulk_writer import bulk_upsert
+from backtest import margin_to_win_prob, american_to_decimal
+from utils import get_store
+
+# --- Config ---
+ODDS_TABLE = "odds"
+EDGES_TABLE = "edges"
+POLL_INTERVAL = 30
+PRICE_FIELDS = ('home_ml', 'away_ml', 'total')
+
+def implied_probability(american):
+    """Break-even win probability of an American price, vig included."""
+    return -american / (-american + 100) if american < 0 else 100 / (american + 100)
+
+def no_vig_home_probability(home_ml, away_ml):
+    home, away = implied_probability(home_ml), implied_probability(away_ml)
+    return home / (home + away)
+
+def line_error(line):
+    """Why a line cannot be priced, or None when it is usable."""
+    if not isinstance(line, dict) or line.get('game_id') in (None, ""):
+        return "no game_id"
+    for field in ('home_ml', 'away_ml'):
+        price = line.get(field)
+        if isinstance(price, bool) or not isinstance(price, (int, float)) or abs(price) < 100:
+            return f"{field} {price!r} is not an American price"
+    total = line.get('total')
+    if total is not None and (isinstance(total, bool) or not isinstance(total, (int, float))):
+        return f"total {total!r} is not a number"
+    return None
+
+# --- Sources ---
+class FileOddsSource:
+    """
+    A JSON-lines file of line snapshots, one object per line. Each read returns only the lines
+    appended since the previous read, so a feed writer can simply keep appending. Lines that are
+    not JSON or cannot be priced are skipped with a warning.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return []
+        if os.path.getsize(self.path) < self.offset:
+            self.offset = 0  # file was truncated or rotated
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read()
+        complete = chunk[:chunk.rfind(b"\n") + 1]  # a half-written last line is picked up next time
+        self.offset += len(complete)
+        lines = []
+        for text in complete.decode("utf-8").splitlines():
+            if not text.strip():
+                continue
+            try:
+                line = json.loads(text)
+                error = line_error(line)
+            except ValueError:
+                error = "not JSON"
+            if error:
+                print(f"⚠️ Skipping malformed line ({error}): {text[:120]}")
+                continue
+            lines.append(line)
+        return lines
+
+class EspnOddsSource:
+    """Moneylines and totals from the odds block ESPN embeds in each scoreboard event."""
+    URL = "https://site.api.espn.com/apis/site/v2/sports/baseball/mlb/scoreboard?dates={}"
+
+    def __init__(self, day=None):
+        self.day = day
+
+    def read(self):
+        day = self.day or date.today()
+        # Straight to the network: the HTTP cache would hide line moves for its TTL
+        response = http_client.get(self.URL.format(day.strftime("%Y%m%d")))
+        response.raise_for_status()
+        lines = []
+        for event in response.json().get("events", []):
+            for odds in event.get("competitions", [{}])[0].get("odds", []):
+                home_ml = odds.get("homeTeamOdds", {}).get("moneyLine")
+                away_ml = odds.get("awayTeamOdds", {}).get("moneyLine")
+                if home_ml is None or away_ml is None:
+                    continue
+                lines.append({'game_id': event.get("id"), 'book': odds.get("provider", {}).get("name", "espn"),
+                              'home_ml': home_ml, 'away_ml': away_ml, 'total': odds.get("overUnder")})
+        return lines
+
+SOURCES = {'file': FileOddsSource, 'espn': EspnOddsSource}
+
+# --- Edges ---
+class EdgeBook:
+    """
+    Latest line per (game, book) and the resulting edge per game. apply() recomputes only
+    the games whose lines changed, which is a handful of dict lookups per game.
+    """
+    def __init__(self, model_probs=None):
+        self.model = {str(g): p for g, p in (model_probs or {}).items()}  # game_id -> model home win probability
+        self.lines = {}  # (game_id, book) -> latest line
+        self.books = {}  # game_id -> set of books quoting it
+        self.edges = {}  # game_id -> latest edge row
+
+    def apply(self, lines):
+        """Stores the lines that moved and returns (moved lines, recomputed edge rows)."""
+        moved, touched = [], set()
+        for line in lines:
+            game_id, book = str(line['game_id']), line.get('book') or 'default'
+            previous = self.lines.get((game_id, book))
+            if previous is not None and all(previous.get(f) == line.get(f) for f in PRICE_FIELDS):
+                continue
+            line = {'game_id': game_id, 'book': book, **{f: line.get(f) for f in PRICE_FIELDS},
+                    'updated_at': line.get('updated_at') or datetime.now().isoformat()}
+            self.lines[(game_id, book)] = line
+            self.books.setdefault(game_id, set()).add(book)
+            moved.append(line)
+            touched.add(game_id)
+        return moved, [self.edges[g] for g in touched if self._recompute(g)]
+
+    def set_model(self, model_probs):
+        """Replaces model probabilities (e.g. after a re-run) and recomputes the affected games."""
+        changed = [str(g) for g, p in model_probs.items() if self.model.get(str(g)) != p]
+        self.model.update({str(g): p for g, p in model_probs.items()})
+        return [self.edges[g] for g in changed if self._recompute(g)]
+
+    def _recompute(self, game_id):
+        p_home = self.model.get(game_id)
+        lines = [self.lines[(game_id, b)] for b in self.books.get(game_id, ())]
+        if p_home is None or not lines:
+            return False
+        market_home = sum(no_vig_home_probability(l['home_ml'], l['away_ml']) for l in lines) / len(lines)
+        side = 'home' if p_home >= market_home else 'away'
+        best = max(lines, key=lambda l: american_to_decimal(l[f'{side}_ml']))
+        p_side = p_home if side == 'home' else 1 - p_home
+        self.edges[game_id] = {
+            'game_id': game_id, 'model_home_prob': round(p_home, 4), 'market_home_prob': round(market_home, 4),
+            'edge': round(abs(p_home - market_home), 4), 'pick': side, 'pick_price': best[f'{side}_ml'],
+            'pick_book': best['book'], 'expected_value': round(p_side * american_to_decimal(best[f'{side}_ml']) - 1, 4),
+            'books': len(lines), 'updated_at': datetime.now().isoformat(),
+        }
+        return True
+
+def model_probabilities(predictions_df):
+    """game_id -> home win probability, from the simulation when it ran, else from the score margin."""
+    if predictions_df is None or predictions_df.empty:
+        return {}
+    if 'home_win_prob' in predictions_df.columns:
+        probs = predictions_df['home_win_prob']
+    else:
+        probs = margin_to_win_prob(predictions_df['predicted_score_home'] - predictions_df['predicted_score_away'])
+    return dict(zip(predictions_df['game_id'].astype(str), map(float, probs)))
+
+# --- Driver ---
+def _store(supabase, moved, edges):
+    for table, rows, key in ((ODDS_TABLE, moved, 'game_id,book'), (EDGES_TABLE, edges, 'game_id')):
+        if rows:
+            result = bulk_upsert(supabase, table, rows, on_conflict=key)
+            if not result.ok:
+                result.report()
+
+def watch(source, supabase=None, day=None, interval=POLL_INTERVAL, once=False, dry_run=False, n_sims=0):
+    from run_model import run_prediction_engine
+    day = day or date.today()
+    supabase = supabase or get_store()  # the model reads from it even on a dry run
+    book = EdgeBook(model_probabilities(run_prediction_engine(day.isoformat(), supabase=supabase, n_sims=n_sims)))
+    print(f"💹 Tracking lines for {len(book.model)} modeled game(s) on {day}...")
+    while True:
+        try:
+            lines = source.read()
+        except Exception as e:
+            lines = []
+            print(f"⚠️ Failed to read lines: {e}")
+        start = time.perf_counter()
+        with metrics.stage("odds.apply", lines=len(lines)):
+            moved, edges = book.apply(lines)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if moved:
+            print(f"🔄 {len(moved)} line(s) moved; {len(edges)} edge(s) recomputed in {elapsed_ms:.2f} ms.")
+            for e in sorted(edges, key=lambda e: -e['edge'])[:5]:
+                print(f"   {e['game_id']}: {e['pick']} {e['pick_price']:+} @ {e['pick_book']} edge {e['edge']:.3f} EV {e['expected_value']:+.3f}")
+            if not dry_run:
+                _store(supabase, moved, edges)
+        if once:
+            return book
+        time.sleep(interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest betting lines and track the model's edge.")
+    parser.add_argument("--source", choices=sorted(SOURCES), default="espn")
+    parser.add_argument("--path", help="Lines file for --source file")
+    parser.add_argument("--date", type=date.fromisoformat, help="Slate date (defaults to today)")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="Seconds between reads")
+    parser.add_argument("--simulate", type=int, default=0, metavar="N", help="Use N-run simulation win probabilities")
+    parser.add_argument("--once", action="store_true", help="Read once and exit")
+    parser.add_argument("--dry-run", action="store_true", help="Print edges without writing to Supabase")
+    args = parser.parse_args()
+    if args.source == "file":
+        if not args.path: print("❌ --path is required with --source file"), sys.exit(2)
+        source = FileOddsSource(args.path)
+    else:
+        source = EspnOddsSource(args.date)
+    try:
+        watch(source, day=args.date, interval=args.interval, once=args.once, dry_run=args.dry_run, n_sims=args.simulate)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# pitching_cache.py
+import os
+import json
+import time
+import threading
+import pandas as pd
+import metrics
+import pyarrow as pa
+import pyarrow.feather as feather
+from datetime import date
+
+# --- Config ---
+CACHE_DIR = os.path.join(".cache", "pitching_stats")
+# How long a current-season leaderboard is served before a background refresh is started
+CURRENT_SEASON_MAX_AGE = int(os.getenv("WAGERINDEX_PITCHING_MAX_AGE", 6 * 60 * 60))
+# A refresh lock older than this is assumed to belong to a crashed process
+STALE_LOCK_SECONDS = 15 * 60
+
+_refresh_threads = {}
+_refresh_lock = threading.Lock()
+
+def _paths(season):
+    base = os.path.join(CACHE_DIR, f"pitching_stats_{season}")
+    return f"{base}.arrow", f"{base}.meta.json", f"{base}.lock"
+
+def _read_meta(season):
+    try:
+        with open(_paths(season)[1]) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def load_cached(season):
+    """Memory-maps the cached Arrow file for a season, or returns None when there is none."""
+    data_path = _paths(season)[0]
+    if not os.path.exists(data_path):
+        return None
+    table = feather.read_table(data_path, memory_map=True)
+    return table.to_pandas()
+
+def _to_arrow_frame(df):
+    # FanGraphs mixes numbers and strings in some object columns; store those as strings
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].astype("string")
+    return df
+
+def _acquire_file_lock(lock_path):
+    try:
+        fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        os.close(fd)
+        return True
+    except FileExistsError:
+        if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+            os.remove(lock_path)
+            return _acquire_file_lock(lock_path)
+        return False
+
+def refresh(season):
+    """
+    Downloads the season leaderboard from pybaseball and rewrites the cache atomically.
+    A lock file keeps concurrent processes from downloading the same season at once.
+    Returns the fresh frame, or None if another process is already refreshing.
+    """
+    from pybaseball import pitching_stats  # heavy import, only paid on a cache miss or refresh
+
+    data_path, meta_path, lock_path = _paths(season)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    if not _acquire_file_lock(lock_path):
+        return None
+    try:
+        with metrics.stage("pybaseball.pitching_stats", season=season):
+            df = pitching_stats(season)
+        if df.empty:
+            return df
+        tmp = f"{data_path}.tmp"
+        # Uncompressed so the file can be memory-mapped without a decode step
+        feather.write_feather(pa.Table.from_pandas(_to_arrow_frame(df), preserve_index=False), tmp, compression="uncompressed")
+        os.replace(tmp, data_path)
+        meta = {"season": season, "fetched_at": time.time(), "rows": len(df),
+                "final": date.today() > date(season, 11, 15)}
+        with open(f"{meta_path}.tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+        return df
+    finally:
+        os.remove(lock_path)
+
+def _refresh_in_background(season):
+    with _refresh_lock:
+        thread = _refresh_threads.get(season)
+        if thread is not None and thread.is_alive():
+            return thread
+        # A daemon: read-only callers never wait for the download at exit; writers refresh inline instead
+        thread = threading.Thread(target=refresh, args=(season,), name=f"pitching-refresh-{season}", daemon=True)
+        _refresh_threads[season] = thread
+        thread.start()
+        return thread
+
+def get_pitching_stats(season, max_age=CURRENT_SEASON_MAX_AGE, background=True) -> pd.DataFrame:
+    """
+    pybaseball.pitching_stats(season) served from a season-keyed Arrow cache.
+    Finished seasons are downloaded once and kept. When the current season's copy is older than
+    max_age it is refreshed inline with background=False, which callers that write the stats to the
+    database must use. Read-only callers (background=True) get the stale copy at once while a
+    daemon thread refreshes it for the next run.
+    """
+    meta = _read_meta(season)
+    cached = load_cached(season) if meta else None
+    if cached is None:
+        print(f"  -> No cached pitching stats for {season}; downloading from pybaseball...")
+        fresh = refresh(season)
+        return fresh if fresh is not None else load_cached(season)
+
+    # A season's totals stop changing once it is over; those files are never refetched
+    if not meta.get("final") and time.time() - meta["fetched_at"] > max_age:
+        if background:
+            print(f"  -> Cached {season} pitching stats are stale; refreshing in the background.")
+            _refresh_in_background(season)
+        else:
+            fresh = refresh(season)
+            if fresh is not None:
+                return fresh
+            print(f"  -> Another process is refreshing the {season} pitching stats; using the cached copy.")
+    return cached
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Warm the local pybaseball pitching_stats cache.")
+    parser.add_argument("seasons", nargs="+", type=int)
+    for season in parser.parse_args().seasons:
+        df = get_pitching_stats(season, background=False)
+        print(f"✅ {season}: {0 if df is None else len(df)} pitchers cached.")
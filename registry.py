@@ -0,0 +1,132 @@
+# registry.py
+import os
+import re
+import json
+import threading
+import unicodedata
+import http_cache
+
+# --- Config ---
+REGISTRY_DIR = os.path.join(".cache", "registry")
+TEAMS_URL = "https://site.api.espn.com/apis/site/v2/sports/baseball/mlb/teams"
+KINDS = ('team', 'pitcher')
+# FanGraphs/pybaseball and Baseball-Reference abbreviations that differ from ESPN's
+EXTRA_TEAM_ALIASES = {
+    'ARI': ['AZ'], 'CHW': ['CWS'], 'KC': ['KCR'], 'SD': ['SDP'], 'SF': ['SFG'],
+    'TB': ['TBR', 'TBD'], 'WSH': ['WSN', 'WAS'], 'ATH': ['OAK'], 'LAA': ['ANA'],
+}
+_SUFFIX = re.compile(r"\b(jr|sr|ii|iii|iv)$")
+
+def normalize_alias(alias) -> str:
+    """Case-, accent- and punctuation-insensitive form of a name, so 'José Ramírez Jr.' == 'jose ramirez'."""
+    text = unicodedata.normalize("NFKD", str(alias)).encode("ascii", "ignore").decode("ascii")
+    text = re.sub(r"[.'’`]", "", text.lower())
+    text = re.sub(r"[^a-z0-9@:|-]+", " ", text).strip()
+    return _SUFFIX.sub("", text).strip()
+
+class EntityRegistry:
+    """
+    Maps every known alias of a team or pitcher to one integer id, persisted per season. An alias
+    claimed by two different ids (e.g. two pitchers with the same name) is kept as None and never
+    resolves, rather than silently pointing at whichever was added last.
+    """
+    def __init__(self, season, aliases=None, labels=None):
+        self.season = season
+        self.aliases = aliases or {kind: {} for kind in KINDS}
+        # Canonical display label per id (ESPN abbreviation for teams, full name for pitchers)
+        self.labels = labels or {kind: {} for kind in KINDS}
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.warned = set()  # ambiguous (kind, alias) pairs already reported
+
+    def add(self, kind, entity_id, *aliases):
+        """Registers aliases for entity_id; the first alias becomes its canonical label."""
+        if entity_id is None:
+            return
+        entity_id = int(entity_id)
+        with self.lock:
+            if aliases and aliases[0] and str(entity_id) not in self.labels[kind]:
+                self.labels[kind][str(entity_id)] = aliases[0]
+                self.dirty = True
+            table = self.aliases[kind]
+            for alias in (str(entity_id),) + aliases:
+                if alias is None or alias == "":
+                    continue
+                key = normalize_alias(alias)
+                if key not in table:
+                    table[key] = entity_id
+                    self.dirty = True
+                elif table[key] not in (None, entity_id):
+                    table[key] = None  # two entities share this alias
+                    self.dirty = True
+
+    def _lookup(self, kind, alias):
+        key = normalize_alias(alias)
+        entity_id = self.aliases[kind].get(key)
+        if entity_id is None and key in self.aliases[kind] and (kind, key) not in self.warned:
+            self.warned.add((kind, key))
+            print(f"⚠️ '{alias}' names more than one {kind} in the {self.season} registry; it will not be resolved.")
+        return entity_id
+
+    def resolve(self, kind, alias):
+        """Returns the integer id for alias, or None when it is unknown or ambiguous."""
+        if alias is None or alias != alias:  # None or NaN
+            return None
+        return self._lookup(kind, alias)
+
+    def resolve_series(self, kind, series):
+        """Vectorized resolve for a pandas Series; unknown and ambiguous aliases become <NA> in an Int64 column."""
+        lookup = {a: self._lookup(kind, a) for a in series.dropna().unique()}
+        return series.map(lookup).astype("Int64")
+
+    def path(self):
+        return os.path.join(REGISTRY_DIR, f"registry_{self.season}.json")
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            os.makedirs(REGISTRY_DIR, exist_ok=True)
+            tmp = f"{self.path()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"season": self.season, "aliases": self.aliases, "labels": self.labels}, f)
+            os.replace(tmp, self.path())
+            self.dirty = False
+
+    def add_teams_from_espn(self):
+        teams = http_cache.get(TEAMS_URL).json()['sports'][0]['leagues'][0]['teams']
+        for entry in teams:
+            t = entry['team']
+            # location is left out on purpose: "Los Angeles", "New York" and "Chicago" are ambiguous
+            self.add('team', t['id'], t.get('abbreviation'), t.get('displayName'), t.get('shortDisplayName'),
+                     t.get('name'), *EXTRA_TEAM_ALIASES.get(t.get('abbreviation'), []))
+
+    def label(self, kind, entity_id):
+        return self.labels[kind].get(str(entity_id))
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+def get_registry(season, refresh=False) -> EntityRegistry:
+    """
+    One registry per season per process. Loaded from .cache/registry on first use and built
+    from the ESPN teams endpoint when no cached copy exists (or refresh=True).
+    """
+    with _registries_lock:
+        if season in _registries and not refresh:
+            return _registries[season]
+        registry = None
+        if not refresh:
+            try:
+                with open(EntityRegistry(season).path()) as f:
+                    data = json.load(f)
+                    registry = EntityRegistry(season, {k: data["aliases"].get(k, {}) for k in KINDS},
+                                              {k: data["labels"].get(k, {}) for k in KINDS})
+            except (OSError, ValueError, KeyError):
+                registry = None
+        if registry is None or not registry.aliases['team']:
+            registry = registry or EntityRegistry(season)
+            registry.add_teams_from_espn()
+            registry.save()
+        _registries[season] = registry
+        return registry
@@ -1,107 +1,186 @@
 # run_model.py
-import os
+import argparse
 import pandas as pd
 import numpy as np
-from supabase import create_client, Client
-from dotenv import load_dotenv
+import metrics
 from datetime import datetime
-
-load_dotenv()
+from table_reader import read_table
+from registry import get_registry
+from utils import get_store
+from features import MIN_INNINGS_PITCHED, compute_component_scores, load_features
+from form import load_form, attach_form
 
 # --- Config ---
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 # RESTORED: The original four-component weights, as per your model's design.
 WEIGHTS = {'batting': 0.40, 'pitching': 0.30, 'bullpen': 0.20, 'defense': 0.10}
+# Only the columns the model reads are requested from Supabase
+TEAM_STATS_COLUMNS = ['team_id', 'team_abbr', 'batting_average', 'errors', 'era', 'whip', 'runs', 'games_played']
+PITCHER_COLUMNS = ['pitcher_id', 'name', 'era', 'whip']
+# Simulations are drawn in chunks of this size so memory stays bounded for large runs
+SIM_CHUNK_SIZE = 20000
 
-def normalize_stat(series: pd.Series, ascending=True) -> pd.Series:
-    """Normalizes a pandas Series into a 0-100 score."""
-    return series.rank(method='max', ascending=ascending, pct=True) * 100
+def _weighted_score(batting, pitching, bullpen, defense):
+    return (batting * WEIGHTS['batting'] +
+            pitching * WEIGHTS['pitching'] +
+            bullpen * WEIGHTS['bullpen'] +
+            defense * WEIGHTS['defense']) / 10
 
-def run_prediction_engine():
-    try:
-        supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        print("✅ Successfully connected to Supabase.")
-    except Exception as e:
-        print(f"❌ Failed to connect to Supabase: {e}")
-        return
+def _labels(teams: pd.Series) -> pd.Series:
+    """Team keys as display strings; a missing (e.g. Int64 <NA>) key shows as '?'."""
+    teams = teams.astype(object)
+    return teams.where(teams.notna(), '?').map(str)
+
+def score_games(games_df: pd.DataFrame, team_stats_df: pd.DataFrame, pitcher_stats_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Scores every game in games_df in one pass. The frame may span any number of dates.
+    Teams are joined on the integer 'team_id' when both frames carry it (home_/away_team_id in
+    games), otherwise on 'team_abbr'; pitchers likewise on 'pitcher_id', otherwise on 'name'.
+    If team_stats_df also has a 'game_date' column the join is made per date, so point-in-time
+    stats can be supplied. Unknown pitchers get the league average.
+    """
+    use_team_ids = 'team_id' in team_stats_df.columns and {'home_team_id', 'away_team_id'} <= set(games_df.columns)
+    team_key = 'team_id' if use_team_ids else 'team_abbr'
+    use_pitcher_ids = 'pitcher_id' in pitcher_stats_df.columns and {'home_pitcher_id', 'away_pitcher_id'} <= set(games_df.columns)
+    pitcher_key, game_pitcher_col = ('pitcher_id', '{}_pitcher_id') if use_pitcher_ids else ('name', '{}_pitcher_name')
+
+    team_keys = ['game_date', team_key] if 'game_date' in team_stats_df.columns else [team_key]
+    team_cols = ['Batting_Score', 'Bullpen_Score', 'Defense_Score']
+    teams = team_stats_df.drop_duplicates(subset=team_keys, keep='last')[team_keys + team_cols]
+
+    pitching = pitcher_stats_df.drop_duplicates(subset=pitcher_key, keep='last').set_index(pitcher_key)['Pitching_Score']
+    league_avg_pitcher_score = pitching.mean() if not pitching.empty else 50.0
+
+    scored = games_df.reset_index(drop=True)
+    for side in ('home', 'away'):
+        side_key = f'{side}_{team_key}'
+        side_teams = teams.rename(columns={team_key: side_key, **{c: f'{side}_{c}' for c in team_cols}})
+        scored = scored.merge(side_teams, on=[k if k != team_key else side_key for k in team_keys], how='left')
+
+        pitcher_col = game_pitcher_col.format(side)
+        pitchers = scored[pitcher_col] if pitcher_col in scored else pd.Series(None, index=scored.index, dtype=object)
+        scored[f'{side}_Pitching_Score'] = pitchers.map(pitching).astype(float).fillna(league_avg_pitcher_score)
+
+        scored[f'predicted_score_{side}'] = _weighted_score(
+            scored[f'{side}_Batting_Score'], scored[f'{side}_Pitching_Score'],
+            scored[f'{side}_Bullpen_Score'], scored[f'{side}_Defense_Score'])
+
+    label = 'team_abbr' if {'home_team_abbr', 'away_team_abbr'} <= set(scored.columns) else team_key
+    missing = scored[['predicted_score_home', 'predicted_score_away']].isna().any(axis=1)
+    if missing.any():
+        skipped = sorted(set(_labels(scored.loc[missing, f'away_{label}']) + ' vs ' + _labels(scored.loc[missing, f'home_{label}'])))
+        print(f"⚠️ Skipping {int(missing.sum())} game(s) with no team stats: {', '.join(skipped[:10])}{' ...' if len(skipped) > 10 else ''}")
+        scored = scored[~missing].copy()
+
+    home_wins = scored['predicted_score_home'] >= scored['predicted_score_away']
+    scored['predicted_winner'] = np.where(home_wins, scored[f'home_{label}'], scored[f'away_{label}'])
+    if use_team_ids:
+        scored['predicted_winner_id'] = np.where(home_wins, scored['home_team_id'], scored['away_team_id'])
+    scored['margin'] = (scored['predicted_score_away'] - scored['predicted_score_home']).abs()
+    # Rank within each slate so a multi-date frame yields one ranking per day
+    if 'game_date' in scored.columns:
+        scored['margin_rank'] = scored.groupby('game_date')['margin'].rank(ascending=False)
+    else:
+        scored['margin_rank'] = scored['margin'].rank(ascending=False)
+    return scored
+
+def attach_entity_ids(games_df: pd.DataFrame, registry) -> pd.DataFrame:
+    """Fills home_/away_ team and pitcher ids from whatever alias columns the games rows carry."""
+    for side in ('home', 'away'):
+        for kind, id_col, alias_cols in (
+                ('team', f'{side}_team_id', [f'{side}_team_abbr', f'{side}_team']),
+                ('pitcher', f'{side}_pitcher_id', [f'{side}_pitcher_name'])):
+            ids = games_df[id_col].astype('Int64') if id_col in games_df else pd.Series(pd.NA, index=games_df.index, dtype='Int64')
+            for alias_col in alias_cols:
+                if alias_col in games_df and ids.isna().any():
+                    ids = ids.fillna(registry.resolve_series(kind, games_df[alias_col]))
+            games_df[id_col] = ids
+    return games_df
+
+def run_prediction_engine(start_date=None, end_date=None, supabase=None, n_sims=0, seed=None, use_features=True):
+    """
+    Scores every game between start_date and end_date (inclusive, YYYY-MM-DD). Defaults to today.
+    Component scores come from the precomputed feature tables (see features.py) when they exist
+    for the season, otherwise they are computed from the raw stats tables.
+    Rolling 7/14/30-day team and starter form (see form.py) is joined on when it has been built.
+    With n_sims > 0 each game is also Monte Carlo simulated for win/run-line/total probabilities.
+    """
+    if supabase is None:
+        try:
+            supabase = get_store()
+            print("✅ Successfully connected to the data store.")
+        except Exception as e:
+            print(f"❌ Failed to connect to Supabase: {e}")
+            return
 
     # 1. Fetch all data from Supabase
     print("⬇️ Fetching data from Supabase tables...")
     try:
-        today_str = datetime.now().strftime('%Y-%m-%d')
-        games_resp = supabase.table("games").select("*").eq("game_date", today_str).execute()
-        games_df = pd.DataFrame(games_resp.data)
-
-        teams_resp = supabase.table("team_stats").select("*").execute()
-        team_stats_df = pd.DataFrame(teams_resp.data)
-
-        pitchers_resp = supabase.table("pitchers").select("*").execute()
-        pitcher_stats_df = pd.DataFrame(pitchers_resp.data)
-        
-        if any(df.empty for df in [games_df, team_stats_df, pitcher_stats_df]):
-            print("⚠️ Halting: One or more required tables are empty.")
-            return
-        if 'errors' not in team_stats_df.columns:
-            print("⚠️ Halting: 'errors' column not found in team_stats table. Run fetch_team_stats.py again.")
+        start_date = start_date or datetime.now().strftime('%Y-%m-%d')
+        end_date = end_date or start_date
+        season = int(start_date[:4])
+        with metrics.stage("model.read"):
+            games_df = read_table(supabase, "games", filters=[("gte", "game_date", start_date), ("lte", "game_date", end_date)], order="game_id")
+            features = load_features(supabase, season) if use_features else None
+            # The simulator needs the raw runs/ERA/WHIP as well as the scores
+            if features is None or n_sims:
+                team_stats_df = read_table(supabase, "team_stats", TEAM_STATS_COLUMNS, filters=[("eq", "season", season)])
+                pitcher_stats_df = read_table(supabase, "pitchers", PITCHER_COLUMNS, filters=[
+                    ("eq", "season", season), ("gte", "innings_pitched", MIN_INNINGS_PITCHED)])
+
+        if features is None:
+            if any(df.empty for df in [games_df, team_stats_df, pitcher_stats_df]):
+                print("⚠️ Halting: One or more required tables are empty.")
+                return
+            if 'errors' not in team_stats_df.columns:
+                print("⚠️ Halting: 'errors' column not found in team_stats table. Run fetch_team_stats.py again.")
+                return
+        elif games_df.empty:
+            print("⚠️ Halting: No games found in the requested date range.")
             return
-            
+
     except Exception as e:
         print(f"❌ Error fetching data from Supabase: {e}")
         return
 
     print("🚀 Running prediction model with original 4-part weighting...")
 
-    # 2. Pre-compute Component Scores
-    team_stats_df['Batting_Score'] = normalize_stat(team_stats_df['batting_average'], ascending=True)
-    team_stats_df['Defense_Score'] = normalize_stat(team_stats_df['errors'], ascending=False) # Lower errors is better
-    # Placeholder for Bullpen Score - assuming it's based on team ERA for now
-    team_stats_df['Bullpen_Score'] = normalize_stat(team_stats_df['era'], ascending=False)
-    
-    pitcher_stats_df['Pitching_Score'] = (
-        normalize_stat(pitcher_stats_df['era'], ascending=False) +
-        normalize_stat(pitcher_stats_df['whip'], ascending=False)
-    ) / 2
-    league_avg_pitcher_score = pitcher_stats_df['Pitching_Score'].mean()
-
-    # 3. Process each game
-    predictions = []
-    for _, game in games_df.iterrows():
+    # 2. Resolve every team/pitcher alias on the slate to integer ids, then pre-compute Component Scores
+    with metrics.stage("model.score", games=len(games_df)):
+        games_df = attach_entity_ids(games_df, get_registry(season))
+        if features is None:
+            team_scores_df, pitcher_scores_df = compute_component_scores(team_stats_df, pitcher_stats_df)
+        else:
+            print("  -> Using precomputed component scores from the feature tables.")
+            team_scores_df, pitcher_scores_df = features
+
+        # 3. Score the whole slate at once
+        predictions_df = score_games(games_df, team_scores_df, pitcher_scores_df)
+    if n_sims and not predictions_df.empty:
+        from simulate import simulate_slate
+        print(f"🎲 Simulating {len(predictions_df)} games x {n_sims} runs...")
+        with metrics.stage("model.simulate", games=len(predictions_df), n_sims=n_sims):
+            predictions_df = predictions_df.join(simulate_slate(predictions_df, team_stats_df, pitcher_stats_df, n_sims, seed, chunk_size=SIM_CHUNK_SIZE))
+
+    if not predictions_df.empty:
         try:
-            away_team = team_stats_df[team_stats_df['team_abbr'] == game['away_team_abbr']].iloc[0]
-            home_team = team_stats_df[team_stats_df['team_abbr'] == game['home_team_abbr']].iloc[0]
-            
-            away_pitcher = pitcher_stats_df[pitcher_stats_df['name'] == game.get('away_pitcher_name')]
-            home_pitcher = pitcher_stats_df[pitcher_stats_df['name'] == game.get('home_pitcher_name')]
-            
-            away_pitching_score = away_pitcher['Pitching_Score'].iloc[0] if not away_pitcher.empty else league_avg_pitcher_score
-            home_pitching_score = home_pitcher['Pitching_Score'].iloc[0] if not home_pitcher.empty else league_avg_pitcher_score
-
-            away_score = (away_team['Batting_Score'] * WEIGHTS['batting'] + 
-                          away_pitching_score * WEIGHTS['pitching'] +
-                          away_team['Bullpen_Score'] * WEIGHTS['bullpen'] +
-                          away_team['Defense_Score'] * WEIGHTS['defense']) / 10
-            
-            home_score = (home_team['Batting_Score'] * WEIGHTS['batting'] +
-                          home_pitching_score * WEIGHTS['pitching'] +
-                          home_team['Bullpen_Score'] * WEIGHTS['bullpen'] +
-                          home_team['Defense_Score'] * WEIGHTS['defense']) / 10
-
-            predictions.append({
-                # ... (rest of the prediction dictionary is the same)
-            })
+            with metrics.stage("model.form"):
+                predictions_df = attach_form(predictions_df, *load_form(supabase, start_date, end_date))
         except Exception as e:
-            print(f"⚠️ Error processing game {game.get('away_team_abbr')} vs {game.get('home_team_abbr')}: {e}")
-    
+            print(f"⚠️ Rolling form not available ({e}); continuing with season stats only.")
+
     # ... The rest of the script (calculating POTD and upserting) is unchanged ...
-    if not predictions:
+    if predictions_df.empty:
         print("🤷 No predictions were generated.")
         return
-        
-    predictions_df = pd.DataFrame(predictions)
-    predictions_df['margin'] = abs(predictions_df['predicted_score_away'] - predictions_df['predicted_score_home'])
-    predictions_df['margin_rank'] = predictions_df['margin'].rank(ascending=False)
     # ... etc ...
+    return predictions_df
 
 if __name__ == "__main__":
-    run_prediction_engine()
+    parser = argparse.ArgumentParser(description="Score MLB games with the WagerIndex model.")
+    parser.add_argument("--start", help="First game date to score (YYYY-MM-DD). Defaults to today.")
+    parser.add_argument("--end", help="Last game date to score (YYYY-MM-DD). Defaults to --start.")
+    parser.add_argument("--simulate", type=int, default=0, metavar="N", help="Also run N Monte Carlo simulations per game")
+    parser.add_argument("--seed", type=int, help="Random seed for --simulate")
+    parser.add_argument("--no-features", action="store_true", help="Recompute component scores from the raw stats tables")
+    args = parser.parse_args()
+    run_prediction_engine(args.start, args.end, n_sims=args.simulate, seed=args.seed, use_features=not args.no_features)
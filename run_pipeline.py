@@ -1,77 +1,181 @@
-# run_core_stats.py
-import os, sys, requests, pandas as pd
-from supabase import create_client
-from dotenv import load_dotenv
-from datetime import datetime
+# run_pipeline.py
+import os, sys, json, time, argparse
+import http_cache
+import metrics
+from http_client import HEADERS
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils import get_store, get_current_season_year
+from bulk_writer import bulk_upsert
 
 # --- CONFIGURATION ---
-load_dotenv()
-SUPABASE_URL, SUPABASE_KEY = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
-HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'}
+STATE_PATH = os.path.join(".cache", "pipeline_state.json")
+MAX_PARALLEL_NODES = 4
 
-# --- UTILITY & DB FUNCTIONS ---
-def get_supabase_client():
-    if not SUPABASE_URL or not SUPABASE_KEY: print("❌ Fatal: Supabase secrets required."), sys.exit(1)
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
-
-def get_current_season_year():
-    print(" Hitting ESPN API for official season year...")
-    try:
-        data = requests.get("https://site.api.espn.com/apis/site/v2/sports/baseball/mlb/scoreboard", timeout=15).json()
-        s = data.get("season", {}); year, type = s.get("year"), s.get("type")
-        if not year or not type: raise ValueError("API missing year/type")
-        if type == 4: year -= 1; print(f"  -> Offseason. Using previous year ({year}).")
-        else: print(f"  -> Active season: {year}.")
-        return year
-    except Exception as e: print(f"❌ CRITICAL FAILURE fetching year: {e}"), sys.exit(1)
+class PipelineContext:
+    """State shared by every node in a run: one store client and one season."""
+    def __init__(self, supabase, season):
+        self.supabase = supabase
+        self.season = season
+        self.outputs = {}
 
+# --- UTILITY & DB FUNCTIONS ---
 def upsert_data(supabase, table_name, records, conflict_col):
     if not records: print(f"✅ INFO: No records to upsert for '{table_name}'."); return
     print(f"⬆️ Upserting {len(records)} records to '{table_name}'...")
+    result = bulk_upsert(supabase, table_name, records, on_conflict=conflict_col)
+    result.report()
+    if not result.ok: raise Exception(f"{len(result.failed_chunks)} chunk(s) failed: {result.failed_chunks[0].error}")
+
+# --- PIPELINE NODES ---
+def node_teams(ctx):
+    print("\n--- Syncing Teams ---")
+    data = http_cache.get("https://site.api.espn.com/apis/site/v2/sports/baseball/mlb/teams", headers=HEADERS).json()
+    records = [{'name': t['team']['displayName'], 'abbreviation': t['team']['abbreviation']} for t in data['sports'][0]['leagues'][0]['teams']]
+    upsert_data(ctx.supabase, 'teams', records, 'abbreviation')
+    db_teams = ctx.supabase.table('teams').select('id, abbreviation').execute().data
+    metrics.record_rows('teams', read=len(db_teams))
+    return {t['abbreviation']: t['id'] for t in db_teams}
+
+def node_team_stats(ctx):
+    from fetch_team_stats import fetch_and_upsert_team_stats
+    fetch_and_upsert_team_stats(ctx.supabase, ctx.season)
+
+def node_pitchers(ctx):
+    from fetch_pitcher_stats import fetch_and_upsert_pitchers
+    fetch_and_upsert_pitchers(ctx.supabase, ctx.season)
+
+def node_games(ctx):
+    import fetch_games
+    fetch_games.main(ctx.supabase)
+
+def node_results(ctx):
+    import fetch_results
+    fetch_results.main(ctx.supabase)
+
+def node_features(ctx):
+    from features import build_features
+    if not build_features(ctx.supabase, ctx.season): raise RuntimeError("feature table write failed")
+
+def node_form(ctx):
+    from form import update_form
+    if not update_form(ctx.supabase): raise RuntimeError("form table write failed")
+
+def node_model(ctx):
+    from run_model import run_prediction_engine
+    return run_prediction_engine(supabase=ctx.supabase)
+
+# name -> (function, upstream dependencies). Order here is also the display/topological order.
+NODES = {
+    'teams':      (node_teams,      []),
+    'team_stats': (node_team_stats, ['teams']),
+    'pitchers':   (node_pitchers,   []),
+    'games':      (node_games,      ['teams']),
+    'results':    (node_results,    ['games']),
+    'features':   (node_features,   ['team_stats', 'pitchers']),
+    'form':       (node_form,       ['results']),
+    'model':      (node_model,      ['features', 'games', 'form']),
+}
+
+def downstream_of(name):
+    """The node itself plus every node that transitively depends on it."""
+    selected = {name}
+    for node in NODES:  # NODES is declared in topological order, so one pass is enough
+        if any(dep in selected for dep in NODES[node][1]):
+            selected.add(node)
+    return selected
+
+def select_nodes(only=None, start_from=None):
+    if only:
+        unknown = set(only) - set(NODES)
+        if unknown: print(f"❌ Unknown node(s): {', '.join(sorted(unknown))}"), sys.exit(2)
+        return set(only)
+    if start_from:
+        if start_from not in NODES: print(f"❌ Unknown node: {start_from}"), sys.exit(2)
+        return downstream_of(start_from)
+    return set(NODES)
+
+# --- RUN STATE (for --resume) ---
+def load_completed():
     try:
-        response = supabase.table(table_name).upsert(records, on_conflict=conflict_col).execute()
-        if not response.data: raise Exception(getattr(response, 'error', 'Unknown error'))
-        print(f"✅ Success.")
-    except Exception as e: print(f"❌ Supabase upsert for '{table_name}' failed: {e}"), sys.exit(1)
-
-# --- PIPELINE STEPS ---
-def step_1_teams(supabase):
-    print("\n--- 1. Syncing Teams ---")
-    try:
-        data = requests.get(f"https://site.api.espn.com/apis/site/v2/sports/baseball/mlb/teams", headers=HEADERS).json()
-        records = [{'name': t['team']['displayName'], 'abbreviation': t['team']['abbreviation']} for t in data['sports'][0]['leagues'][0]['teams']]
-        upsert_data(supabase, 'teams', records, 'abbreviation')
-        db_teams = supabase.table('teams').select('id, abbreviation').execute().data
-        return {t['abbreviation']: t['id'] for t in db_teams}
-    except Exception as e: print(f"❌ Fatal Error in Step 1: {e}"), sys.exit(1)
-
-def step_2_core_stats(supabase, year, team_map):
-    print(f"\n--- 2. Fetching Core Stat (Batting Average) for {year} ---")
-    try:
-        url = f"https://site.api.espn.com/apis/v2/sports/baseball/mlb/seasons/{year}/types/2/teams?limit=100"
-        data = requests.get(url, headers=HEADERS).json()
-        records = []
-        for item in data.get("items", []):
-            team_info = item.get("team", {})
-            abbr = team_info.get("abbreviation")
-            if abbr in team_map:
-                stats = {s["name"]: s.get("value", 0) for s in team_info.get("stats", [])}
-                records.append({
-                    'team_id': team_map[abbr],
-                    'batting_avg': stats.get('avg'),
-                    'updated_at': datetime.now().isoformat()
-                })
-        upsert_data(supabase, 'team_stats', records, 'team_id')
-    except Exception as e: print(f"❌ Fatal Error fetching team stats: {e}"), sys.exit(1)
+        with open(STATE_PATH) as f:
+            state = json.load(f)
+        return set(state.get('completed', [])) if state.get('run_date') == date.today().isoformat() else set()
+    except (OSError, ValueError):
+        return set()
+
+def save_completed(completed):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    with open(STATE_PATH, 'w') as f:
+        json.dump({'run_date': date.today().isoformat(), 'completed': sorted(completed)}, f)
+
+def _run_node(name, ctx):
+    start = time.perf_counter()
+    with metrics.stage(f"pipeline.{name}"):
+        try:
+            ctx.outputs[name] = NODES[name][0](ctx)
+        except SystemExit as e:
+            # The fetchers still sys.exit() on fatal errors; code 0 means "nothing to do"
+            if e.code not in (0, None): raise RuntimeError(f"exited with code {e.code}")
+    return time.perf_counter() - start
+
+def run_graph(ctx, selected, completed=()):
+    """
+    Runs the selected nodes, starting each one as soon as its selected dependencies have finished.
+    Dependencies outside the selection are assumed to be satisfied. A failed node skips its dependents.
+    """
+    done, failed, skipped = set(completed), set(), set()
+    pending = [n for n in NODES if n in selected and n not in done]
+    running = {}
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_NODES) as pool:
+        while pending or running:
+            for name in list(pending):
+                deps = [d for d in NODES[name][1] if d in selected]
+                if any(d in failed or d in skipped for d in deps):
+                    pending.remove(name); skipped.add(name)
+                    print(f"⏭️ Skipping '{name}' (upstream failed).")
+                elif all(d in done for d in deps):
+                    pending.remove(name)
+                    print(f"▶️ Starting '{name}'...")
+                    running[pool.submit(_run_node, name, ctx)] = name
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    print(f"✅ '{name}' finished in {future.result():.1f}s.")
+                    done.add(name)
+                    save_completed(done)
+                except Exception as e:
+                    print(f"❌ '{name}' failed: {e}")
+                    failed.add(name)
+    return done, failed, skipped
 
 # --- MAIN WORKFLOW ---
 def main():
-    print("🚀 Starting WagerIndex Core Stats Pipeline...")
-    supabase = get_supabase_client()
-    year = get_current_season_year()
-    team_map = step_1_teams(supabase)
-    step_2_core_stats(supabase, year, team_map)
-    print("\n✅✅✅ Core Stats Pipeline Completed Successfully ✅✅✅")
+    parser = argparse.ArgumentParser(description="Run the WagerIndex ingestion + model pipeline.")
+    parser.add_argument("--only", type=lambda s: s.split(','), help=f"Comma-separated nodes to run: {', '.join(NODES)}")
+    parser.add_argument("--from", dest="start_from", help="Run this node and everything downstream of it")
+    parser.add_argument("--resume", action="store_true", help="Skip nodes that already completed today")
+    args = parser.parse_args()
+
+    print("🚀 Starting WagerIndex Pipeline...")
+    selected = select_nodes(args.only, args.start_from)
+    completed = load_completed() & selected if args.resume else set()
+    if completed: print(f"  -> Resuming; already done today: {', '.join(n for n in NODES if n in completed)}")
+
+    try:
+        ctx = PipelineContext(get_store(), get_current_season_year())
+    except Exception as e: print(f"❌ Fatal Error during setup: {e}"), sys.exit(1)
+
+    with metrics.stage("pipeline"):
+        done, failed, skipped = run_graph(ctx, selected, completed)
+    if failed or skipped:
+        print(f"\n❌ Pipeline finished with failures: {', '.join(sorted(failed))}" + (f" (skipped: {', '.join(sorted(skipped))})" if skipped else ""))
+        print(f"   Re-run with --resume or --from <node> to pick up where it stopped.")
+        sys.exit(1)
+    print("\n✅✅✅ Pipeline Completed Successfully ✅✅✅")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,154 @@
+# simulate.py
+import numpy as np
+import pandas as pd
+
+# --- Config ---
+DEFAULT_SIMULATIONS = 10000
+# Share of a game's innings the starter is expected to cover; the bullpen (team ERA) covers the rest
+STARTER_SHARE = 5.5 / 9
+HOME_FIELD_FACTOR = 1.02
+# Negative-binomial shape for runs per game: variance = mean + mean^2 / DISPERSION (MLB runs are overdispersed)
+DISPERSION = 4.0
+TOTAL_LINES = (6.5, 7.5, 8.5, 9.5, 10.5)
+MAX_RUNS = 40  # histogram cap for totals; anything above lands in the last bucket
+MAX_MARGIN = 20
+
+def _side_frame(games_df, team_stats_df, pitcher_stats_df, side):
+    """Joins one side's offense, team pitching and starter line onto the games, keyed like score_games."""
+    use_team_ids = 'team_id' in team_stats_df.columns and f'{side}_team_id' in games_df.columns
+    team_key = 'team_id' if use_team_ids else 'team_abbr'
+    use_pitcher_ids = 'pitcher_id' in pitcher_stats_df.columns and f'{side}_pitcher_id' in games_df.columns
+    pitcher_key, pitcher_col = ('pitcher_id', f'{side}_pitcher_id') if use_pitcher_ids else ('name', f'{side}_pitcher_name')
+
+    teams = team_stats_df.drop_duplicates(team_key, keep='last').set_index(team_key)
+    pitchers = pitcher_stats_df.drop_duplicates(pitcher_key, keep='last').set_index(pitcher_key)
+    team_ids = games_df[f'{side}_{team_key}']
+    starter_ids = games_df[pitcher_col] if pitcher_col in games_df else pd.Series(None, index=games_df.index, dtype=object)
+    return pd.DataFrame({
+        'runs_pg': (teams['runs'] / teams['games_played']).reindex(team_ids).to_numpy(dtype=float),
+        'team_era': teams['era'].reindex(team_ids).to_numpy(dtype=float),
+        'team_whip': teams['whip'].reindex(team_ids).to_numpy(dtype=float),
+        'starter_era': pitchers['era'].reindex(starter_ids).to_numpy(dtype=float),
+        'starter_whip': pitchers['whip'].reindex(starter_ids).to_numpy(dtype=float),
+    }, index=games_df.index)
+
+def expected_runs(games_df: pd.DataFrame, team_stats_df: pd.DataFrame, pitcher_stats_df: pd.DataFrame):
+    """
+    Expected runs for the home and away side of every game. A team's runs per game is scaled
+    by how the opposing staff compares with the league: the starter's ERA (blended with the ERA
+    his WHIP implies) for STARTER_SHARE of the game and the team ERA for the rest.
+    Starters that are unknown fall back to their team's numbers.
+    """
+    home = _side_frame(games_df, team_stats_df, pitcher_stats_df, 'home')
+    away = _side_frame(games_df, team_stats_df, pitcher_stats_df, 'away')
+    league_runs = (team_stats_df['runs'] / team_stats_df['games_played']).mean()
+    league_era, league_whip = team_stats_df['era'].mean(), team_stats_df['whip'].mean()
+
+    def allowed_factor(staff):
+        starter_era = staff['starter_era'].fillna(staff['team_era'])
+        starter_whip = staff['starter_whip'].fillna(staff['team_whip'])
+        starter = 0.5 * starter_era + 0.5 * starter_whip * league_era / league_whip
+        return (STARTER_SHARE * starter + (1 - STARTER_SHARE) * staff['team_era']) / league_era
+
+    lam_home = home['runs_pg'].fillna(league_runs) * allowed_factor(away).fillna(1.0) * HOME_FIELD_FACTOR
+    lam_away = away['runs_pg'].fillna(league_runs) * allowed_factor(home).fillna(1.0)
+    return lam_home.clip(lower=0.5).to_numpy(), lam_away.clip(lower=0.5).to_numpy()
+
+def negative_binomial_cdf(lam):
+    """CDF over 0..MAX_RUNS runs for each mean in lam, with the tail folded into MAX_RUNS."""
+    p = DISPERSION / (DISPERSION + lam)
+    k = np.arange(MAX_RUNS)
+    # pmf(k+1) = pmf(k) * (k + r) / (k + 1) * (1 - p), starting from pmf(0) = p^r
+    steps = (k + DISPERSION) / (k + 1) * (1 - p[:, None])
+    pmf = np.concatenate([np.ones((len(lam), 1)), np.cumprod(steps, axis=1)], axis=1) * (p ** DISPERSION)[:, None]
+    cdf = np.cumsum(pmf, axis=1)
+    cdf[:, -1] = 1.0
+    return cdf
+
+def stack_cdfs(cdf):
+    """
+    Every game's CDF in one sorted array: game g's values (all in [0, 1]) are shifted by 2g, so
+    the tables never interleave and a single searchsorted serves the whole slate.
+    """
+    return (cdf + 2 * np.arange(len(cdf))[:, None]).ravel()
+
+def _draw_runs(rng, stacked_cdf, n_games, n):
+    # Inverse-CDF sampling: one uniform per draw, shifted into its game's block of the stacked
+    # table, then one binary search for all games and simulations. Several times faster than
+    # drawing gamma rates and then Poisson counts.
+    game = np.arange(n_games)[:, None]
+    u = rng.random((n_games, n)) + 2 * game
+    return np.searchsorted(stacked_cdf, u, side='right') - game * (len(stacked_cdf) // n_games)
+
+def _quantiles_from_hist(hist, qs):
+    cdf = np.cumsum(hist, axis=1) / hist.sum(axis=1, keepdims=True)
+    return np.stack([(cdf < q).sum(axis=1) for q in qs], axis=1)
+
+def simulate_games(lam_home, lam_away, n_sims=DEFAULT_SIMULATIONS, seed=None, chunk_size=None,
+                   total_lines=TOTAL_LINES) -> pd.DataFrame:
+    """
+    Draws n_sims seeded run outcomes per game, vectorized across games and simulations.
+    With chunk_size set, simulations are drawn chunk_size at a time and only per-game counts and
+    histograms are kept, so memory stays at O(games x chunk_size) however large n_sims is.
+    Ties are settled as extra innings: one extra run to a side picked in proportion to its expected runs.
+    """
+    lam_home, lam_away = np.asarray(lam_home, dtype=float), np.asarray(lam_away, dtype=float)
+    n_games = len(lam_home)
+    rng = np.random.default_rng(seed)
+    chunk_size = chunk_size or n_sims
+    p_home_extra = lam_home / (lam_home + lam_away)
+    cdf_home, cdf_away = stack_cdfs(negative_binomial_cdf(lam_home)), stack_cdfs(negative_binomial_cdf(lam_away))
+
+    home_wins = np.zeros(n_games)
+    home_cover = np.zeros(n_games)  # home -1.5
+    away_cover = np.zeros(n_games)  # away -1.5
+    runs_home = np.zeros(n_games)
+    runs_away = np.zeros(n_games)
+    total_hist = np.zeros((n_games, MAX_RUNS + 1), dtype=np.int64)
+    margin_hist = np.zeros((n_games, 2 * MAX_MARGIN + 1), dtype=np.int64)
+    offsets = np.arange(n_games)[:, None]
+
+    for done in range(0, n_sims, chunk_size):
+        n = min(chunk_size, n_sims - done)
+        home = _draw_runs(rng, cdf_home, n_games, n)
+        away = _draw_runs(rng, cdf_away, n_games, n)
+        tied = home == away
+        home_takes_extra = rng.random((n_games, n)) < p_home_extra[:, None]
+        home += tied & home_takes_extra
+        away += tied & ~home_takes_extra
+
+        margin = home - away
+        home_wins += (margin > 0).sum(axis=1)
+        home_cover += (margin >= 2).sum(axis=1)
+        away_cover += (margin <= -2).sum(axis=1)
+        runs_home += home.sum(axis=1)
+        runs_away += away.sum(axis=1)
+        total = np.minimum(home + away, MAX_RUNS)
+        total_hist += np.bincount((offsets * (MAX_RUNS + 1) + total).ravel(),
+                                  minlength=n_games * (MAX_RUNS + 1)).reshape(n_games, -1)
+        margin = np.clip(margin, -MAX_MARGIN, MAX_MARGIN) + MAX_MARGIN
+        margin_hist += np.bincount((offsets * (2 * MAX_MARGIN + 1) + margin).ravel(),
+                                   minlength=n_games * (2 * MAX_MARGIN + 1)).reshape(n_games, -1)
+
+    out = pd.DataFrame({
+        'expected_runs_home': lam_home, 'expected_runs_away': lam_away,
+        'home_win_prob': home_wins / n_sims, 'away_win_prob': 1 - home_wins / n_sims,
+        'home_runline_cover_prob': home_cover / n_sims, 'away_runline_cover_prob': away_cover / n_sims,
+        'sim_runs_home': runs_home / n_sims, 'sim_runs_away': runs_away / n_sims,
+    })
+    out['sim_total_runs'] = out['sim_runs_home'] + out['sim_runs_away']
+    quantiles = _quantiles_from_hist(total_hist, (0.1, 0.5, 0.9))
+    out['total_p10'], out['total_p50'], out['total_p90'] = quantiles.T
+    over_counts = total_hist[:, ::-1].cumsum(axis=1)[:, ::-1]  # over_counts[:, k] = sims with total >= k
+    for line in total_lines:
+        out[f'over_{line}_prob'] = over_counts[:, int(np.floor(line)) + 1] / n_sims
+    out.attrs['total_hist'] = total_hist
+    out.attrs['margin_hist'] = margin_hist  # column j is a home margin of j - MAX_MARGIN
+    return out
+
+def simulate_slate(games_df, team_stats_df, pitcher_stats_df, n_sims=DEFAULT_SIMULATIONS, seed=None, chunk_size=None):
+    """Expected runs plus simulation results, one row per game, aligned with games_df."""
+    lam_home, lam_away = expected_runs(games_df, team_stats_df, pitcher_stats_df)
+    sims = simulate_games(lam_home, lam_away, n_sims=n_sims, seed=seed, chunk_size=chunk_size)
+    sims.index = games_df.index
+    return sims
@@ -0,0 +1,173 @@
+# snapshots.py
+"""
+Append-only, compressed point-in-time history of the stats tables.
+
+team_stats and pitchers are upserted in place, so the database only ever holds today's values.
+Each successful stats run also records the fields that changed (and the rows that appeared or
+disappeared) since the previous snapshot as one zlib-compressed delta, in an append-only log per table and season. Every
+CHECKPOINT_EVERY deltas a full compressed copy is written instead, so an "as of" lookup only
+decodes the nearest checkpoint at or before that date and the few deltas after it.
+
+    python snapshots.py team_stats --as-of 2024-06-01
+    python snapshots.py pitchers --season 2024 --stats
+"""
+import os
+import json
+import zlib
+import struct
+import argparse
+import pandas as pd
+from datetime import date
+from delta_upsert import row_key, IGNORED_COLUMNS
+from utils import get_current_season_year
+
+# --- Config ---
+SNAPSHOT_DIR = os.path.join(".cache", "snapshots")
+CHECKPOINT_EVERY = 14  # deltas between full copies; bounds the work of an as-of lookup
+COMPRESSION_LEVEL = 6
+# Upsert key of each table within one season's log
+KEYS = {'team_stats': 'team_abbr', 'pitchers': 'pitcher_id'}
+
+# Record header: ISO date, kind, payload length. The payload is zlib-compressed JSON.
+_HEADER = struct.Struct(">10scI")
+CHECKPOINT, DELTA = b"C", b"D"
+
+def _json_default(value):
+    return value.item() if hasattr(value, 'item') else str(value)
+
+def _changed_fields(old, new):
+    """Fields of new that differ from old; a field new no longer has comes back as None."""
+    return {c: new.get(c) for c in old.keys() | new.keys() if old.get(c) != new.get(c)}
+
+class SnapshotLog:
+    """One table's history for one season, kept in a single append-only file."""
+    def __init__(self, table, season, key=None, directory=None):
+        self.table = table
+        self.season = season
+        self.key = key or KEYS[table]
+        self.path = os.path.join(directory or SNAPSHOT_DIR, f"{table}-{season}.log")
+        self._index = None  # [(date, kind, payload offset, payload length)] in file order
+
+    # --- Reading ---
+    def index(self):
+        """Record headers, read without decompressing anything. A torn trailing record is ignored."""
+        if self._index is None:
+            self._index = []
+            if os.path.exists(self.path):
+                size = os.path.getsize(self.path)
+                with open(self.path, "rb") as f:
+                    offset = 0
+                    while offset + _HEADER.size <= size:
+                        day, kind, length = _HEADER.unpack(f.read(_HEADER.size))
+                        if offset + _HEADER.size + length > size:
+                            break
+                        self._index.append((day.decode("ascii"), kind, offset + _HEADER.size, length))
+                        offset += _HEADER.size + length
+                        f.seek(offset)
+        return self._index
+
+    def _valid_size(self):
+        index = self.index()
+        return index[-1][2] + index[-1][3] if index else 0
+
+    def _payload(self, f, offset, length):
+        f.seek(offset)
+        return json.loads(zlib.decompress(f.read(length)))
+
+    def state_as_of(self, day=None):
+        """{row key: row} as recorded at the end of day (ISO string or date); the latest state if None."""
+        day = str(day) if day is not None else None
+        records = [r for r in self.index() if day is None or r[0] <= day]
+        start = max((i for i, r in enumerate(records) if r[1] == CHECKPOINT), default=None)
+        if start is None:
+            return {}
+        with open(self.path, "rb") as f:
+            state = self._payload(f, *records[start][2:])
+            for _, _, offset, length in records[start + 1:]:
+                delta = self._payload(f, offset, length)
+                for k in delta['deleted']:
+                    state.pop(k, None)
+                for k, fields in delta['rows'].items():
+                    state[k] = {**state[k], **fields} if k in state else fields
+        return state
+
+    def as_of(self, day=None) -> pd.DataFrame:
+        """The table's rows for this season as they stood at the end of day."""
+        return pd.DataFrame(list(self.state_as_of(day).values()))
+
+    def dates(self):
+        return sorted({r[0] for r in self.index()})
+
+    # --- Writing ---
+    def _append(self, day, kind, payload):
+        blob = zlib.compress(json.dumps(payload, default=_json_default, separators=(",", ":")).encode("utf-8"),
+                             COMPRESSION_LEVEL)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        valid = self._valid_size()
+        with open(self.path, "r+b" if os.path.exists(self.path) else "wb") as f:
+            f.truncate(valid)  # drop a record torn by an earlier crash
+            f.seek(valid)
+            f.write(_HEADER.pack(day.encode("ascii"), kind, len(blob)))
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        self._index.append((day, kind, valid + _HEADER.size, len(blob)))
+
+    def record(self, rows, day=None):
+        """
+        Records the rows as the table's state on day (default today). Returns the number of rows
+        that were new, changed or removed; nothing is appended when that is zero.
+        """
+        day = str(day or date.today())
+        latest = self.index()[-1][0] if self.index() else None
+        if latest and day < latest:
+            raise ValueError(f"{self.table}-{self.season} already has snapshots up to {latest}; cannot record {day}")
+        previous = self.state_as_of()
+        current = {row_key(r, self.key): {k: v for k, v in r.items() if k not in IGNORED_COLUMNS} for r in rows}
+        # Compare in the stored (JSON) representation, so numpy scalars never look like changes
+        current = json.loads(json.dumps(current, default=_json_default))
+        # New rows are stored whole; changed rows only carry the fields that differ
+        changed = {}
+        for k, row in current.items():
+            fields = row if k not in previous else _changed_fields(previous[k], row)
+            if fields:
+                changed[k] = fields
+        deleted = [k for k in previous if k not in current]
+        if not changed and not deleted:
+            return 0
+        deltas_since_checkpoint = next((i for i, r in enumerate(reversed(self.index())) if r[1] == CHECKPOINT), None)
+        if deltas_since_checkpoint is None or deltas_since_checkpoint >= CHECKPOINT_EVERY:
+            self._append(day, CHECKPOINT, current)
+        else:
+            self._append(day, DELTA, {'rows': changed, 'deleted': deleted})
+        return len(changed) + len(deleted)
+
+    def stats(self):
+        """On-disk bytes, against what a compressed full copy per recorded date would take."""
+        full_copy = len(zlib.compress(json.dumps(self.state_as_of(), default=_json_default,
+                                                 separators=(",", ":")).encode("utf-8"), COMPRESSION_LEVEL))
+        return {'records': len(self.index()), 'dates': len(self.dates()),
+                'checkpoints': sum(r[1] == CHECKPOINT for r in self.index()),
+                'bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+                'full_copies_bytes_estimate': full_copy * len(self.dates())}
+
+def record_snapshot(table, season, rows, day=None):
+    """Appends today's changes for a stats table; failures are reported, never fatal to the caller."""
+    try:
+        n = SnapshotLog(table, season).record(rows, day)
+        print(f"🗂️ Snapshot for '{table}': {n} row(s) changed." if n else f"🗂️ Snapshot for '{table}': unchanged.")
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not record the '{table}' snapshot: {e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the point-in-time stats snapshots.")
+    parser.add_argument("table", choices=sorted(KEYS))
+    parser.add_argument("--season", type=int, help="Season (defaults to the current one)")
+    parser.add_argument("--as-of", type=date.fromisoformat, help="Date to reconstruct (defaults to the latest snapshot)")
+    parser.add_argument("--stats", action="store_true", help="Show the log's size instead of its rows")
+    args = parser.parse_args()
+    log = SnapshotLog(args.table, args.season or get_current_season_year())
+    if args.stats:
+        print(json.dumps(log.stats(), indent=2))
+    else:
+        print(log.as_of(args.as_of).to_string(index=False))
@@ -0,0 +1,265 @@
+# sqlite_store.py
+"""
+Local SQLite backend exposing the same subset of the supabase-py query builder as memory_store.py,
+so any job can run against a file on disk instead of the hosted database.
+
+Tables are created on first write from the columns of the rows written, and new columns are added
+as they appear. The database runs in WAL mode so readers are never blocked by a commit, each upsert
+is one executemany per column set inside a single transaction, and the date, team and pitcher key
+columns are indexed. Every write stamps rows with a revision number, so `sync` pushes only the rows
+changed since the last successful sync.
+
+    WAGERINDEX_STORE=sqlite python run_pipeline.py     # run the whole pipeline on the local database
+    python sqlite_store.py                              # push changed rows of every table to Supabase
+    python sqlite_store.py --tables games --full        # push a whole table
+"""
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import threading
+from datetime import date, datetime
+import metrics
+import memory_store
+from memory_store import Response
+from bulk_writer import bulk_upsert
+
+# --- Config ---
+SQLITE_PATH = os.getenv("WAGERINDEX_SQLITE_PATH", os.path.join(".cache", "wagerindex.db"))
+# Columns indexed in whichever tables have them: game/as-of dates, seasons, team and pitcher keys
+INDEXED_COLUMNS = ('game_date', 'as_of_date', 'season', 'team_abbr', 'team_id', 'pitcher_id', 'name')
+REV_COLUMN = "_rev"
+SYNC_CHUNK_SIZE = 500
+BUSY_TIMEOUT_MS = 30000
+
+_SQL_OPS = {'eq': '=', 'neq': '!=', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=', 'in_': 'IN'}
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def _encode(value):
+    """Python/numpy/pandas values to something sqlite3 can bind."""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'item'):  # numpy scalars
+        return value.item()
+    return value
+
+class Query(memory_store.Query):
+    """The memory_store builder, compiled to SQL on execute()."""
+    def __getattr__(self, op):
+        if op not in _SQL_OPS:
+            raise AttributeError(op)
+        def add_filter(column, value):
+            self.filters.append((op, column, value))
+            return self
+        return add_filter
+
+    def execute(self) -> Response:
+        if self.rows_to_upsert is not None:
+            return Response(self.store.upsert(self.table, self.rows_to_upsert, self.on_conflict))
+        return self.store.select(self)
+
+class SqliteStore:
+    def __init__(self, path=None):
+        self.path = path or SQLITE_PATH
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.local = threading.local()  # one connection per thread; WAL lets them read concurrently
+        self.write_lock = threading.Lock()
+        self.schema = {}  # table -> list of columns
+        conn = self._conn()
+        with self.write_lock:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS _meta (key TEXT PRIMARY KEY, value INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO _meta VALUES ('rev', 0)")
+            conn.execute("CREATE TABLE IF NOT EXISTS _sync (tbl TEXT PRIMARY KEY, rev INTEGER, synced_at TEXT)")
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            # Autocommit; writes open their own transaction so schema changes roll back with the rows
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; safe with WAL
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            self.local.conn = conn
+        return conn
+
+    def table(self, name) -> Query:
+        return Query(self, name)
+
+    def table_names(self):
+        rows = self._conn().execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE '\\_%' ESCAPE '\\' ORDER BY name").fetchall()
+        return [r[0] for r in rows]
+
+    def columns(self, table, refresh=False):
+        if refresh or table not in self.schema:
+            cols = [r[1] for r in self._conn().execute(f"PRAGMA table_info({_quote(table)})")]
+            if not cols:
+                return []
+            self.schema[table] = cols
+        return self.schema[table]
+
+    def conflict_key(self, table):
+        """The columns of the table's first upsert key (unique index), comma-joined, or None."""
+        conn = self._conn()
+        for _, index, unique, origin, _ in conn.execute(f"PRAGMA index_list({_quote(table)})").fetchall():
+            if unique and origin == 'c':
+                return ",".join(r[2] for r in conn.execute(f"PRAGMA index_info({_quote(index)})"))
+        return None
+
+    # --- Reads ---
+    def _where(self, filters, existing):
+        clauses, params = [], []
+        for op, column, value in filters:
+            expr = _quote(column) if column in existing else "NULL"  # missing columns read as NULL
+            if op == 'in_':
+                values = [_encode(v) for v in value]
+                clauses.append(f"{expr} IN ({', '.join('?' * len(values))})" if values else "0")
+                params.extend(values)
+            else:
+                clauses.append(f"{expr} {_SQL_OPS[op]} ?")
+                params.append(_encode(value))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def select(self, query) -> Response:
+        existing = self.columns(query.table)
+        if not existing:
+            return Response([], 0 if query.count else None)
+        wanted = query.columns or [c for c in existing if c != REV_COLUMN]
+        if not set(wanted) <= set(existing):
+            existing = self.columns(query.table, refresh=True)  # another connection may have added columns
+        present = [c for c in wanted if c in existing]
+        where, params = self._where(query.filters, existing)
+        sql = f"SELECT {', '.join(map(_quote, present)) or 'NULL'} FROM {_quote(query.table)}{where}"
+        order = [(column, desc) for column, desc in query.order_by if column in existing]
+        if order:
+            # PostgreSQL's defaults: NULLs last ascending, first descending
+            sql += " ORDER BY " + ", ".join(f"{_quote(c)} IS NULL {'DESC' if d else 'ASC'}, {_quote(c)} {'DESC' if d else 'ASC'}"
+                                            for c, d in order)
+        offset, limit = (query.window[0], query.window[1] - query.window[0] + 1) if query.window else (0, -1)
+        if query.max_rows is not None:
+            limit = query.max_rows if limit < 0 else min(limit, query.max_rows)
+        sql += f" LIMIT {limit} OFFSET {offset}"
+        conn = self._conn()
+        rows = conn.execute(sql, params).fetchall()
+        data = [{c: v for c, v in zip(present, row)} for row in rows]
+        if len(present) < len(wanted):
+            data = [{c: r.get(c) for c in wanted} for r in data]
+        count = conn.execute(f"SELECT COUNT(*) FROM {_quote(query.table)}{where}", params).fetchone()[0] if query.count else None
+        return Response(data, count)
+
+    # --- Writes ---
+    def _ensure_schema(self, conn, table, columns, key_columns):
+        existing = self.columns(table)
+        if not set(columns) <= set(existing):
+            existing = self.columns(table, refresh=True)
+        if not existing:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table)} ({_quote(REV_COLUMN)} INTEGER)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'ix_{table}__{REV_COLUMN}')} ON {_quote(table)} ({_quote(REV_COLUMN)})")
+            existing = [REV_COLUMN]
+        for column in columns:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)}")
+                existing.append(column)
+                if column in INDEXED_COLUMNS:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'ix_{table}__{column}')} ON {_quote(table)} ({_quote(column)})")
+        if key_columns:
+            name = f"ux_{table}__{'__'.join(key_columns)}"
+            conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {_quote(name)} ON {_quote(table)} ({', '.join(map(_quote, key_columns))})")
+        self.schema[table] = existing
+
+    def upsert(self, table, rows, on_conflict=None):
+        if not rows:
+            return rows
+        key_columns = [c.strip() for c in on_conflict.split(",")] if on_conflict else []
+        # executemany needs one column list per statement, so rows are grouped by their keys
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(row), []).append(row)
+        columns = list(dict.fromkeys(c for cols in groups for c in cols))
+        with self.write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")  # one transaction for the whole upsert
+            try:
+                self._ensure_schema(conn, table, columns, key_columns)
+                conn.execute("UPDATE _meta SET value = value + 1 WHERE key = 'rev'")
+                rev = conn.execute("SELECT value FROM _meta WHERE key = 'rev'").fetchone()[0]
+                for cols, group in groups.items():
+                    names = list(cols) + [REV_COLUMN]
+                    sql = (f"INSERT INTO {_quote(table)} ({', '.join(map(_quote, names))}) "
+                           f"VALUES ({', '.join('?' * len(names))})")
+                    if key_columns:
+                        updates = [c for c in names if c not in key_columns]
+                        sql += (f" ON CONFLICT ({', '.join(map(_quote, key_columns))}) DO UPDATE SET "
+                                + ", ".join(f"{_quote(c)} = excluded.{_quote(c)}" for c in updates))
+                    conn.executemany(sql, [[_encode(r[c]) for c in cols] + [rev] for r in group])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                self.schema.pop(table, None)  # the schema changes were rolled back with the rows
+                raise
+        return rows
+
+    # --- Sync ---
+    def synced_rev(self, table):
+        row = self._conn().execute("SELECT rev FROM _sync WHERE tbl = ?", (table,)).fetchone()
+        return row[0] if row else 0
+
+    def changed_rows(self, table, since=0):
+        """Rows written after revision `since`, and the highest revision among them."""
+        cols = [c for c in self.columns(table) if c != REV_COLUMN]
+        if not cols:
+            return [], since
+        cursor = self._conn().execute(
+            f"SELECT {', '.join(map(_quote, cols))}, {_quote(REV_COLUMN)} FROM {_quote(table)} "
+            f"WHERE {_quote(REV_COLUMN)} > ? ORDER BY {_quote(REV_COLUMN)}", (since,))
+        rows, last = [], since
+        for values in cursor:
+            rows.append(dict(zip(cols, values[:-1])))
+            last = values[-1]
+        return rows, last
+
+    def mark_synced(self, table, rev):
+        with self.write_lock:
+            self._conn().execute("INSERT INTO _sync VALUES (?, ?, ?) ON CONFLICT (tbl) DO UPDATE SET rev = excluded.rev, "
+                         "synced_at = excluded.synced_at", (table, rev, datetime.now().isoformat()))
+
+def sync(local=None, remote=None, tables=None, full=False, chunk_size=SYNC_CHUNK_SIZE) -> bool:
+    """
+    Upserts the local rows changed since each table's last successful sync into the remote store,
+    in chunks, keyed on the same columns as locally. A table's sync point only advances when every
+    chunk was written. Returns False if any table failed.
+    """
+    from utils import get_supabase_client
+    local = local or SqliteStore()
+    remote = remote or get_supabase_client()
+    ok = True
+    for table in tables or local.table_names():
+        rows, last = local.changed_rows(table, 0 if full else local.synced_rev(table))
+        if not rows:
+            print(f"  -> '{table}' is in sync.")
+            continue
+        print(f"⬆️ Syncing {len(rows)} changed row(s) of '{table}'...")
+        with metrics.stage("sync.upsert", table=table, rows=len(rows)):
+            result = bulk_upsert(remote, table, rows, on_conflict=local.conflict_key(table), chunk_size=chunk_size)
+        result.report()
+        if result.ok:
+            local.mark_synced(table, last)
+        ok = ok and result.ok
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Push rows changed in the local SQLite store to Supabase.")
+    parser.add_argument("--tables", nargs="+", help="Tables to sync (defaults to all)")
+    parser.add_argument("--full", action="store_true", help="Push every row, not just rows changed since the last sync")
+    parser.add_argument("--chunk-size", type=int, default=SYNC_CHUNK_SIZE, help="Rows per upsert request")
+    args = parser.parse_args()
+    if not sync(tables=args.tables, full=args.full, chunk_size=args.chunk_size):
+        sys.exit(1)
@@ -0,0 +1,48 @@
+# table_reader.py
+import itertools
+import pandas as pd
+import metrics
+from http_client import map_concurrent
+
+# --- Config ---
+PAGE_SIZE = 1000  # PostgREST's default max-rows; larger pages are silently truncated
+MAX_WORKERS = 4
+
+def _query(supabase, table, columns, filters, order, count=None):
+    select = ", ".join(columns) if columns else "*"
+    query = supabase.table(table).select(select, count=count) if count else supabase.table(table).select(select)
+    for op, column, value in filters:
+        query = getattr(query, op)(column, value)
+    for column in order:
+        query = query.order(column)
+    return query
+
+def read_table(supabase, table, columns=None, filters=(), order=None, page_size=PAGE_SIZE, max_workers=MAX_WORKERS) -> pd.DataFrame:
+    """
+    Reads a whole table (or the rows matching filters) into a DataFrame.
+    columns limits the projection; filters are (op, column, value) tuples applied server-side,
+    e.g. ("eq", "season", 2024) or ("gte", "innings_pitched", 10). The first page also asks
+    for the exact row count, then the remaining pages are fetched concurrently. order is a column
+    or a list of columns that together are unique over the matching rows, so pages neither
+    overlap nor skip rows; it defaults to the first projected column.
+    """
+    filters = list(filters)
+    order = order or (columns[0] if columns else None)
+    order = [order] if isinstance(order, str) else list(order or [])
+    first = _query(supabase, table, columns, filters, order, count="exact").range(0, page_size - 1).execute()
+
+    def fetch_page(offset):
+        return _query(supabase, table, columns, filters, order).range(offset, offset + page_size - 1).execute().data
+
+    if first.count is not None:
+        rest = map_concurrent(fetch_page, range(page_size, first.count, page_size), max_workers=max_workers)
+    else:
+        # No count from the server: fall back to walking pages until a short one comes back
+        rest, page = [], first.data
+        while len(page) == page_size:
+            page = fetch_page(page_size * (len(rest) + 1))
+            rest.append(page)
+    # Build the frame straight from the page lists; no intermediate concatenated list or frames
+    df = pd.DataFrame.from_records(itertools.chain(first.data, *rest), columns=columns)
+    metrics.record_rows(table, read=len(df))
+    return df
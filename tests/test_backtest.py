@@ -0,0 +1,66 @@
+# tests/test_backtest.py
+import itertools
+from datetime import date, timedelta
+from backtest import backtest_season, fetch_season_games
+from fetch_game_results import extract_results
+from memory_store import MemoryStore
+
+TEAMS = [(10, 'NYY', 'New York Yankees'), (2, 'BOS', 'Boston Red Sox'),
+         (30, 'TB', 'Tampa Bay Rays'), (14, 'TOR', 'Toronto Blue Jays')]
+
+def _competitor(team, side, score, won):
+    team_id, abbr, name = team
+    return {'homeAway': side, 'score': str(score), 'winner': won,
+            'team': {'id': str(team_id), 'abbreviation': abbr, 'displayName': name}}
+
+def _event(game_id, start_utc, home, away, home_score, away_score):
+    return {'id': str(game_id), 'date': start_utc, 'status': {'type': {'name': 'STATUS_FINAL', 'state': 'post', 'completed': True}},
+            'competitions': [{'competitors': [
+        _competitor(home, 'home', home_score, home_score > away_score),
+        _competitor(away, 'away', away_score, away_score > home_score)]}]}
+
+def _season_rows():
+    """Results rows exactly as fetch_game_results writes them, over two weeks of round robins."""
+    rows, game_id = [], 1
+    for day in range(14):
+        game_date = date(2024, 4, 1) + timedelta(days=day)
+        events = []
+        for home, away in list(itertools.permutations(TEAMS, 2))[day % 6::6]:
+            # The Yankees always win; late first pitches are already the next day in UTC
+            home_score, away_score = (5, 2) if home[1] == 'NYY' else (1, 4) if away[1] == 'NYY' else (3 + day % 2, 4 - day % 2)
+            events.append(_event(game_id, f"{game_date + timedelta(days=1)}T02:10Z", home, away, home_score, away_score))
+            game_id += 1
+        rows += extract_results(events, game_date)
+    return rows
+
+def test_backtest_runs_on_results_rows():
+    rows = _season_rows()
+    assert {'home_team_id', 'away_team_id', 'actual_winner_id'} <= set(rows[0])
+    assert 'home_team_abbr' not in rows[0]
+    store = MemoryStore()
+    store.upsert('games', rows, on_conflict='game_id')
+
+    games_df = fetch_season_games(store, 2024)
+    assert len(games_df) == len(rows)
+    assert games_df['game_date'].max() == '2024-04-14'
+
+    report = backtest_season(games_df)
+    assert report.loc['ALL', 'games'] == len(rows)
+    # With point-in-time scores the unbeaten Yankees are picked in every later game they play
+    assert report.loc['ALL', 'hit_rate'] > 0.5
+
+def test_every_results_writer_records_the_winner_backtest_reads(monkeypatch):
+    import fetch_results
+    import live_scores
+    event = _event(7, '2024-04-02T23:05Z', TEAMS[0], TEAMS[1], 5, 2)
+
+    class Response:
+        def json(self):
+            return {'events': [event]}
+    monkeypatch.setattr(fetch_results.http_cache, 'get', lambda url, **kwargs: Response())
+    store = MemoryStore()
+    fetch_results.main(store)
+
+    rows = [extract_results([event])[0], store.table('games').select('*').execute().data[0], live_scores.parse_event(event)[0]]
+    for row in rows:
+        assert row['actual_winner_id'] == 10 and row['actual_winner'] == 'NYY'
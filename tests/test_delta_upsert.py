@@ -0,0 +1,28 @@
+# tests/test_delta_upsert.py
+import delta_upsert
+from delta_upsert import delta_upsert as upsert_changed
+from memory_store import MemoryStore
+from sqlite_store import SqliteStore
+
+ROWS = [{'team_abbr': 'NYY', 'season': 2024, 'runs': 100}, {'team_abbr': 'BOS', 'season': 2024, 'runs': 90}]
+
+def test_manifest_is_scoped_to_the_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(delta_upsert, 'MANIFEST_DIR', str(tmp_path / 'manifests'))
+    first, second = SqliteStore(str(tmp_path / 'first.db')), SqliteStore(str(tmp_path / 'second.db'))
+
+    assert upsert_changed(first, 'team_stats', ROWS, 'team_abbr').inserted == 2
+    assert upsert_changed(first, 'team_stats', ROWS, 'team_abbr').unchanged == 2
+    # Another store has never seen these rows, whatever the first store's manifest says
+    result = upsert_changed(second, 'team_stats', ROWS, 'team_abbr')
+    assert result.inserted == 2
+    assert len(second.table('team_stats').select('*').execute().data) == 2
+
+def test_stored_hashes_are_read_past_one_page(monkeypatch):
+    monkeypatch.setattr(delta_upsert, 'HASH_COLUMN', 'row_hash')
+    store = MemoryStore()  # no manifest, so previous hashes always come from the table
+    rows = [{'pitcher_id': i, 'season': 2024, 'era': 3.0} for i in range(1500)]
+    store.upsert('pitchers', [{**r, 'season': 2023, 'row_hash': 'stale'} for r in rows], on_conflict='pitcher_id,season')
+
+    assert upsert_changed(store, 'pitchers', rows, ('pitcher_id', 'season')).inserted == 1500
+    result = upsert_changed(store, 'pitchers', rows, ('pitcher_id', 'season'))
+    assert (result.inserted, result.changed, result.unchanged) == (0, 0, 1500)
@@ -0,0 +1,50 @@
+# tests/test_features.py
+import pandas as pd
+import delta_upsert
+import snapshots
+import fetch_team_stats
+from features import load_features
+from memory_store import MemoryStore
+from registry import EntityRegistry
+
+PITCHERS = [{'pitcher_id': i, 'name': f'Pitcher {i}', 'era': 3.0 + i, 'whip': 1.0 + i / 10,
+             'innings_pitched': 50.0, 'season': 2024} for i in range(1, 4)]
+
+def _stats(batting_averages):
+    return pd.DataFrame({'team_id': [10, 2], 'batting_average': batting_averages,
+                         'errors': [50, 60], 'era': [3.5, 4.0]})
+
+def test_stats_upsert_rebuilds_features(tmp_path, monkeypatch):
+    monkeypatch.setattr(delta_upsert, 'MANIFEST_DIR', str(tmp_path / 'manifests'))
+    monkeypatch.setattr(snapshots, 'SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    registry = EntityRegistry(2024)
+    registry.add('team', 10, 'NYY')
+    registry.add('team', 2, 'BOS')
+    monkeypatch.setattr(fetch_team_stats, 'get_registry', lambda season: registry)
+    monkeypatch.setattr(fetch_team_stats, 'list_team_ids', lambda season: [10, 2])
+    store = MemoryStore()
+    store.upsert('pitchers', PITCHERS, on_conflict='pitcher_id,season')
+
+    for batting_averages, leader in (([0.270, 0.250], 'NYY'), ([0.240, 0.260], 'BOS')):
+        monkeypatch.setattr(fetch_team_stats, 'fetch_team_statistics', lambda season, ids: _stats(batting_averages))
+        fetch_team_stats.fetch_and_upsert_team_stats(store, 2024)
+        teams = load_features(store, 2024)[0]
+        # The model reads the features, so they must follow every stats write
+        assert teams.loc[teams['Batting_Score'].idxmax(), 'team_abbr'] == leader
+
+def test_team_stats_of_another_season_are_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(delta_upsert, 'MANIFEST_DIR', str(tmp_path / 'manifests'))
+    monkeypatch.setattr(snapshots, 'SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    registry = EntityRegistry(2024)
+    registry.add('team', 10, 'NYY')
+    registry.add('team', 2, 'BOS')
+    monkeypatch.setattr(fetch_team_stats, 'get_registry', lambda season: registry)
+    monkeypatch.setattr(fetch_team_stats, 'list_team_ids', lambda season: [10, 2])
+    monkeypatch.setattr(fetch_team_stats, 'fetch_team_statistics', lambda season, ids: _stats([0.270, 0.250]))
+    store = MemoryStore()
+    store.upsert('pitchers', [{**p, 'season': s} for p in PITCHERS for s in (2023, 2024)], on_conflict='pitcher_id,season')
+
+    fetch_team_stats.fetch_and_upsert_team_stats(store, 2024)
+    fetch_team_stats.fetch_and_upsert_team_stats(store, 2023)
+    rows = store.table('team_stats').select('team_id, season').execute().data
+    assert sorted((r['season'], r['team_id']) for r in rows) == [(2023, 2), (2023, 10), (2024, 2), (2024, 10)]
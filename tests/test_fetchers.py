@@ -0,0 +1,50 @@
+# tests/test_fetchers.py
+import pytest
+from datetime import date
+import bulk_writer
+import fetch_games
+import fetch_game_results
+from memory_store import MemoryStore
+from test_backtest import TEAMS, _event
+
+class FailingStore(MemoryStore):
+    def upsert(self, table, rows, on_conflict=None):
+        raise ConnectionError("write refused")
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(bulk_writer, 'BACKOFF_BASE', 0)
+
+def test_failed_slate_write_fails_the_games_job(monkeypatch):
+    monkeypatch.setattr(fetch_games, 'fetch_espn_games', lambda: [{'game_id': '1', 'game_date': '2024-04-01'}])
+    with pytest.raises(SystemExit) as exit_info:
+        fetch_games.main(FailingStore())
+    assert exit_info.value.code == 1
+
+def test_failed_results_write_fails_the_scores_job(monkeypatch):
+    monkeypatch.setattr(fetch_game_results, 'fetch_espn_results', lambda day: [_event(1, '2024-04-01T23:05Z', TEAMS[0], TEAMS[1], 3, 2)])
+    with pytest.raises(SystemExit) as exit_info:
+        fetch_game_results.main(FailingStore())
+    assert exit_info.value.code == 1
+    fetch_game_results.main(MemoryStore())  # a clean write returns normally
+
+def test_backfill_checkpoints_only_dates_whose_games_are_all_final(tmp_path, monkeypatch):
+    live = _event(3, '2024-04-02T23:05Z', TEAMS[2], TEAMS[3], 1, 0)
+    live['status'] = {'type': {'name': 'STATUS_IN_PROGRESS', 'state': 'in', 'completed': False}}
+    slates = {'2024-04-01': [_event(1, '2024-04-01T23:05Z', TEAMS[0], TEAMS[1], 3, 2)],
+              '2024-04-02': [_event(2, '2024-04-02T23:05Z', TEAMS[0], TEAMS[1], 4, 2), live]}
+    fetched = []
+    def fetch(day):
+        fetched.append(day.isoformat())
+        return slates[day.isoformat()]
+    monkeypatch.setattr(fetch_game_results, 'fetch_espn_results', fetch)
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    store = MemoryStore()
+    start, end = date(2024, 4, 1), date(2024, 4, 2)
+
+    assert fetch_game_results.backfill(start, end, store, workers=1, checkpoint_path=checkpoint)
+    assert fetch_game_results.load_checkpoint(checkpoint) == {'2024-04-01'}
+    assert sorted(r['game_id'] for r in store.table('games').select('game_id').execute().data) == ['1', '2']
+    fetched.clear()
+    fetch_game_results.backfill(start, end, store, workers=1, checkpoint_path=checkpoint)
+    assert fetched == ['2024-04-02']
@@ -0,0 +1,25 @@
+# tests/test_form.py
+from datetime import date
+import pandas as pd
+import form
+from memory_store import MemoryStore
+from registry import EntityRegistry
+
+def test_backfill_registers_past_season_pitchers(monkeypatch, capsys):
+    registries = {}
+    monkeypatch.setattr(form, '_registered_seasons', set())
+    monkeypatch.setattr(form, 'get_registry', lambda season: registries.setdefault(season, EntityRegistry(season)))
+    monkeypatch.setattr(EntityRegistry, 'save', lambda self: None)
+    monkeypatch.setattr(form, 'get_pitching_stats', lambda season: pd.DataFrame(
+        {'IDfg': [19361, 10954], 'Name': ['Gerrit Cole', 'José Berríos'], 'Team': ['NYY', 'TOR']}))
+    monkeypatch.setattr(form, 'fetch_pitcher_lines', lambda day: pd.DataFrame(
+        {'Name': ['Gerrit Cole', 'Jose Berrios', 'Nobody Known'], 'IP': ['6.1', '5.0', '1.0'],
+         'ER': [1, 3, 0], 'H': [4, 6, 1], 'BB': [1, 2, 0]}))
+    store = MemoryStore()
+    store.upsert('games', [{'game_id': 1, 'game_date': '2023-06-01', 'home_team_id': 10, 'away_team_id': 14,
+                            'home_score': 4, 'away_score': 3}], on_conflict='game_id')
+
+    pitcher_daily = form._daily_inputs(store, date(2023, 6, 1), date(2023, 6, 1))[1]
+    assert sorted(pitcher_daily['pitcher_id']) == [10954, 19361]
+    assert pitcher_daily.loc[pitcher_daily['pitcher_id'] == 19361, 'outs'].item() == 19
+    assert "1 of 3 pitcher lines matched no registered pitcher" in capsys.readouterr().out
@@ -0,0 +1,18 @@
+# tests/test_metrics.py
+import sys
+import metrics
+
+def test_job_name_never_comes_from_an_interpreter_flag(monkeypatch):
+    monkeypatch.setattr(metrics, 'JOB', None)
+    monkeypatch.setattr(metrics, '_job', None)
+    monkeypatch.setattr(sys, 'argv', ['-c'])
+    assert metrics.job_name() == metrics.DEFAULT_JOB
+    monkeypatch.setattr(sys, 'argv', ['/srv/wagerindex/run_model.py'])
+    assert metrics.job_name() == 'run_model'
+    metrics.set_job('fetch_games')
+    assert metrics.job_name() == 'fetch_games'
+
+def test_exported_totals_are_gauges():
+    text = metrics.prometheus_text({'stages': {'model.score': {'runs': 1, 'wall_seconds': 0.5}}, 'http': {}, 'rows': {}})
+    assert '# TYPE wagerindex_stage_runs gauge' in text
+    assert 'counter' not in text and '_total' not in text
@@ -0,0 +1,17 @@
+# tests/test_odds.py
+import json
+from odds import EdgeBook, FileOddsSource
+
+def test_malformed_lines_are_skipped_not_priced(tmp_path, capsys):
+    path = tmp_path / 'lines.jsonl'
+    lines = [{'game_id': '1', 'book': 'a', 'home_ml': -150, 'away_ml': 130, 'total': 8.5},
+             {'game_id': '1', 'book': 'b', 'home_ml': None, 'away_ml': 125},
+             {'game_id': '1', 'book': 'c', 'away_ml': 120},
+             {'book': 'd', 'home_ml': -140, 'away_ml': 120}]
+    path.write_text("\n".join(map(json.dumps, lines)) + "\n{not json\n")
+
+    read = FileOddsSource(str(path)).read()
+    assert [line['book'] for line in read] == ['a']
+    assert capsys.readouterr().out.count("Skipping malformed line") == 4
+    moved, edges = EdgeBook({'1': 0.6}).apply(read)
+    assert len(moved) == 1 and edges[0]['pick_book'] == 'a'
@@ -0,0 +1,24 @@
+# tests/test_pitching_cache.py
+import json
+import time
+import pandas as pd
+import pitching_cache
+
+def _stale_cache(tmp_path, monkeypatch, season):
+    monkeypatch.setattr(pitching_cache, 'CACHE_DIR', str(tmp_path))
+    data_path, meta_path, _ = pitching_cache._paths(season)
+    pd.DataFrame({'IDfg': [1], 'Name': ['Old Line']}).to_feather(data_path)
+    with open(meta_path, 'w') as f:
+        json.dump({'season': season, 'fetched_at': time.time() - 2 * pitching_cache.CURRENT_SEASON_MAX_AGE,
+                   'rows': 1, 'final': False}, f)
+
+def test_writers_get_a_fresh_leaderboard(tmp_path, monkeypatch):
+    _stale_cache(tmp_path, monkeypatch, 2024)
+    monkeypatch.setattr(pitching_cache, 'refresh', lambda season: pd.DataFrame({'IDfg': [1], 'Name': ['New Line']}))
+    assert pitching_cache.get_pitching_stats(2024, background=False)['Name'].tolist() == ['New Line']
+
+def test_readers_get_the_cached_copy_and_a_daemon_refresh(tmp_path, monkeypatch):
+    _stale_cache(tmp_path, monkeypatch, 2025)
+    monkeypatch.setattr(pitching_cache, 'refresh', lambda season: None)
+    assert pitching_cache.get_pitching_stats(2025)['Name'].tolist() == ['Old Line']
+    assert pitching_cache._refresh_threads[2025].daemon
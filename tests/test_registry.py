@@ -0,0 +1,16 @@
+# tests/test_registry.py
+import pandas as pd
+from registry import EntityRegistry
+
+def test_shared_names_do_not_resolve():
+    registry = EntityRegistry(2024)
+    registry.add('pitcher', 1001, 'Luis García')
+    registry.add('pitcher', 2002, 'Luis Garcia')
+    registry.add('pitcher', 3003, 'Gerrit Cole')
+    registry.add('pitcher', 1001, 'Luis García')  # re-registering does not settle the ambiguity
+
+    assert registry.resolve('pitcher', 'Luis Garcia') is None
+    assert registry.resolve('pitcher', '2002') == 2002
+    assert registry.resolve('pitcher', 'gerrit cole') == 3003
+    ids = registry.resolve_series('pitcher', pd.Series(['Luis García', 'Gerrit Cole', None], dtype=object))
+    assert ids.isna().tolist() == [True, False, True]
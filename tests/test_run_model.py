@@ -0,0 +1,15 @@
+# tests/test_run_model.py
+import pandas as pd
+from run_model import score_games
+
+def test_games_with_unknown_team_ids_are_skipped():
+    games = pd.DataFrame({'game_id': [1, 2], 'game_date': ['2024-04-01'] * 2,
+                          'home_team_id': pd.array([10, pd.NA], dtype='Int64'),
+                          'away_team_id': pd.array([2, 14], dtype='Int64')})
+    teams = pd.DataFrame({'team_id': [10, 2, 14], 'Batting_Score': [60.0, 40.0, 50.0],
+                          'Bullpen_Score': [50.0] * 3, 'Defense_Score': [50.0] * 3})
+    pitchers = pd.DataFrame({'name': pd.Series(dtype=object), 'Pitching_Score': pd.Series(dtype=float)})
+
+    scored = score_games(games, teams, pitchers)
+    assert scored['game_id'].tolist() == [1]
+    assert scored['predicted_winner_id'].tolist() == [10]
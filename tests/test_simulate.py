@@ -0,0 +1,12 @@
+# tests/test_simulate.py
+import numpy as np
+import simulate
+
+def test_stacked_draw_matches_each_games_own_table():
+    lam = np.array([0.5, 3.2, 4.5, 9.0, 12.0])
+    cdf = simulate.negative_binomial_cdf(lam)
+    u = np.random.default_rng(7).random((len(lam), 5000))
+    expected = np.stack([np.searchsorted(cdf[g], u[g], side='right') for g in range(len(lam))])
+    drawn = simulate._draw_runs(np.random.default_rng(7), simulate.stack_cdfs(cdf), len(lam), 5000)
+    assert np.array_equal(drawn, expected)
+    assert drawn.min() >= 0 and drawn.max() <= simulate.MAX_RUNS
@@ -0,0 +1,15 @@
+# tests/test_table_reader.py
+import pytest
+from memory_store import MemoryStore
+from sqlite_store import SqliteStore
+from table_reader import read_table
+
+ROWS = [{'pitcher_id': p, 'as_of_date': f'2024-04-0{d}', 'era_7': p + d / 10} for d in (3, 1, 2) for p in (2, 1)]
+
+@pytest.mark.parametrize('make_store', [lambda tmp_path: MemoryStore(), lambda tmp_path: SqliteStore(str(tmp_path / 'w.db'))])
+def test_pages_follow_a_composite_order(tmp_path, make_store):
+    store = make_store(tmp_path)
+    store.upsert('pitcher_form', ROWS, on_conflict='pitcher_id,as_of_date')
+
+    df = read_table(store, 'pitcher_form', order=['pitcher_id', 'as_of_date'], page_size=2)
+    assert list(zip(df['pitcher_id'], df['as_of_date'])) == sorted((r['pitcher_id'], r['as_of_date']) for r in ROWS)
@@ -0,0 +1,14 @@
+# tests/test_tune.py
+from memory_store import MemoryStore
+from test_backtest import _season_rows
+from tune import run_tuning
+
+def test_tuning_reports_flat_components_as_missing():
+    store = MemoryStore()
+    store.upsert('games', _season_rows(), on_conflict='game_id')
+
+    result = run_tuning([2024], step=0.1, k=3, workers=1, supabase=store)
+    # No starters or pitcher form were written, so pitching cannot be told apart between teams
+    assert 'pitching' in result['missing_data']
+    assert 'pitching' not in result['best_weights']
+    assert abs(sum(result['best_weights'].values()) - 1) < 1e-9
@@ -0,0 +1,205 @@
+# tune.py
+"""
+Grid search over run_model.WEIGHTS against historical results.
+
+The per-game component scores are built once, as a game x component matrix of home-minus-away
+differences (point-in-time, as in backtest.py). The model picks the home team when that
+difference dotted with the weights is >= 0, so a batch of weight vectors is scored with one
+matrix product, and batches are spread across processes.
+
+    python tune.py 2024                  # weights on the simplex in steps of 0.02
+    python tune.py 2023 2024 --step 0.05 --folds 10
+"""
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import metrics
+from concurrent.futures import ProcessPoolExecutor
+from backtest import GAME_COLUMNS, fetch_season_games, decided_games, point_in_time_team_scores, margin_to_win_prob
+from run_model import WEIGHTS, score_games
+from form import load_form
+from utils import get_store
+
+# --- Config ---
+COMPONENTS = ['batting', 'pitching', 'bullpen', 'defense']  # column order of the score matrix and weight grid
+# Starters are needed to join pitcher form for the pitching component
+TUNE_GAME_COLUMNS = GAME_COLUMNS + ['home_pitcher_id', 'away_pitcher_id']
+DEFAULT_STEP = 0.02
+DEFAULT_FOLDS = 5
+BATCH_SIZE = 4096
+
+def point_in_time_pitching(games_df: pd.DataFrame, pitcher_form_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    home_/away_Pitching_Score per game from each starter's last-30-day ERA and WHIP as of the game
+    date, ranked among that day's starters like compute_component_scores. Starters with no form get 50.
+    """
+    out = pd.DataFrame({'home_Pitching_Score': 50.0, 'away_Pitching_Score': 50.0}, index=games_df.index)
+    if pitcher_form_df is None or pitcher_form_df.empty or 'home_pitcher_id' not in games_df.columns:
+        return out
+    form = pitcher_form_df[['as_of_date', 'pitcher_id', 'era_30', 'whip_30']].rename(columns={'as_of_date': 'game_date'})
+    form['pitcher_id'] = form['pitcher_id'].astype('Int64')
+    starters = pd.concat([
+        games_df[['game_date', f'{side}_pitcher_id']].set_axis(['game_date', 'pitcher_id'], axis=1).assign(side=side, row=games_df.index)
+        for side in ('home', 'away')], ignore_index=True)
+    starters['pitcher_id'] = starters['pitcher_id'].astype('Int64')
+    starters = starters.merge(form, on=['game_date', 'pitcher_id'], how='left')
+    by_date = starters.groupby('game_date')
+    starters['score'] = ((by_date['era_30'].rank(method='max', ascending=False, pct=True) +
+                          by_date['whip_30'].rank(method='max', ascending=False, pct=True)) * 50).fillna(50.0)
+    for side in ('home', 'away'):
+        side_scores = starters[starters['side'] == side].set_index('row')['score']
+        out[f'{side}_Pitching_Score'] = side_scores.reindex(games_df.index).fillna(50.0)
+    return out
+
+def component_matrix(games_df: pd.DataFrame, pitcher_form_df=None):
+    """
+    (X, home_won, game_dates): X holds home-minus-away component scores in COMPONENTS order, one
+    row per decided game, scaled like _weighted_score so X @ weights is the predicted margin.
+    """
+    games_df = decided_games(games_df).reset_index(drop=True)
+    no_pitchers = pd.DataFrame({'name': pd.Series(dtype=object), 'Pitching_Score': pd.Series(dtype=float)})
+    scored = score_games(games_df, point_in_time_team_scores(games_df), no_pitchers)
+    pitching = point_in_time_pitching(scored, pitcher_form_df)
+    scored[['home_Pitching_Score', 'away_Pitching_Score']] = pitching[['home_Pitching_Score', 'away_Pitching_Score']]
+    X = np.column_stack([
+        scored[f'home_{c.capitalize()}_Score'].to_numpy(float) - scored[f'away_{c.capitalize()}_Score'].to_numpy(float)
+        for c in COMPONENTS]) / 10
+    return X, (scored['home_score'] > scored['away_score']).to_numpy(), scored['game_date'].to_numpy()
+
+def weight_grid(step=DEFAULT_STEP, active=None) -> np.ndarray:
+    """
+    Every weight vector over COMPONENTS with entries in multiples of step that sum to 1. Components
+    not in active (default: all) are held at 0.
+    """
+    active = [COMPONENTS.index(c) for c in (active or COMPONENTS)]
+    n = int(round(1 / step))
+    free = np.meshgrid(*[np.arange(n + 1)] * (len(active) - 1), indexing='ij')
+    free = np.column_stack([f.ravel() for f in free]) if free else np.zeros((1, 0), dtype=int)
+    free = free[free.sum(axis=1) <= n]
+    grid = np.zeros((len(free), len(COMPONENTS)))
+    grid[:, active] = np.column_stack([free, n - free.sum(axis=1)]) / n
+    return grid
+
+def contiguous_folds(game_dates, k):
+    """Fold index per game: k blocks of consecutive dates, so no fold is scored on days it trained around."""
+    order = np.argsort(game_dates, kind='stable')
+    folds = np.empty(len(game_dates), dtype=np.int64)
+    folds[order] = np.arange(len(game_dates)) * k // len(game_dates)
+    return folds
+
+# Set once per worker process, so batches only ship their weights
+_X = _outcome = _fold_onehot = None
+
+def _init_worker(X, home_won, folds, k):
+    global _X, _outcome, _fold_onehot
+    _X = X
+    _outcome = home_won
+    _fold_onehot = np.eye(k, dtype=np.float64)[folds].T  # k x games
+
+def _score_batch(weights):
+    """Correct picks per fold (k x batch) for a batch of weight vectors."""
+    picks_home = (_X @ weights.T) >= 0  # games x batch; ties go to the home team as in score_games
+    return _fold_onehot @ (picks_home == _outcome[:, None])
+
+def sweep(X, home_won, folds, k, grid, workers=None, batch_size=BATCH_SIZE):
+    """Correct picks per fold for every weight vector in the grid (k x len(grid))."""
+    batches = [grid[i:i + batch_size] for i in range(0, len(grid), batch_size)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(batches) == 1:
+        _init_worker(X, home_won, folds, k)
+        return np.hstack([_score_batch(b) for b in batches])
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches)), initializer=_init_worker,
+                             initargs=(X, home_won, folds, k)) as pool:
+        return np.hstack(list(pool.map(_score_batch, batches)))
+
+def cross_validate(hits, fold_sizes):
+    """
+    For each fold, the grid index that is most accurate on the other folds and its accuracy on
+    the held-out fold. Returns (held-out accuracies, chosen indices).
+    """
+    total = hits.sum(axis=0)
+    accuracies, chosen = [], []
+    for f in range(len(fold_sizes)):
+        best = int(np.argmax(total - hits[f]))
+        chosen.append(best)
+        accuracies.append(hits[f, best] / fold_sizes[f])
+    return np.array(accuracies), chosen
+
+def _describe(weights, components=COMPONENTS):
+    return ", ".join(f"{c} {w:.2f}" for c, w in zip(COMPONENTS, weights) if c in components)
+
+def run_tuning(seasons, step=DEFAULT_STEP, k=DEFAULT_FOLDS, workers=None, batch_size=BATCH_SIZE, supabase=None):
+    supabase = supabase or get_store()
+
+    print(f"⬇️ Fetching games for seasons {', '.join(map(str, seasons))}...")
+    with metrics.stage("tune.matrix"):
+        frames = []
+        for season in seasons:
+            games_df = fetch_season_games(supabase, season, TUNE_GAME_COLUMNS)
+            if games_df.empty:
+                continue
+            try:
+                pitcher_form_df = load_form(supabase, f"{season}-01-01", f"{season}-12-31")[1]
+            except Exception as e:
+                print(f"⚠️ Pitcher form not available for {season} ({e}); pitching held at 50.")
+                pitcher_form_df = None
+            frames.append(component_matrix(games_df, pitcher_form_df))
+    if not frames:
+        print("⚠️ Halting: No completed games found for the requested seasons.")
+        return None
+    X = np.vstack([f[0] for f in frames])
+    home_won = np.concatenate([f[1] for f in frames])
+    game_dates = np.concatenate([f[2] for f in frames]).astype(str)
+    # A component that is identical for both sides in every game (e.g. pitching when no starter
+    # resolved to pitcher form) is missing data: no weight on it changes a single pick
+    flat = [c for c, col in zip(COMPONENTS, X.T) if not col.any()]
+    tunable = [c for c in COMPONENTS if c not in flat]
+    if flat:
+        print(f"⚠️ Missing data for: {', '.join(flat)} (no game has different home/away values). "
+              f"Their weights cannot be tuned and are left out of the results.")
+    if not tunable:
+        print("⚠️ Halting: No component varies between teams; nothing to tune.")
+        return None
+
+    k = min(k, len(X))
+    folds = contiguous_folds(game_dates, k)
+    fold_sizes = np.bincount(folds, minlength=k)
+    grid = weight_grid(step, tunable)
+    print(f"🔍 Scoring {len(grid)} weight combinations x {len(X)} games...")
+    start = time.perf_counter()
+    with metrics.stage("tune.sweep", games=len(X), combinations=len(grid)):
+        hits = sweep(X, home_won, folds, k, grid, workers, batch_size)
+    print(f"⏱️ Swept the grid in {time.perf_counter() - start:.2f}s")
+
+    cv_accuracy, chosen = cross_validate(hits, fold_sizes)
+    best = int(np.argmax(hits.sum(axis=0)))
+    current = np.array([WEIGHTS[c] for c in COMPONENTS])
+    _init_worker(X, home_won, folds, k)
+    current_hits = _score_batch(current[None, :])[:, 0]
+
+    def brier(weights):
+        return float(((margin_to_win_prob(X @ weights) - home_won) ** 2).mean())
+
+    print(f"\n📊 Current weights ({_describe(current)}): accuracy {current_hits.sum() / len(X):.4f}, "
+          f"Brier {brier(current):.4f}")
+    print(f"🏆 Best weights ({_describe(grid[best], tunable)}): accuracy {hits[:, best].sum() / len(X):.4f}, "
+          f"Brier {brier(grid[best]):.4f}")
+    print(f"🧪 {k}-fold cross-validated accuracy: {cv_accuracy.mean():.4f} ± {cv_accuracy.std():.4f} "
+          f"(current weights per fold: {(current_hits / fold_sizes).mean():.4f})")
+    for f, idx in enumerate(chosen):
+        print(f"   fold {f + 1}: {fold_sizes[f]} games, held-out {cv_accuracy[f]:.4f} with {_describe(grid[idx], tunable)}")
+    return {'best_weights': {c: w for c, w in zip(COMPONENTS, grid[best].tolist()) if c in tunable},
+            'missing_data': flat, 'accuracy': float(hits[:, best].sum() / len(X)),
+            'cv_accuracy': float(cv_accuracy.mean()), 'current_accuracy': float(current_hits.sum() / len(X))}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune the WagerIndex component weights on past seasons.")
+    parser.add_argument("seasons", nargs="+", type=int, help="Season years to tune on, e.g. 2023 2024")
+    parser.add_argument("--step", type=float, default=DEFAULT_STEP, help="Weight grid spacing (weights sum to 1)")
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS, help="Cross-validation folds (contiguous date blocks)")
+    parser.add_argument("--workers", type=int, help="Process pool size (defaults to one per CPU)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Weight vectors per matrix product")
+    args = parser.parse_args()
+    run_tuning(args.seasons, args.step, args.folds, args.workers, args.batch_size)
@@ -1,12 +1,43 @@
 # utils.py
-import requests
+import os
+import sys
+import http_cache
 from datetime import datetime
 
+def get_supabase_client():
+    """Creates a Supabase client from SUPABASE_URL/SUPABASE_KEY, exiting if the secrets are missing."""
+    from dotenv import load_dotenv
+    from supabase import create_client
+    load_dotenv()
+    url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
+    if not url or not key:
+        print("❌ Fatal Error: SUPABASE_URL and SUPABASE_KEY secrets must be set.")
+        sys.exit(1)
+    return create_client(url, key)
+
+def get_store():
+    """
+    The configured storage backend. Every backend exposes the subset of the supabase-py query
+    builder the jobs use (table().select/upsert, eq/neq/gt/gte/lt/lte/in_, order, range, limit,
+    execute). WAGERINDEX_STORE=supabase (the default) is the hosted database; WAGERINDEX_STORE=sqlite
+    is a local file at WAGERINDEX_SQLITE_PATH (see sqlite_store.py).
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+    backend = os.getenv("WAGERINDEX_STORE", "supabase").lower()
+    if backend == "sqlite":
+        from sqlite_store import SqliteStore
+        return SqliteStore(os.getenv("WAGERINDEX_SQLITE_PATH"))
+    if backend != "supabase":
+        print(f"❌ Fatal Error: Unknown WAGERINDEX_STORE '{backend}' (expected 'supabase' or 'sqlite').")
+        sys.exit(1)
+    return get_supabase_client()
+
 def get_current_season_year():
     print(" Hitting ESPN API to get the official current season year...")
     try:
         url = "https://site.api.espn.com/apis/site/v2/sports/baseball/mlb/scoreboard"
-        response = requests.get(url, timeout=15)
+        response = http_cache.get(url, timeout=15)
         response.raise_for_status()
         data = response.json()
         season_data = data.get("season", {})
@@ -0,0 +1,88 @@
+# wagerindex.py
+"""
+Single entry point for every WagerIndex job:
+
+    python wagerindex.py <command> [options]
+
+Each command runs the matching script as if it were executed directly, so options are the
+script's own (see `python wagerindex.py <command> --help`). Nothing heavy is imported here:
+pandas, numpy, supabase and pybaseball are only loaded by the commands that need them.
+"""
+import sys
+import runpy
+import argparse
+import metrics
+
+# command -> (module, description)
+COMMANDS = {
+    'games':      ('fetch_games',         "Fetch today's slate from ESPN into the games table"),
+    'results':    ('fetch_results',       "Record yesterday's final scores"),
+    'scores':     ('fetch_game_results',  "Update final scores for today, or backfill a date range"),
+    'live':       ('live_scores',         "Watch the live scoreboard and push score/status changes"),
+    'team-stats': ('fetch_team_stats',    "Refresh team batting/pitching/fielding stats"),
+    'pitchers':   ('fetch_pitcher_stats', "Refresh pitcher stats from pybaseball"),
+    'snapshots':  ('snapshots',           "Show team/pitcher stats as they stood on an earlier date"),
+    'features':   ('features',            "Precompute component scores into the feature tables"),
+    'form':       ('form',                "Update rolling 7/14/30-day team and pitcher form"),
+    'model':      ('run_model',           "Score games with the prediction model"),
+    'pipeline':   ('run_pipeline',        "Run the full ingestion + model DAG"),
+    'backtest':   ('backtest',            "Replay past seasons through the model"),
+    'sync':       ('sqlite_store',        "Push rows changed in the local SQLite store to Supabase"),
+    'tune':       ('tune',                "Grid-search the model weights with cross-validation"),
+    'odds':       ('odds',                "Ingest betting lines and track the model's edge per game"),
+}
+# Commands that must start without importing any of HEAVY_MODULES (checked by `check-startup`)
+LIGHT_COMMANDS = ('games', 'results', 'scores')
+HEAVY_MODULES = ('pandas', 'numpy', 'supabase', 'pybaseball', 'pyarrow')
+STARTUP_BUDGET_SECONDS = 0.5
+
+def run_command(name, argv):
+    module = COMMANDS[name][0]
+    metrics.set_job(module)  # same job name as running the script directly
+    sys.argv = [f"wagerindex {name}"] + list(argv)
+    runpy.run_module(module, run_name="__main__", alter_sys=True)
+
+def check_startup(budget=STARTUP_BUDGET_SECONDS):
+    """
+    Imports each light command's module in a fresh interpreter and fails if it pulls in a heavy
+    dependency or takes longer than budget seconds. Meant to run in CI as a regression check.
+    """
+    import json
+    import subprocess
+    probe = (
+        "import sys, time, json, importlib; t = time.perf_counter(); importlib.import_module(sys.argv[1]); "
+        "print(json.dumps({'seconds': time.perf_counter() - t, "
+        "'heavy': sorted(m for m in sys.argv[2].split(',') if m in sys.modules)}))"
+    )
+    failures = 0
+    for name in LIGHT_COMMANDS:
+        module = COMMANDS[name][0]
+        out = subprocess.run([sys.executable, "-c", probe, module, ",".join(HEAVY_MODULES)],
+                             capture_output=True, text=True)
+        if out.returncode != 0:
+            print(f"❌ {name}: importing {module} failed:\n{out.stderr.strip()}")
+            failures += 1
+            continue
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        ok = not result['heavy'] and result['seconds'] <= budget
+        failures += not ok
+        heavy = f", loaded {', '.join(result['heavy'])}" if result['heavy'] else ""
+        print(f"{'✅' if ok else '❌'} {name}: {result['seconds'] * 1000:.0f} ms{heavy}")
+    return failures == 0
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(prog="wagerindex", description="WagerIndex MLB data and prediction jobs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, (_, description) in COMMANDS.items():
+        sub.add_parser(name, help=description, add_help=False)
+    check = sub.add_parser("check-startup", help="Fail if light commands import heavy dependencies or start slowly")
+    check.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS, help="Seconds allowed per import")
+
+    args, rest = parser.parse_known_args(argv)
+    if args.command == "check-startup":
+        sys.exit(0 if check_startup(args.budget) else 1)
+    run_command(args.command, rest)
+
+if __name__ == "__main__":
+    main()